@@ -6,18 +6,75 @@ ALD数据库API爬虫
 """
 
 import requests
+import hashlib
 import json
 import os
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from itertools import chain
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple, Union
 import argparse
 import time
 import pandas as pd
 
+from doi_enrichment import DEFAULT_ENDPOINT, DOIEnricher, DOIMetadataCache
+from excel_export import autofit_columns, generate_statistics, write_records_streaming
+from file_utils import atomic_open, atomic_path, publish_copy
+from json_stream import iter_json_events
+from link_check import DOI_RESOLVER, LinkChecker
+from raw_archive import RawArchiveDownloader, iter_raw_archive_chunks, read_raw_archive
+from record_flatten import build_excel_frames
+from record_types import ProcessRecord, Reference, json_default
+from snapshot_io import SNAPSHOT_FORMATS, find_latest_snapshot, iter_records, snapshot_signature, write_snapshot
+from snapshot_store import SnapshotStore
+
+class ResponseCache:
+    """按URL持久化的HTTP响应缓存，记录ETag、Last-Modified和响应体哈希"""
+    
+    def __init__(self, cache_file: str = 'data/.api_http_cache.json'):
+        self.cache_file = cache_file
+        self.entries = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """生成条件请求头"""
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def matches(self, url: str, body_hash: str) -> bool:
+        """响应体哈希是否与缓存一致"""
+        return bool(body_hash) and self.entries.get(url, {}).get('body_hash') == body_hash
+    
+    def update(self, url: str, etag: str, last_modified: str, body_hash: str):
+        """更新缓存条目并写入磁盘"""
+        self.entries[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'body_hash': body_hash,
+            'updated': datetime.now().isoformat()
+        }
+        with atomic_open(self.cache_file) as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+
 class ALDDatabaseAPICrawler:
     """ALD数据库API爬虫类"""
     
-    def __init__(self):
+    def __init__(self, snapshot_format: str = 'json', retries: int = 5):
+        """
+        :param snapshot_format: 数据快照格式，json（缩进数组）或 jsonl / jsonl.gz / jsonl.xz（紧凑按行格式）
+        :param retries: 下载失败时的最大重试次数
+        """
+        self.snapshot_format = snapshot_format
         self.api_url = "https://www.atomiclimits.com/alddatabase/api/processes.php"
         self.session = requests.Session()
         self.session.headers.update({
@@ -28,15 +85,55 @@ class ALDDatabaseAPICrawler:
             'Connection': 'keep-alive',
             'Referer': 'https://www.atomiclimits.com/alddatabase/'
         })
-        
-    def fetch_data(self) -> Optional[Dict[str, Any]]:
-        """从API获取数据"""
+        self.cache = ResponseCache()
+        self.downloader = RawArchiveDownloader(self.session, retries=retries)
+        self.raw_archive_file = None
+        # 本次响应的缓存信息，保存成功后才写入缓存
+        self.response_info = {}
+        self.not_modified = False
+        
+    def fetch_data(self, stream: bool = False, use_cache: bool = False,
+                   archive_file: str = None) -> Optional[Union[Dict[str, Any], Iterator[Tuple[str, Any]]]]:
+        """
+        从API获取数据，响应体先保存为 data/raw/ 下的压缩存档再解析
+        :param stream: 流式模式，返回逐条解码的 (字段名, 元素) 事件迭代器而不是完整字典
+        :param use_cache: 发送条件请求，上游未变化时设置 not_modified 并返回None
+        :param archive_file: 直接解析已保存的原始响应存档，不请求API（解析失败后离线重试）
+        """
+        self.not_modified = False
+        self.response_info = {}
         try:
-            print(f"正在从API获取数据: {self.api_url}")
-            response = self.session.get(self.api_url, timeout=30)
-            response.raise_for_status()
+            if archive_file is None:
+                print(f"正在从API获取数据: {self.api_url}")
+                headers = self.cache.conditional_headers(self.api_url) if use_cache else {}
+                archive_file = self.downloader.download(self.api_url, headers=headers)
+                if archive_file is None:
+                    print("API数据未变化 (304 Not Modified)")
+                    self.not_modified = True
+                    return None
+                stats = self.downloader.stats
+                print(f"原始响应已保存到: {archive_file}（{stats['attempts']} 次请求，"
+                      f"续传 {stats['resumed_bytes']} 字节，耗时 {stats['elapsed']:.1f} 秒）")
+                self.response_info = {
+                    'etag': self.downloader.etag,
+                    'last_modified': self.downloader.last_modified,
+                    'body_hash': ''
+                }
+            else:
+                print(f"正在读取原始响应存档: {archive_file}")
+            self.raw_archive_file = archive_file
+            
+            if stream:
+                return self.iter_archive_events(archive_file)
             
-            data = response.json()
+            body = read_raw_archive(archive_file)
+            self.response_info['body_hash'] = hashlib.sha256(body).hexdigest()
+            if use_cache and self.cache.matches(self.api_url, self.response_info['body_hash']):
+                print("API数据未变化 (响应体哈希一致)")
+                self.not_modified = True
+                return None
+            
+            data = json.loads(body)
             print(f"API响应成功: {data.get('success', False)}")
             
             if not data.get('success', False):
@@ -56,61 +153,89 @@ class ALDDatabaseAPICrawler:
             return None
         except json.JSONDecodeError as e:
             print(f"JSON解析错误: {e}")
+            print(f"可以使用 --from-archive {archive_file} 离线重试解析")
             return None
         except Exception as e:
             print(f"未知错误: {e}")
             return None
     
-    def process_data(self, raw_data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """处理和合并数据"""
-        processes = raw_data.get('processes', [])
-        references = raw_data.get('references', [])
+    def iter_archive_events(self, archive_file: str) -> Iterator[Tuple[str, Any]]:
+        """按块读取原始响应存档，逐条产生 processes 和 references 元素"""
+        counts = {'processes': 0, 'references': 0}
+        body_hash = hashlib.sha256()
+        
+        def hashed_chunks():
+            for chunk in iter_raw_archive_chunks(archive_file):
+                body_hash.update(chunk)
+                yield chunk
+        
+        for key, value in iter_json_events(hashed_chunks(), stream_keys=counts.keys()):
+            if key in counts:
+                counts[key] += 1
+            elif key == 'success':
+                print(f"API响应成功: {value}")
+            yield key, value
+        
+        self.response_info['body_hash'] = body_hash.hexdigest()
+        print(f"获取到 {counts['processes']} 条工艺记录")
+        print(f"获取到 {counts['references']} 条参考文献")
+    
+    def process_data(self, raw_data: Union[Dict[str, Any], Iterable[Tuple[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        处理和合并数据
+        :param raw_data: 完整的API响应字典，或 fetch_data(stream=True) 返回的事件迭代器
+        """
+        if isinstance(raw_data, dict):
+            events = chain((('references', ref) for ref in raw_data.get('references', [])),
+                           (('processes', process) for process in raw_data.get('processes', [])))
+        else:
+            events = raw_data
         
-        # 创建参考文献索引
+        # 参考文献索引，工艺记录直接引用其中的列表，因此两类元素的先后顺序不影响结果
         ref_index = {}
-        for ref in references:
-            process_id = ref.get('process_id')
-            if process_id not in ref_index:
-                ref_index[process_id] = []
-            doi = ref.get('reference_doi', '')
-            # 为DOI生成标准URL链接
-            url = f"https://doi.org/{doi}" if doi else ''
-            
-            ref_index[process_id].append({
-                'doi': doi,
-                'url': url,
-                'author': ref.get('reference_author', ''),
-                'full_authors': ref.get('reference_fullAuthorList', ''),
-                'citations': ref.get('reference_citations', '0'),
-                'submitted': ref.get('EntrySubmitted', '')
-            })
-        
-        # 合并工艺和参考文献数据
         processed_data = []
-        for process in processes:
-            process_id = process.get('process_id')
-            
-            # 构建统一的数据结构
-            record = {
-                'process_id': process_id,
-                'material': process.get('process_material', ''),
-                'reactant_a': process.get('process_reactantA', ''),
-                'reactant_b': process.get('process_reactantB', ''),
-                'reactant_c': process.get('process_reactantC', ''),
-                'reactant_d': process.get('process_reactantD', ''),
-                'note': process.get('process_note', ''),
-                'contributor': process.get('process_contributor', ''),
-                'reviewed': process.get('process_reviewed', '0') == '1',
-                'references': ref_index.get(process_id, [])
-            }
-            
-            # 过滤空记录
-            if record['material'] or record['reactant_a'] or record['reactant_b']:
-                processed_data.append(record)
+        for key, item in events:
+            if key == 'references':
+                # URL由DOI按需生成，引用数在这里解析一次
+                ref_index.setdefault(item.get('process_id'), []).append(Reference(
+                    doi=item.get('reference_doi', ''),
+                    author=item.get('reference_author', ''),
+                    full_authors=item.get('reference_fullAuthorList', ''),
+                    citations=item.get('reference_citations', '0'),
+                    submitted=item.get('EntrySubmitted', '')
+                ))
+            elif key == 'processes':
+                process_id = item.get('process_id')
+                
+                # 构建统一的数据结构（紧凑记录，分类字段字符串驻留）
+                record = ProcessRecord(
+                    process_id=process_id,
+                    material=item.get('process_material', ''),
+                    reactant_a=item.get('process_reactantA', ''),
+                    reactant_b=item.get('process_reactantB', ''),
+                    reactant_c=item.get('process_reactantC', ''),
+                    reactant_d=item.get('process_reactantD', ''),
+                    note=item.get('process_note', ''),
+                    contributor=item.get('process_contributor', ''),
+                    reviewed=item.get('process_reviewed', '0') == '1',
+                    references=ref_index.setdefault(process_id, [])
+                )
+                
+                # 过滤空记录
+                if record.material or record.reactant_a or record.reactant_b:
+                    processed_data.append(record)
+            elif key == 'success' and not item:
+                print("API返回失败状态")
+                return []
         
         print(f"处理完成，有效记录数: {len(processed_data)}")
         return processed_data
     
+    @property
+    def latest_data_file(self) -> str:
+        """当前快照格式对应的最新数据文件"""
+        return f'data/api_latest_data{SNAPSHOT_FORMATS[self.snapshot_format]}'
+    
     def save_data(self, data: List[Dict[str, Any]], filename: str = None, test_mode: bool = False, max_records: int = None) -> str:
         """保存数据到文件"""
         # 确保数据目录存在
@@ -118,11 +243,12 @@ class ALDDatabaseAPICrawler:
         
         # 生成文件名
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        extension = SNAPSHOT_FORMATS[self.snapshot_format]
         if filename is None:
             if test_mode:
-                filename = f'data/api_test_data_{timestamp}.json'
+                filename = f'data/api_test_data_{timestamp}{extension}'
             else:
-                filename = f'data/api_full_data_{timestamp}.json'
+                filename = f'data/api_full_data_{timestamp}{extension}'
         
         # 限制记录数（测试模式或指定最大记录数）
         if test_mode and max_records is None:
@@ -130,22 +256,104 @@ class ALDDatabaseAPICrawler:
         
         save_data = data[:max_records] if max_records else data
         
-        # 保存数据
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, ensure_ascii=False, indent=2)
+        # 保存数据（只序列化一次）
+        write_snapshot(save_data, filename)
         
         print(f"数据已保存到: {filename}")
         print(f"保存记录数: {len(save_data)}")
         
-        # 同时保存最新版本（不带时间戳）
-        latest_filename = 'data/api_latest_data.json'
-        with open(latest_filename, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, ensure_ascii=False, indent=2)
+        # 同时发布最新版本（不带时间戳），直接复用刚写好的文件
+        publish_copy(filename, self.latest_data_file)
+        
+        return filename
+    
+    def save_latest(self, data: List[Dict[str, Any]]) -> str:
+        """保存最新版本数据（不带时间戳）"""
+        write_snapshot(data, self.latest_data_file)
+        return self.latest_data_file
+    
+    def save_text_index(self, data: List[Dict[str, Any]]) -> str:
+        """为最新数据生成trigram全文索引（备注、作者、DOI），供 query.py --text 使用"""
+        from text_index import build_text_index, text_index_path
         
+        filename = text_index_path(self.latest_data_file)
+        build_text_index(data, filename, snapshot_signature(self.latest_data_file))
+        print(f"全文索引已保存到: {filename}")
         return filename
     
-    def save_to_excel(self, data: List[Dict[str, Any]], filename: str = None, test_mode: bool = False, max_records: int = None) -> str:
-        """保存数据到Excel文件"""
+    @staticmethod
+    def record_fingerprint(record: Dict[str, Any]) -> str:
+        """计算记录内容哈希（键排序后的紧凑JSON）"""
+        canonical = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=json_default)
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+    
+    def build_fingerprint_index(self, latest_file: str = None) -> Dict[str, str]:
+        """流式读取上次的最新数据，建立 process_id -> 内容哈希 索引"""
+        index = {}
+        if latest_file is None:
+            latest_file = find_latest_snapshot(preferred=self.snapshot_format)
+        if not latest_file or not os.path.exists(latest_file):
+            print("未找到上次的数据文件，所有记录视为新增")
+            return index
+        
+        for record in iter_records(latest_file):
+            index[record.get('process_id')] = self.record_fingerprint(record)
+        
+        print(f"已加载上次数据指纹: {len(index)} 条")
+        return index
+    
+    def diff_records(self, previous_index: Dict[str, str], data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """单次遍历将记录分为新增、变更、删除和未变化"""
+        remaining = dict(previous_index)
+        added = []
+        changed = []
+        unchanged = 0
+        
+        for record in data:
+            previous_hash = remaining.pop(record.get('process_id'), None)
+            if previous_hash is None:
+                added.append(record)
+            elif previous_hash != self.record_fingerprint(record):
+                changed.append(record)
+            else:
+                unchanged += 1
+        
+        return {
+            'summary': {
+                'added': len(added),
+                'changed': len(changed),
+                'removed': len(remaining),
+                'unchanged': unchanged
+            },
+            'added': added,
+            'changed': changed,
+            'removed': list(remaining)
+        }
+    
+    def save_changelog(self, changes: Dict[str, Any], test_mode: bool = False) -> str:
+        """保存紧凑格式的变更日志"""
+        os.makedirs('data', exist_ok=True)
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if test_mode:
+            filename = f'data/api_test_changelog_{timestamp}.json'
+        else:
+            filename = f'data/api_changelog_{timestamp}.json'
+        
+        changelog = {'timestamp': datetime.now().isoformat(), **changes}
+        with atomic_open(filename) as f:
+            json.dump(changelog, f, ensure_ascii=False, separators=(',', ':'), default=json_default)
+        
+        print(f"变更日志已保存到: {filename}")
+        return filename
+    
+    def save_to_excel(self, data: List[Dict[str, Any]], filename: str = None, test_mode: bool = False, max_records: int = None,
+                      streaming: bool = False, link_status: Dict[str, str] = None) -> str:
+        """
+        保存数据到Excel文件
+        :param streaming: 使用openpyxl只写模式逐行写出，内存占用不随记录数增长
+        :param link_status: DOI -> 链接状态，提供时参考文献详情表增加链接状态列
+        """
         # 确保数据目录存在
         os.makedirs('data', exist_ok=True)
         
@@ -163,203 +371,231 @@ class ALDDatabaseAPICrawler:
         
         save_data = data[:max_records] if max_records else data
         
-        # 准备Excel数据
-        excel_data = []
-        for record in save_data:
-            # 基础信息
-            base_info = {
-                '工艺ID': record.get('process_id', ''),
-                '材料': record.get('material', ''),
-                '反应物A': record.get('reactant_a', ''),
-                '反应物B': record.get('reactant_b', ''),
-                '反应物C': record.get('reactant_c', ''),
-                '反应物D': record.get('reactant_d', ''),
-                '备注': record.get('note', ''),
-                '贡献者': record.get('contributor', ''),
-                '已审核': '是' if record.get('reviewed', False) else '否',
-                '参考文献数量': len(record.get('references', []))
-            }
+        if streaming:
+            with atomic_path(filename) as tmp_filename:
+                write_records_streaming(save_data, tmp_filename, link_status=link_status)
+            print(f"Excel数据已保存到: {filename}")
+            print(f"保存记录数: {len(save_data)}")
             
-            # 处理参考文献
-            references = record.get('references', [])
-            if references:
-                # 合并所有DOI和URL
-                dois = [ref.get('doi', '') for ref in references if ref.get('doi', '')]
-                urls = [ref.get('url', '') for ref in references if ref.get('url', '')]
-                authors = [ref.get('author', '') for ref in references if ref.get('author', '')]
-                
-                base_info['DOI列表'] = '; '.join(dois) if dois else ''
-                base_info['URL链接'] = '; '.join(urls) if urls else ''
-                base_info['作者列表'] = '; '.join(authors) if authors else ''
-                base_info['总引用数'] = sum(int(ref.get('citations', '0')) for ref in references if ref.get('citations', '0').isdigit())
-            else:
-                base_info['DOI列表'] = ''
-                base_info['URL链接'] = ''
-                base_info['作者列表'] = ''
-                base_info['总引用数'] = 0
-            
-            excel_data.append(base_info)
+            # 同时发布最新版本（不带时间戳）
+            if filename != 'data/api_latest_data.xlsx':
+                publish_copy(filename, 'data/api_latest_data.xlsx')
+            return filename
         
-        # 创建DataFrame并保存到Excel
-        df = pd.DataFrame(excel_data)
+        # 一次展平生成主数据表和参考文献详情表
+        df, ref_df = build_excel_frames(save_data, link_status)
         
         # 使用ExcelWriter来设置格式
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+        with atomic_path(filename) as tmp_filename, pd.ExcelWriter(tmp_filename, engine='openpyxl') as writer:
             # 主数据表
             df.to_excel(writer, sheet_name='ALD工艺数据', index=False)
             
             # 获取工作表对象进行格式设置
             worksheet = writer.sheets['ALD工艺数据']
             
-            # 自动调整列宽
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)  # 最大宽度50
-                worksheet.column_dimensions[column_letter].width = adjusted_width
+            # 自动调整列宽（最大宽度50）
+            autofit_columns(worksheet, df, 50)
             
             # 如果有参考文献数据，创建详细的参考文献表
-            if any(record.get('references') for record in save_data):
-                ref_data = []
-                for record in save_data:
-                    process_id = record.get('process_id', '')
-                    material = record.get('material', '')
-                    for ref in record.get('references', []):
-                        ref_data.append({
-                            '工艺ID': process_id,
-                            '材料': material,
-                            'DOI': ref.get('doi', ''),
-                            'URL链接': ref.get('url', ''),
-                            '作者': ref.get('author', ''),
-                            '完整作者列表': ref.get('full_authors', ''),
-                            '引用数': ref.get('citations', '0'),
-                            '提交日期': ref.get('submitted', '')
-                        })
+            if not ref_df.empty:
+                ref_df.to_excel(writer, sheet_name='参考文献详情', index=False)
                 
-                if ref_data:
-                    ref_df = pd.DataFrame(ref_data)
-                    ref_df.to_excel(writer, sheet_name='参考文献详情', index=False)
-                    
-                    # 调整参考文献表格式
-                    ref_worksheet = writer.sheets['参考文献详情']
-                    for column in ref_worksheet.columns:
-                        max_length = 0
-                        column_letter = column[0].column_letter
-                        for cell in column:
-                            try:
-                                if len(str(cell.value)) > max_length:
-                                    max_length = len(str(cell.value))
-                            except:
-                                pass
-                        adjusted_width = min(max_length + 2, 60)  # 参考文献表最大宽度60
-                        ref_worksheet.column_dimensions[column_letter].width = adjusted_width
+                # 调整参考文献表格式
+                ref_worksheet = writer.sheets['参考文献详情']
+                autofit_columns(ref_worksheet, ref_df, 60)  # 参考文献表最大宽度60
         
         print(f"Excel数据已保存到: {filename}")
         print(f"保存记录数: {len(save_data)}")
         
-        # 同时保存最新版本（不带时间戳）
-        latest_filename = 'data/api_latest_data.xlsx'
-        df.to_excel(latest_filename, index=False)
+        # 同时发布最新版本（不带时间戳），与带时间戳的文件内容完全相同
+        if filename != 'data/api_latest_data.xlsx':
+            publish_copy(filename, 'data/api_latest_data.xlsx')
         
         return filename
     
     def generate_statistics(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """生成数据统计信息"""
-        stats = {
-            'total_records': len(data),
-            'materials': {},
-            'reactants': {},
-            'contributors': {},
-            'reviewed_count': 0,
-            'with_references': 0,
-            'total_references': 0,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        for record in data:
-            # 材料统计
-            material = record.get('material', '').strip()
-            if material:
-                stats['materials'][material] = stats['materials'].get(material, 0) + 1
-            
-            # 反应物统计
-            for reactant_key in ['reactant_a', 'reactant_b', 'reactant_c', 'reactant_d']:
-                reactant = record.get(reactant_key, '').strip()
-                if reactant:
-                    stats['reactants'][reactant] = stats['reactants'].get(reactant, 0) + 1
-            
-            # 贡献者统计
-            contributor = record.get('contributor', '').strip()
-            if contributor:
-                stats['contributors'][contributor] = stats['contributors'].get(contributor, 0) + 1
-            
-            # 审核状态统计
-            if record.get('reviewed', False):
-                stats['reviewed_count'] += 1
-            
-            # 参考文献统计
-            references = record.get('references', [])
-            if references:
-                stats['with_references'] += 1
-                stats['total_references'] += len(references)
-        
-        # 排序统计结果
-        stats['top_materials'] = dict(sorted(stats['materials'].items(), key=lambda x: x[1], reverse=True)[:20])
-        stats['top_reactants'] = dict(sorted(stats['reactants'].items(), key=lambda x: x[1], reverse=True)[:20])
-        stats['top_contributors'] = dict(sorted(stats['contributors'].items(), key=lambda x: x[1], reverse=True)[:10])
-        
-        return stats
+        return generate_statistics(data, timestamp=datetime.now().isoformat())
     
-    def save_statistics(self, stats: Dict[str, Any], test_mode: bool = False) -> str:
+    def save_statistics(self, stats: Dict[str, Any], filename: str = None, test_mode: bool = False) -> str:
         """保存统计信息"""
         os.makedirs('data', exist_ok=True)
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        if test_mode:
-            filename = f'data/api_test_statistics_{timestamp}.json'
-        else:
-            filename = f'data/api_statistics_{timestamp}.json'
+        if filename is None:
+            if test_mode:
+                filename = f'data/api_test_statistics_{timestamp}.json'
+            else:
+                filename = f'data/api_statistics_{timestamp}.json'
         
-        with open(filename, 'w', encoding='utf-8') as f:
+        with atomic_open(filename) as f:
             json.dump(stats, f, ensure_ascii=False, indent=2)
         
         print(f"统计信息已保存到: {filename}")
         return filename
     
-    def run(self, test_mode: bool = False, max_records: int = None) -> bool:
-        """运行爬虫"""
+    def save_columnar(self, data: List[Dict[str, Any]], fmt: str = 'parquet', test_mode: bool = False, max_records: int = None) -> Dict[str, str]:
+        """导出Parquet/Feather列式文件（工艺表 + 参考文献表）"""
+        from columnar_export import export_columnar
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if test_mode:
+            output_base = f'data/api_test_data_{timestamp}'
+        else:
+            output_base = f'data/api_full_data_{timestamp}'
+        
+        if test_mode and max_records is None:
+            max_records = 10
+        save_data = data[:max_records] if max_records else data
+        
+        paths = export_columnar(save_data, output_base, fmt)
+        for path in paths.values():
+            print(f"列式数据已保存到: {path}")
+        return paths
+    
+    def save_to_sqlite(self, data: List[Dict[str, Any]], db_file: str, test_mode: bool = False, max_records: int = None) -> str:
+        """将数据作为一次快照写入SQLite数据库"""
+        from sqlite_storage import SQLiteStorage
+        
+        if test_mode and max_records is None:
+            max_records = 10
+        save_data = data[:max_records] if max_records else data
+        
+        storage = SQLiteStorage(db_file)
+        try:
+            storage.save_snapshot(save_data)
+        finally:
+            storage.close()
+        return db_file
+    
+    def run(self, test_mode: bool = False, max_records: int = None, stream: bool = False, use_cache: bool = True,
+            incremental: bool = False, sqlite_file: str = None, columnar_format: str = None,
+            streaming_excel: bool = False, store_dir: str = None, enricher: DOIEnricher = None,
+            link_checker: LinkChecker = None, archive_file: str = None) -> bool:
+        """
+        运行爬虫
+        :param store_dir: 内容寻址快照存储目录，启用后快照只在内容变化时保存一份，
+                          data/ 下只保留最新版本的JSON、Excel和统计文件
+        :param enricher: DOI元数据补全器，保存前补全参考文献的引用数和作者列表
+        :param link_checker: DOI链接检查器，检查结果写入Excel参考文献详情表的链接状态列
+        :param archive_file: 从原始响应存档离线解析，不请求API
+        """
         print("=== ALD数据库API爬虫启动 ===")
         print(f"测试模式: {test_mode}")
         if max_records:
             print(f"最大记录数: {max_records}")
+        if stream:
+            print("流式解析: 已启用")
+        if incremental:
+            print("增量模式: 已启用")
+        
+        # 响应缓存只用于完整爬取，避免测试数据影响判断；离线解析存档时不涉及上游
+        use_cache = use_cache and not test_mode and not max_records and not archive_file
+        # 本地已有最新数据时才能跳过后续步骤
+        skip_unchanged = use_cache and os.path.exists(self.latest_data_file)
         
         # 获取原始数据
-        raw_data = self.fetch_data()
+        raw_data = self.fetch_data(stream=stream, use_cache=skip_unchanged, archive_file=archive_file)
+        if self.not_modified:
+            # 响应体未变但ETag/Last-Modified可能已更新，刷新后下次可直接得到304
+            if self.response_info.get('body_hash'):
+                self.cache.update(self.api_url, **self.response_info)
+            print("上游数据未变化，跳过处理和保存")
+            return True
         if not raw_data:
             print("数据获取失败")
             return False
         
-        # 处理数据
-        processed_data = self.process_data(raw_data)
+        # 处理数据（流式模式下边读取存档边解析）
+        try:
+            processed_data = self.process_data(raw_data)
+        except (OSError, EOFError) as e:
+            print(f"读取原始响应存档失败: {e}")
+            return False
+        except json.JSONDecodeError as e:
+            print(f"JSON解析错误: {e}")
+            print(f"可以使用 --from-archive {self.raw_archive_file} 离线重试解析")
+            return False
         if not processed_data:
             print("数据处理失败")
             return False
         
+        # 流式模式下响应体哈希在读取完成后才能得到
+        if skip_unchanged and self.cache.matches(self.api_url, self.response_info.get('body_hash')):
+            print("API数据未变化 (响应体哈希一致)，跳过保存")
+            self.cache.update(self.api_url, **self.response_info)
+            return True
+        
+        if test_mode and max_records is None:
+            max_records = 10
+        save_records = processed_data[:max_records] if max_records else processed_data
+        
+        # DOI元数据补全（原地更新参考文献，之后的所有输出都包含补全结果）
+        if enricher is not None:
+            enricher.enrich(save_records)
+        link_status = link_checker.check_records(save_records) if link_checker is not None else None
+        
+        # 内容寻址存储：记录集合与最新快照相同时只在清单中记录本次运行
+        if store_dir:
+            store = SnapshotStore(store_dir)
+            previous_latest = store.latest
+            snapshot_id, created = store.add(save_records)
+            compacted = store.compact()
+            print(f"快照 {snapshot_id[:12]} {'已保存' if created else '已存在，未重复保存'}"
+                  f"（存储占用 {store.disk_usage() / 1024:.1f} KB，本次压缩为差量 {compacted} 个）")
+            if snapshot_id == previous_latest and os.path.exists(self.latest_data_file):
+                print("记录内容与最新快照相同，跳过保存")
+                if use_cache:
+                    self.cache.update(self.api_url, **self.response_info)
+                return True
+        
         # 保存数据
-        data_file = self.save_data(processed_data, test_mode=test_mode, max_records=max_records)
+        if incremental:
+            # 增量模式只写出变更日志，并更新最新数据文件
+            changes = self.diff_records(self.build_fingerprint_index(), save_records)
+            summary = changes['summary']
+            print(f"增量对比: 新增 {summary['added']}，变更 {summary['changed']}，"
+                  f"删除 {summary['removed']}，未变化 {summary['unchanged']}")
+            
+            if not (summary['added'] or summary['changed'] or summary['removed']):
+                print("记录没有变化，跳过保存")
+                if use_cache:
+                    self.cache.update(self.api_url, **self.response_info)
+                return True
+            
+            data_file = self.save_changelog(changes, test_mode=test_mode)
+            self.save_latest(save_records)
+        elif store_dir:
+            # 带时间戳的快照由存储保存，这里只更新最新版本
+            data_file = self.save_latest(save_records)
+        else:
+            data_file = self.save_data(processed_data, test_mode=test_mode, max_records=max_records)
+        
+        # 最新数据已更新，同时生成全文索引
+        self.save_text_index(save_records)
         
         # 保存Excel文件（默认启用）
-        excel_file = self.save_to_excel(processed_data, test_mode=test_mode, max_records=max_records)
+        excel_file = self.save_to_excel(processed_data, filename='data/api_latest_data.xlsx' if store_dir else None,
+                                        test_mode=test_mode, max_records=max_records, streaming=streaming_excel,
+                                        link_status=link_status)
         
         # 生成和保存统计信息
-        stats = self.generate_statistics(processed_data[:max_records] if max_records else processed_data)
-        stats_file = self.save_statistics(stats, test_mode=test_mode)
+        stats = self.generate_statistics(save_records)
+        stats_file = self.save_statistics(stats, filename='data/api_latest_statistics.json' if store_dir else None,
+                                          test_mode=test_mode)
+        
+        # 可选的列式导出
+        columnar_files = {}
+        if columnar_format:
+            columnar_files = self.save_columnar(processed_data, columnar_format, test_mode=test_mode, max_records=max_records)
+        
+        # 可选的SQLite存储
+        if sqlite_file:
+            self.save_to_sqlite(processed_data, sqlite_file, test_mode=test_mode, max_records=max_records)
+        
+        # 所有文件保存成功后再更新响应缓存
+        if use_cache:
+            self.cache.update(self.api_url, **self.response_info)
         
         # 显示示例数据
         print("\n=== 数据示例 ===")
@@ -381,21 +617,85 @@ class ALDDatabaseAPICrawler:
         print(f"已审核记录: {stats['reviewed_count']}")
         print(f"包含参考文献的记录: {stats['with_references']}")
         print(f"总参考文献数: {stats['total_references']}")
-        print(f"JSON数据文件: {data_file}")
+        if incremental:
+            print(f"变更日志文件: {data_file}")
+        else:
+            print(f"数据文件: {data_file}")
         print(f"Excel数据文件: {excel_file}")
         print(f"统计文件: {stats_file}")
+        for path in columnar_files.values():
+            print(f"列式数据文件: {path}")
+        if sqlite_file:
+            print(f"SQLite数据库: {sqlite_file}")
         
         return True
 
 def main():
     parser = argparse.ArgumentParser(description='ALD数据库API爬虫')
+    parser.add_argument('command', nargs='?', choices=['crawl', 'serve'], default='crawl',
+                        help='crawl: 爬取数据（默认）；serve: 启动只读HTTP数据服务')
     parser.add_argument('--test', action='store_true', help='测试模式（限制记录数）')
     parser.add_argument('--max-records', type=int, help='最大记录数')
+    parser.add_argument('--stream', action='store_true', help='流式下载并逐条解析响应，降低内存峰值')
+    parser.add_argument('--no-cache', action='store_true', help='忽略响应缓存，强制完整下载和保存')
+    parser.add_argument('--incremental', action='store_true', help='增量模式：与上次的最新数据对比，只保存变更日志')
+    parser.add_argument('--sqlite', nargs='?', const='data/ald_database.sqlite', metavar='DB_FILE',
+                        help='同时写入SQLite数据库（默认: data/ald_database.sqlite）')
+    parser.add_argument('--columnar', choices=['parquet', 'feather'], help='同时导出列式文件（需要pyarrow）')
+    parser.add_argument('--streaming-excel', action='store_true', help='使用只写模式流式导出Excel，适合超大数据集')
+    parser.add_argument('--snapshot-format', choices=list(SNAPSHOT_FORMATS), default='json',
+                        help='数据快照格式（默认: json；jsonl.gz / jsonl.xz 为压缩的紧凑按行格式）')
+    parser.add_argument('--store', nargs='?', const='data/store', metavar='STORE_DIR',
+                        help='使用内容寻址快照存储，内容不变时不重复保存（默认: data/store）')
+    
+    parser.add_argument('--enrich-doi', action='store_true', help='查询DOI元数据，补全引用数和作者列表')
+    parser.add_argument('--doi-endpoint', default=DEFAULT_ENDPOINT,
+                        help='DOI元数据接口，{doi} 替换为DOI（默认: Crossref）')
+    parser.add_argument('--doi-concurrency', type=int, default=8, help='DOI查询的最大并发数（默认: 8）')
+    parser.add_argument('--doi-rate', type=float, default=10.0, help='DOI查询每秒最多请求数，0 为不限速（默认: 10）')
+    parser.add_argument('--doi-cache-ttl', type=float, default=30, help='DOI元数据缓存有效天数（默认: 30）')
+    parser.add_argument('--check-links', action='store_true', help='检查DOI链接能否解析，Excel参考文献表增加链接状态列')
+    parser.add_argument('--link-resolver', default=DOI_RESOLVER, help='DOI解析服务地址（默认: https://doi.org/）')
+    parser.add_argument('--link-concurrency', type=int, default=16, help='链接检查的并发数（默认: 16）')
+    
+    parser.add_argument('--retries', type=int, default=5, help='下载失败时的最大重试次数（默认: 5）')
+    parser.add_argument('--from-archive', metavar='ARCHIVE_FILE',
+                        help='解析已保存的原始响应存档（data/raw/api_raw_*.json.gz），不请求API')
+    
+    parser.add_argument('--host', default='127.0.0.1', help='serve: 监听地址（默认: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8000, help='serve: 监听端口（默认: 8000）')
+    parser.add_argument('--snapshot', help='serve: 提供服务的快照文件（默认: data目录下的最新数据文件）')
     
     args = parser.parse_args()
     
-    crawler = ALDDatabaseAPICrawler()
-    success = crawler.run(test_mode=args.test, max_records=args.max_records)
+    if args.command == 'serve':
+        from data_server import serve
+        try:
+            serve(args.host, args.port, args.snapshot)
+        except FileNotFoundError as e:
+            print(f"错误: {e}")
+            exit(1)
+        except OSError as e:
+            # 端口被占用、地址不可用或没有权限监听
+            print(f"错误: 无法在 {args.host}:{args.port} 启动服务: {e.strerror or e}")
+            exit(1)
+        return
+    
+    crawler = ALDDatabaseAPICrawler(snapshot_format=args.snapshot_format, retries=args.retries)
+    enricher = None
+    if args.enrich_doi:
+        enricher = DOIEnricher(args.doi_endpoint, concurrency=args.doi_concurrency, rate=args.doi_rate,
+                               cache=DOIMetadataCache(ttl_days=args.doi_cache_ttl),
+                               headers={'User-Agent': crawler.session.headers['User-Agent']})
+    link_checker = None
+    if args.check_links:
+        link_checker = LinkChecker(args.link_resolver, concurrency=args.link_concurrency,
+                                   headers={'User-Agent': crawler.session.headers['User-Agent']})
+    success = crawler.run(test_mode=args.test, max_records=args.max_records, stream=args.stream,
+                          use_cache=not args.no_cache, incremental=args.incremental, sqlite_file=args.sqlite,
+                          columnar_format=args.columnar, streaming_excel=args.streaming_excel,
+                          store_dir=args.store, enricher=enricher,
+                          link_checker=link_checker, archive_file=args.from_archive)
     
     if success:
         print("\n爬虫运行成功！")
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Selenium爬虫共用的浏览器工具
+按条件判断页面就绪，代替固定时长的 sleep：
+表格 .processList--table 的行数不再变化，并且 MutationObserver 在一段时间内没有观察到DOM变化，
+就认为React应用已渲染完成；超过上限时间仍未就绪时返回当前状态，由调用方决定是否继续
+
+页面自身会请求 api/processes.php，启用Chrome性能日志后可以从 Network 事件中找到这个请求，
+通过CDP Network.getResponseBody 直接取得响应JSON，不需要遍历表格行
+
+快速启动：解析出的驱动路径连同浏览器版本缓存在 data/.chromedriver_cache.json，浏览器主版本不变时
+不再调用 ChromeDriverManager().install()；用CDP Network.setBlockedURLs 屏蔽图片、字体、样式表等
+与数据无关的资源；可选的持久用户数据目录让HTTP缓存在多次运行之间保留
+
+紧凑提取：表格按列返回字符串表中的下标，而不是每行一个带重复键名的对象；
+字符串表在页面中跨分块累积，每块只传输新出现的字符串，每次 execute_script 最多处理 chunk_rows 行
+
+可以用本地保存的页面副本测试，例如:
+    python3 -m http.server 8765 --directory data/resources &
+    python3 final_crawler.py --url http://127.0.0.1:8765/page_YYYYMMDD_HHMMSS.html
+"""
+
+import base64
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.os_manager import ChromeType, OperationSystemManager
+
+from file_utils import atomic_open
+
+logger = logging.getLogger(__name__)
+
+TABLE_SELECTOR = '.processList--table'
+API_URL_FRAGMENT = 'api/processes.php'
+DRIVER_CACHE_FILE = 'data/.chromedriver_cache.json'
+DEFAULT_PROFILE_DIR = 'data/chrome_profile'
+DEFAULT_CHUNK_ROWS = 1000
+# 提取数据不需要的资源；表格由脚本渲染，屏蔽样式表不影响选择器
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.css', '*.mp4', '*.webm',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+]
+
+# 在页面中运行的异步脚本，最后一个参数是 WebDriver 提供的回调
+_READY_SCRIPT = """
+const [selector, minRows, quietMs, timeoutMs, done] = arguments;
+const start = performance.now();
+let lastChange = start;
+let lastRows = -1;
+let mutations = 0;
+const countRows = () => {
+    const table = document.querySelector(selector);
+    return table ? table.querySelectorAll('tr').length : 0;
+};
+const observer = new MutationObserver(records => {
+    mutations += records.length;
+    lastChange = performance.now();
+});
+observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+let timer = null;
+const finish = ready => {
+    observer.disconnect();
+    clearInterval(timer);
+    done({ready: ready, rows: countRows(), mutations: mutations,
+          waited_ms: performance.now() - start, since_navigation_ms: performance.now()});
+};
+timer = setInterval(() => {
+    const now = performance.now();
+    const rows = countRows();
+    if (rows !== lastRows) {
+        lastRows = rows;
+        lastChange = Math.max(lastChange, now);
+    }
+    if (document.readyState === 'complete' && rows >= minRows && now - lastChange >= quietMs) {
+        finish(true);
+    } else if (now - start >= timeoutMs) {
+        finish(false);
+    }
+}, 50);
+"""
+
+# 按 [start, start + limit) 提取表格行（第0行为标题行），规则与 page_extract.extract_table_rows 相同；
+# start 为 0 时重置页面中的字符串表，下标0固定为空串
+_COMPACT_TABLE_SCRIPT = """
+const [selector, start, limit] = arguments;
+const table = document.querySelector(selector);
+if (!table) return null;
+const rows = table.querySelectorAll('tr');
+if (start === 0 || !window.__compactStrings) {
+    window.__compactStrings = new Map([['', 0]]);
+}
+const index = window.__compactStrings;
+const stringBase = index.size;
+const strings = [];
+const intern = value => {
+    let id = index.get(value);
+    if (id === undefined) {
+        id = index.size;
+        index.set(value, id);
+        strings.push(value);
+    }
+    return id;
+};
+const columns = {material: [], reactantA: [], reactantB: [], reactantC: [], furtherReactants: []};
+const refCounts = [];
+const refNames = [];
+const refUrls = [];
+const end = Math.min(start + limit, rows.length);
+for (let i = Math.max(start, 1); i < end; i++) {
+    const cells = rows[i].querySelectorAll('td');
+    if (cells.length < 7 || rows[i].classList.contains('processList--subtitle')) continue;
+    const material = cells[1].textContent.trim();
+    const reactantA = cells[2].textContent.trim();
+    if (!(material || reactantA)) continue;
+    columns.material.push(intern(material));
+    columns.reactantA.push(intern(reactantA));
+    columns.reactantB.push(intern(cells[3].textContent.trim()));
+    columns.reactantC.push(intern(cells[4].textContent.trim()));
+    columns.furtherReactants.push(intern(cells[5].textContent.trim()));
+    const links = cells[6].querySelectorAll('a');
+    refCounts.push(links.length);
+    for (const link of links) {
+        refNames.push(intern(link.textContent.trim()));
+        refUrls.push(intern(link.href));
+    }
+}
+return {total: rows.length, next: end < rows.length ? end : null, stringBase: stringBase, strings: strings,
+        columns: columns, refCounts: refCounts, refNames: refNames, refUrls: refUrls};
+"""
+
+
+def wait_for_table_ready(driver, selector: str = TABLE_SELECTOR, timeout: float = 30.0, quiet: float = 0.5,
+                         min_rows: int = 2) -> Dict[str, Any]:
+    """
+    等待表格渲染完成：行数不少于 min_rows，且行数和DOM都已静止 quiet 秒
+    :param timeout: 最长等待秒数
+    :param min_rows: 最少行数（含标题行）
+    :return: {'ready', 'rows', 'mutations', 'waited', 'time_to_ready'}，
+             time_to_ready 为从导航开始到就绪的秒数
+    """
+    driver.set_script_timeout(timeout + 5)
+    start = time.perf_counter()
+    result = driver.execute_async_script(_READY_SCRIPT, selector, min_rows, int(quiet * 1000), int(timeout * 1000))
+    info = {
+        'ready': bool(result.get('ready')),
+        'rows': result.get('rows', 0),
+        'mutations': result.get('mutations', 0),
+        'waited': time.perf_counter() - start,
+        'time_to_ready': result.get('since_navigation_ms', 0) / 1000,
+    }
+    if info['ready']:
+        logger.info(f"页面就绪: 表格 {info['rows']} 行，导航开始后 {info['time_to_ready']:.2f} 秒"
+                    f"（加载后等待 {info['waited']:.2f} 秒，DOM变化 {info['mutations']} 次）")
+    else:
+        logger.warning(f"等待页面就绪超时（{timeout} 秒），当前表格 {info['rows']} 行")
+    return info
+
+
+def fetch_table_compact(driver, selector: str = TABLE_SELECTOR, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                        max_rows: int = None) -> List[Dict[str, Any]]:
+    """
+    分块提取表格，返回紧凑格式的分块列表，用 page_extract.compact_records 解码
+    :param chunk_rows: 每次 execute_script 处理的表格行数
+    :param max_rows: 取得的数据行达到该数量后不再请求后续分块（测试模式）
+    :return: 分块列表；页面中没有表格时为空列表
+    """
+    start = time.perf_counter()
+    chunks = []
+    rows = 0
+    offset = 0
+    while offset is not None:
+        chunk = driver.execute_script(_COMPACT_TABLE_SCRIPT, selector, offset, chunk_rows)
+        if chunk is None:
+            break
+        chunks.append(chunk)
+        rows += len(chunk['refCounts'])
+        offset = chunk['next']
+        if max_rows and rows >= max_rows:
+            break
+    if chunks:
+        strings = chunks[-1]['stringBase'] + len(chunks[-1]['strings'])
+        logger.info(f"紧凑提取: {rows} 行，{len(chunks)} 个分块，字符串表 {strings} 项，"
+                    f"耗时 {time.perf_counter() - start:.2f} 秒")
+    return chunks
+
+
+def enable_performance_logging(options):
+    """在创建驱动前调用：开启性能日志，ChromeDriver 会记录CDP Network事件"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def capture_json_response(driver, url_fragment: str = API_URL_FRAGMENT, timeout: float = 30.0,
+                          poll: float = 0.2) -> Any:
+    """
+    从性能日志中找到URL包含 url_fragment 的请求，等待加载完成后读取响应体并解析为JSON
+    驱动需要用 enable_performance_logging 开启性能日志
+    :param timeout: 最长等待秒数
+    """
+    start = time.perf_counter()
+    request_id = None
+    status = None
+    finished = set()
+    while time.perf_counter() - start < timeout:
+        for entry in driver.get_log('performance'):
+            message = json.loads(entry['message']).get('message', {})
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.responseReceived' and request_id is None:
+                response = params.get('response', {})
+                if url_fragment in response.get('url', ''):
+                    request_id = params['requestId']
+                    status = response.get('status')
+            elif method == 'Network.loadingFinished':
+                finished.add(params.get('requestId'))
+            elif method == 'Network.loadingFailed' and params.get('requestId') == request_id:
+                raise RuntimeError(f"请求 {url_fragment} 失败: {params.get('errorText', '')}")
+
+        if request_id is not None and request_id in finished:
+            if status and status >= 400:
+                raise RuntimeError(f"请求 {url_fragment} 返回 HTTP {status}")
+            result = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            body = base64.b64decode(result['body']) if result.get('base64Encoded') else result['body'].encode('utf-8')
+            logger.info(f"已从网络日志取得 {url_fragment} 的响应: {len(body) / 1024:.0f} KB，"
+                        f"等待 {time.perf_counter() - start:.2f} 秒")
+            return json.loads(body)
+        time.sleep(poll)
+
+    raise TimeoutError(f"{timeout} 秒内未捕获到 {url_fragment} 的响应")
+
+
+def _major_version(version: str) -> str:
+    return (version or '').split('.')[0]
+
+
+def resolve_driver_path(cache_file: str = DRIVER_CACHE_FILE, refresh: bool = False) -> Tuple[str, bool]:
+    """
+    Chrome驱动路径；缓存的驱动存在且浏览器主版本未变时直接使用，否则通过 webdriver-manager 解析
+    :param refresh: 忽略缓存重新解析
+    :return: (驱动路径, 是否使用了缓存)
+    """
+    browser_version = OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    if not refresh:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            cache = {}
+        path = cache.get('path')
+        if path and os.path.exists(path) and \
+                _major_version(cache.get('browser_version')) == _major_version(browser_version):
+            return path, True
+
+    path = ChromeDriverManager().install()
+    with atomic_open(cache_file) as f:
+        json.dump({'path': path, 'browser_version': browser_version, 'resolved': datetime.now().isoformat()},
+                  f, ensure_ascii=False, indent=2)
+    return path, False
+
+
+def block_resources(driver, patterns: Iterable[str] = BLOCKED_URL_PATTERNS):
+    """通过CDP屏蔽匹配的请求（支持 * 通配符）"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+
+
+def create_chrome_driver(options, block_patterns: Iterable[str] = None, user_data_dir: str = None,
+                         driver_cache: str = DRIVER_CACHE_FILE) -> Tuple[Any, Dict[str, Any]]:
+    """
+    创建Chrome驱动并记录启动耗时
+    :param block_patterns: 要屏蔽的URL模式，None 表示不屏蔽
+    :param user_data_dir: 持久的用户数据目录，HTTP缓存和Cookie在多次运行之间保留
+    :return: (驱动, 启动耗时信息)
+    """
+    timings = {'profile_reused': False}
+    if user_data_dir:
+        timings['profile_reused'] = os.path.isdir(user_data_dir) and bool(os.listdir(user_data_dir))
+        os.makedirs(user_data_dir, exist_ok=True)
+        options.add_argument(f'--user-data-dir={os.path.abspath(user_data_dir)}')
+
+    start = time.perf_counter()
+    path, cached = resolve_driver_path(driver_cache)
+    timings['driver_cached'] = cached
+    timings['driver_resolve'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        driver = webdriver.Chrome(service=Service(path), options=options)
+    except SessionNotCreatedException:
+        if not cached:
+            raise
+        # 浏览器已升级但主版本检测不到时，缓存的驱动可能不兼容
+        logger.warning("缓存的Chrome驱动无法启动浏览器，重新解析驱动")
+        path, cached = resolve_driver_path(driver_cache, refresh=True)
+        timings['driver_cached'] = False
+        driver = webdriver.Chrome(service=Service(path), options=options)
+    if block_patterns:
+        block_resources(driver, block_patterns)
+    timings['browser_start'] = time.perf_counter() - start
+
+    warm = timings['driver_cached'] and (timings['profile_reused'] or not user_data_dir)
+    logger.info(f"浏览器{'热' if warm else '冷'}启动: 驱动{'（缓存）' if timings['driver_cached'] else '（重新解析）'} "
+                f"{timings['driver_resolve']:.2f} 秒，浏览器 {timings['browser_start']:.2f} 秒"
+                f"{'，复用用户数据目录' if timings['profile_reused'] else ''}")
+    return driver, timings
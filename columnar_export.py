@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式导出工具
+将工艺记录导出为 Parquet / Feather 格式的工艺表和展开的参考文献表
+需要安装 pyarrow
+"""
+
+import os
+from typing import Dict, List, Any, Optional
+
+import pandas as pd
+
+from record_flatten import flatten_records
+
+COLUMNAR_FORMATS = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# 重复度高的字符串列使用字典编码（pandas category）
+DICTIONARY_COLUMNS = ['material', 'reactant_a', 'reactant_b', 'reactant_c', 'reactant_d', 'contributor']
+
+
+def build_process_frame(records: pd.DataFrame) -> pd.DataFrame:
+    """构建工艺表，每条工艺一行"""
+    df = records.drop(columns='references')
+    df['reference_count'] = records['references'].str.len()
+    for column in DICTIONARY_COLUMNS:
+        df[column] = df[column].astype('category')
+    return df
+
+
+def build_reference_frame(records: pd.DataFrame, refs: pd.DataFrame) -> pd.DataFrame:
+    """构建展开的参考文献表，每条参考文献一行"""
+    df = refs.copy()
+    df.insert(0, 'process_id', records['process_id'].loc[refs.index].to_numpy())
+    df.insert(1, 'position', refs.groupby(level=0).cumcount().to_numpy())
+    df['citations'] = pd.to_numeric(df['citations'], errors='coerce').astype('Int64')
+    df['author'] = df['author'].astype('category')
+    return df.reset_index(drop=True)
+
+
+def columnar_paths(output_base: str, fmt: str = 'parquet') -> Dict[str, str]:
+    """根据输出前缀生成工艺表和参考文献表的文件路径"""
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"不支持的列式格式: {fmt}")
+    suffix = COLUMNAR_FORMATS[fmt]
+    return {
+        'processes': f'{output_base}_processes{suffix}',
+        'references': f'{output_base}_references{suffix}',
+    }
+
+
+def export_columnar(data: List[Dict[str, Any]], output_base: str, fmt: str = 'parquet') -> Dict[str, str]:
+    """
+    导出工艺表和参考文献表
+    :param output_base: 输出文件前缀，如 data/api_full_data_20250708_160756
+    :param fmt: parquet 或 feather
+    :return: 表名 -> 文件路径
+    """
+    paths = columnar_paths(output_base, fmt)
+    directory = os.path.dirname(output_base)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    records, refs = flatten_records(data)
+    frames = {
+        'processes': build_process_frame(records),
+        'references': build_reference_frame(records, refs),
+    }
+    for table, df in frames.items():
+        if fmt == 'parquet':
+            df.to_parquet(paths[table], index=False, compression='zstd')
+        else:
+            df.to_feather(paths[table], compression='zstd')
+
+    return paths
+
+
+def load_columnar(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """读取列式文件，只加载指定的列"""
+    if path.endswith(COLUMNAR_FORMATS['feather']):
+        return pd.read_feather(path, columns=columns)
+    return pd.read_parquet(path, columns=columns)
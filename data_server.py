@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+只读HTTP数据服务
+启动时加载一次最新快照，在内存中维护按材料、反应物、贡献者、DOI的索引，
+查询结果带LRU缓存和ETag；快照文件被新的爬取结果替换后自动原子切换
+
+接口:
+    GET /processes?material=ZrO2&reactant=H2O2&any=0&limit=100&offset=0
+    GET /processes/<process_id>
+    GET /health
+
+用法:
+    python3 api_crawler.py serve --port 8000
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit, unquote
+
+from query import QueryIndex, build_index
+from snapshot_io import find_latest_snapshot, iter_records, snapshot_signature
+
+# 查询参数 -> 索引字段，同一参数可重复出现（OR）
+FILTER_PARAMS = ['material', 'reactant', 'reactant_a', 'reactant_b', 'reactant_c', 'reactant_d',
+                 'contributor', 'doi', 'reviewed']
+DEFAULT_LIMIT = 100
+# 单页最多返回的记录数，更大的 limit 按此截断
+MAX_LIMIT = 1000
+
+
+class DatasetState:
+    """一个快照的内存视图；切换快照时整体替换，请求处理期间不会看到一半新一半旧的数据"""
+
+    def __init__(self, snapshot_path: str, cache_size: int = 256):
+        self.snapshot_path = snapshot_path
+        self.signature = snapshot_signature(snapshot_path)
+        records = list(iter_records(snapshot_path))
+        self.index = QueryIndex(build_index(records), snapshot_path)
+        # 每条记录只序列化一次，响应直接拼接
+        self.record_json = [json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                            for record in records]
+        self.positions = {record.get('process_id'): position for position, record in enumerate(records)}
+        self.etag_prefix = self.signature['sha256'][:16]
+        self.loaded_at = datetime.now().isoformat()
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple, Tuple[str, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, key: Tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+        return f'"{self.etag_prefix}-{digest}"'
+
+    def cached(self, key: Tuple, render) -> Tuple[str, bytes]:
+        """LRU缓存的 (ETag, 响应体)"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = (self.etag(key), render())
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def query(self, filters: Dict[str, List[str]], match_any: bool, limit: int, offset: int) -> bytes:
+        positions = self.index.search(filters, match_any=match_any)
+        page = positions[offset:offset + limit]
+        head = json.dumps({'snapshot': self.etag_prefix, 'total': len(positions), 'count': len(page),
+                           'offset': offset}, ensure_ascii=False)[:-1].encode('utf-8')
+        return head + b',"records":[' + b','.join(self.record_json[position] for position in page) + b']}'
+
+    def health(self) -> bytes:
+        return json.dumps({'status': 'ok', 'snapshot': self.snapshot_path, 'records': len(self.record_json),
+                           'sha256': self.signature['sha256'], 'loaded_at': self.loaded_at},
+                          ensure_ascii=False).encode('utf-8')
+
+
+class DatasetServer(ThreadingHTTPServer):
+    """持有当前快照状态的HTTP服务器，后台线程检测快照变化并切换"""
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], snapshot_path: str = None, poll_interval: float = 2.0,
+                 cache_size: int = 256):
+        # 未指定快照时跟随最新数据文件，爬虫切换快照格式后改为读取新格式的文件
+        self.follow_latest = snapshot_path is None
+        self.snapshot_path = snapshot_path or find_latest_snapshot()
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            raise FileNotFoundError("未找到最新数据文件，请先运行 api_crawler.py")
+        self.cache_size = cache_size
+        self.state = DatasetState(self.snapshot_path, cache_size)
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        super().__init__(address, DatasetRequestHandler)
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        """快照被原子替换后（大小或修改时间变化）加载新快照，加载完成后一次性切换引用"""
+        while not self._stop.wait(self.poll_interval):
+            try:
+                snapshot_path = (self.follow_latest and find_latest_snapshot()) or self.snapshot_path
+                signature = snapshot_signature(snapshot_path, with_hash=False)
+                current = self.state.signature
+                if snapshot_path == self.snapshot_path and signature['size'] == current['size'] and \
+                        signature['mtime_ns'] == current['mtime_ns']:
+                    continue
+                state = DatasetState(snapshot_path, self.cache_size)
+            except (OSError, ValueError) as e:
+                print(f"加载新快照失败，继续使用当前快照: {e}")
+                continue
+            if state.signature['sha256'] != self.state.signature['sha256']:
+                print(f"已切换到新快照: {snapshot_path}，{len(state.record_json)} 条记录")
+            self.snapshot_path = snapshot_path
+            self.state = state
+
+    def server_close(self):
+        self._stop.set()
+        super().server_close()
+
+
+class DatasetRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ALDDataServer/1.0'
+    # 响应头和响应体分两次写出，关闭Nagle算法以免与客户端的延迟确认叠加出约40ms的等待
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any):
+        # 压测时逐条打印请求日志会成为瓶颈
+        pass
+
+    def _send(self, status: int, body: bytes = b'', etag: Optional[str] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        self._send(status, json.dumps({'error': message}, ensure_ascii=False).encode('utf-8'))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        # 整个请求使用同一个快照状态
+        state = self.server.state
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/')
+
+        if path == '/health':
+            self._send(200, state.health())
+            return
+
+        if path == '/processes':
+            params = parse_qs(url.query)
+            try:
+                limit = int(params.get('limit', [DEFAULT_LIMIT])[0])
+                offset = int(params.get('offset', [0])[0])
+            except ValueError:
+                self._error(400, 'limit/offset 必须是整数')
+                return
+            if limit < 0 or offset < 0:
+                self._error(400, 'limit/offset 不能为负数')
+                return
+            limit = min(limit, MAX_LIMIT)
+            filters = {name: params.get(name, []) for name in FILTER_PARAMS}
+            match_any = params.get('any', ['0'])[0] in ('1', 'true')
+            key = ('processes', tuple((name, tuple(values)) for name, values in filters.items() if values),
+                   match_any, limit, offset)
+            etag, body = state.cached(key, lambda: state.query(filters, match_any, limit, offset))
+        elif path.startswith('/processes/'):
+            process_id = unquote(path[len('/processes/'):])
+            position = state.positions.get(process_id)
+            if position is None:
+                self._error(404, f'工艺不存在: {process_id}')
+                return
+            etag, body = state.etag(('process', process_id)), state.record_json[position]
+        else:
+            self._error(404, '未知路径')
+            return
+
+        if etag in (value.strip() for value in self.headers.get('If-None-Match', '').split(',')):
+            self._send(304, etag=etag)
+            return
+        self._send(200, body, etag)
+
+
+def serve(host: str = '127.0.0.1', port: int = 8000, snapshot_path: str = None, poll_interval: float = 2.0):
+    """启动服务直到 Ctrl+C"""
+    server = DatasetServer((host, port), snapshot_path, poll_interval)
+    print(f"已加载 {server.snapshot_path}: {len(server.state.record_json)} 条记录")
+    print(f"服务地址: http://{host}:{server.server_address[1]}/processes")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n服务已停止")
+    finally:
+        server.server_close()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DOI元数据补全
+API返回的引用数几乎都是 "0"，作者也只有第一作者的姓。process_data 之后对所有记录中
+不重复的DOI（大量参考文献被多个工艺共用）查询元数据接口，补全引用数和缺失的作者列表
+
+- 有界并发：同时进行的请求数不超过 concurrency
+- 令牌桶限速：平均每秒不超过 rate 个请求，允许 burst 个突发
+- 失败重试：网络错误、429 和 5xx 按指数退避重试，优先遵循 Retry-After
+- 磁盘缓存：data/.doi_metadata_cache.json，过期前同一DOI不重复请求；404 也会缓存；
+  缓存按接口地址区分，指向测试服务时的结果不会被正式运行使用
+
+元数据接口默认为 Crossref（https://api.crossref.org/works/{doi}），
+可以指向任何返回 Crossref 格式JSON的地址，例如本地的测试服务：
+    python3 api_crawler.py --enrich-doi --doi-endpoint 'http://127.0.0.1:8765/works/{doi}'
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+
+from file_utils import atomic_open
+
+DEFAULT_ENDPOINT = 'https://api.crossref.org/works/{doi}'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def normalize_doi(doi: str) -> str:
+    """DOI不区分大小写"""
+    return doi.strip().lower()
+
+
+def cache_key(doi: str, source: str = '') -> str:
+    """缓存键：规范化的DOI，前面加上查询它的接口地址"""
+    doi = normalize_doi(doi)
+    return f'{source} {doi}' if source else doi
+
+
+def parse_metadata(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """从 Crossref 格式的响应中提取引用数、作者、标题、期刊和年份"""
+    message = payload.get('message', payload)
+    authors = [author.get('family') or author.get('name', '') for author in message.get('author') or []]
+    titles = message.get('title') or ['']
+    journals = message.get('container-title') or ['']
+    date_parts = (message.get('issued') or message.get('published') or {}).get('date-parts') or [[None]]
+    return {
+        'citations': message.get('is-referenced-by-count'),
+        'authors': [author for author in authors if author],
+        'title': titles[0] if isinstance(titles, list) else titles,
+        'journal': journals[0] if isinstance(journals, list) else journals,
+        'year': date_parts[0][0] if date_parts and date_parts[0] else None,
+    }
+
+
+class DOIMetadataCache:
+    """按 (接口地址, DOI) 持久化的元数据缓存，条目超过 ttl_days 后视为过期"""
+
+    def __init__(self, cache_file: str = 'data/.doi_metadata_cache.json', ttl_days: float = 30):
+        self.cache_file = cache_file
+        self.ttl = ttl_days * 86400
+        self.entries = self._load()
+        self.dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, doi: str, source: str = '') -> Optional[Dict[str, Any]]:
+        """
+        未过期的缓存条目 {'fetched', 'metadata'}，metadata 为 None 表示DOI不存在
+        :param source: 查询使用的接口地址，不同地址的结果分开缓存
+        """
+        entry = self.entries.get(cache_key(doi, source))
+        if entry and time.time() - entry.get('fetched', 0) < self.ttl:
+            return entry
+        return None
+
+    def put(self, doi: str, metadata: Optional[Dict[str, Any]], source: str = ''):
+        self.entries[cache_key(doi, source)] = {'fetched': time.time(), 'metadata': metadata}
+        self.dirty = True
+
+    def save(self):
+        """有新条目时写入磁盘"""
+        if not self.dirty:
+            return
+        with atomic_open(self.cache_file) as f:
+            json.dump(self.entries, f, ensure_ascii=False, separators=(',', ':'))
+        self.dirty = False
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积累 burst 个"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # 持锁等待，令牌按请求到达的顺序发放
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DOIEnricher:
+    """并发、限速、带缓存的DOI元数据查询"""
+
+    def __init__(self, endpoint: str = DEFAULT_ENDPOINT, concurrency: int = 8, rate: float = 10.0,
+                 burst: int = None, retries: int = 3, backoff: float = 1.0, timeout: float = 15,
+                 cache: DOIMetadataCache = None, headers: Dict[str, str] = None):
+        """
+        :param endpoint: 元数据接口，{doi} 会被替换为URL编码后的DOI
+        :param concurrency: 最大并发请求数
+        :param rate: 每秒最多请求数（令牌桶速率），0 表示不限速
+        :param burst: 令牌桶容量，默认等于并发数
+        :param retries: 可重试错误的最大重试次数
+        :param backoff: 第一次重试前的等待秒数，之后每次翻倍
+        """
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst or concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache if cache is not None else DOIMetadataCache()
+        self.headers = {'Accept': 'application/json'}
+        self.headers.update(headers or {})
+        # requests 是同步库，每个工作线程使用自己的会话以复用连接
+        self._local = threading.local()
+        self.stats = {}
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(self.headers)
+        return session
+
+    def _get(self, url: str) -> Tuple[int, Dict[str, str], bytes]:
+        response = self._session().get(url, timeout=self.timeout)
+        return response.status_code, response.headers, response.content
+
+    def _retry_delay(self, attempt: int, headers: Dict[str, str] = None) -> float:
+        retry_after = (headers or {}).get('Retry-After', '')
+        if retry_after.isdigit():
+            return float(retry_after)
+        # 加入随机抖动，避免同时失败的请求同时重试
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def fetch(self, doi: str, loop: asyncio.AbstractEventLoop, executor: ThreadPoolExecutor,
+                    semaphore: asyncio.Semaphore, bucket: Optional[TokenBucket]) -> Optional[Dict[str, Any]]:
+        """
+        查询单个DOI，结果写入缓存
+        :return: 元数据；DOI不存在时为 None；多次重试仍失败时抛出 RuntimeError
+        """
+        url = self.endpoint.format(doi=quote(doi, safe='/'))
+        for attempt in range(self.retries + 1):
+            if bucket is not None:
+                await bucket.acquire()
+            async with semaphore:
+                self.stats['requests'] += 1
+                try:
+                    status, headers, body = await loop.run_in_executor(executor, self._get, url)
+                except requests.exceptions.RequestException as e:
+                    status, headers, error = None, None, str(e)
+                else:
+                    if status == 200:
+                        try:
+                            metadata = parse_metadata(json.loads(body))
+                        except (ValueError, AttributeError, TypeError) as e:
+                            raise RuntimeError(f"{doi}: 无法解析的响应: {e}")
+                        self.cache.put(doi, metadata, self.endpoint)
+                        return metadata
+                    if status == 404:
+                        self.cache.put(doi, None, self.endpoint)
+                        return None
+                    error = f"HTTP {status}"
+                    if status not in RETRY_STATUSES:
+                        raise RuntimeError(f"{doi}: {error}")
+            if attempt < self.retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self._retry_delay(attempt, headers))
+        raise RuntimeError(f"{doi}: 重试 {self.retries} 次后仍失败（{error}）")
+
+    async def _resolve_all(self, dois: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate, self.burst) if self.rate > 0 else None
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            tasks = {doi: asyncio.ensure_future(self.fetch(doi, loop, executor, semaphore, bucket))
+                     for doi in dois}
+            await asyncio.wait(tasks.values())
+        for doi, task in tasks.items():
+            if task.exception() is not None:
+                self.stats['failed'] += 1
+                self.stats['errors'].append(str(task.exception()))
+            else:
+                results[doi] = task.result()
+        return results
+
+    def resolve(self, dois: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        查询一组DOI（去重，缓存命中的不发请求），返回 DOI -> 元数据；失败的DOI不在结果中
+        """
+        unique = list(dict.fromkeys(doi for doi in dois if doi))
+        self.stats = {'dois': len(unique), 'cached': 0, 'requests': 0, 'retries': 0, 'failed': 0,
+                      'errors': [], 'elapsed': 0.0}
+        results = {}
+        pending = []
+        for doi in unique:
+            entry = self.cache.get(doi, self.endpoint)
+            if entry is not None:
+                results[doi] = entry['metadata']
+            else:
+                pending.append(doi)
+        self.stats['cached'] = len(results)
+
+        start = time.perf_counter()
+        if pending:
+            try:
+                results.update(asyncio.run(self._resolve_all(pending)))
+            finally:
+                # 中断时也保留已查询到的结果
+                self.cache.save()
+        self.stats['elapsed'] = time.perf_counter() - start
+        return results
+
+    def enrich(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        补全记录中参考文献的引用数和缺失的作者列表（原地修改）
+        :return: 统计信息
+        """
+        references = [ref for record in records for ref in record.get('references') or [] if ref.get('doi')]
+        metadata = self.resolve(ref['doi'] for ref in references)
+
+        updated = 0
+        for ref in references:
+            meta = metadata.get(ref['doi'])
+            if not meta:
+                continue
+            changes = {}
+            if meta.get('citations') is not None and str(meta['citations']) != ref.get('citations'):
+                changes['citations'] = str(meta['citations'])
+            if not ref.get('full_authors') and meta.get('authors'):
+                changes['full_authors'] = ' '.join(meta['authors'])
+            if changes:
+                updated += 1
+                if isinstance(ref, dict):
+                    ref.update(changes)
+                else:
+                    for field, value in changes.items():
+                        setattr(ref, field, value)
+
+        stats = self.stats
+        stats['references'] = len(references)
+        stats['updated'] = updated
+        fetched = stats['dois'] - stats['cached'] - stats['failed']
+        rate = fetched / stats['elapsed'] if stats['elapsed'] else 0.0
+        print(f"DOI元数据: {stats['dois']} 个DOI（缓存命中 {stats['cached']}，查询 {fetched}，"
+              f"失败 {stats['failed']}，请求 {stats['requests']} 次，重试 {stats['retries']} 次），"
+              f"耗时 {stats['elapsed']:.1f} 秒，{rate:.1f} DOI/秒；更新参考文献 {updated} 条")
+        for error in stats['errors'][:5]:
+            print(f"  查询失败: {error}")
+        return stats
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel导出辅助工具
+api_crawler 和 json_to_excel 共用的工作表格式设置和流式写入
+"""
+
+from typing import Any, Dict, Iterable, List
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+# Excel单个工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+MAIN_COLUMNS = ['工艺ID', '材料', '反应物A', '反应物B', '反应物C', '反应物D', '备注', '贡献者', '已审核',
+                '参考文献数量', 'DOI列表', 'URL链接', '作者列表', '总引用数']
+REFERENCE_COLUMNS = ['工艺ID', '材料', 'DOI', 'URL链接', '作者', '完整作者列表', '引用数', '提交日期']
+# 检查过链接时参考文献详情表追加的列
+LINK_STATUS_COLUMN = '链接状态'
+
+
+def compute_column_widths(df: pd.DataFrame, max_width: int) -> List[int]:
+    """按列向量化计算列宽：表头和单元格文本的最大长度 + 2，不超过max_width"""
+    widths = []
+    for column in df.columns:
+        max_length = len(str(column))
+        if len(df):
+            max_length = max(max_length, int(df[column].astype(str).str.len().max()))
+        widths.append(min(max_length + 2, max_width))
+    return widths
+
+
+def apply_column_widths(worksheet, widths: List[int]):
+    """设置工作表列宽，不遍历单元格"""
+    for index, width in enumerate(widths, start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = width
+
+
+def autofit_columns(worksheet, df: pd.DataFrame, max_width: int):
+    """根据DataFrame内容自动调整工作表列宽"""
+    apply_column_widths(worksheet, compute_column_widths(df, max_width))
+
+
+def build_main_row(record: Dict[str, Any]) -> List[Any]:
+    """主数据表的一行"""
+    references = record.get('references', [])
+    return [
+        record.get('process_id', ''),
+        record.get('material', ''),
+        record.get('reactant_a', ''),
+        record.get('reactant_b', ''),
+        record.get('reactant_c', ''),
+        record.get('reactant_d', ''),
+        record.get('note', ''),
+        record.get('contributor', ''),
+        '是' if record.get('reviewed', False) else '否',
+        len(references),
+        '; '.join(ref.get('doi', '') for ref in references if ref.get('doi', '')),
+        '; '.join(ref.get('url', '') for ref in references if ref.get('url', '')),
+        '; '.join(ref.get('author', '') for ref in references if ref.get('author', '')),
+        sum(int(ref.get('citations', '0')) for ref in references if ref.get('citations', '0').isdigit())
+    ]
+
+
+def build_reference_rows(record: Dict[str, Any], link_status: Dict[str, str] = None) -> List[List[Any]]:
+    """
+    参考文献详情表中属于该记录的行
+    :param link_status: DOI -> 链接状态，提供时每行追加链接状态列
+    """
+    process_id = record.get('process_id', '')
+    material = record.get('material', '')
+    rows = [
+        [
+            process_id,
+            material,
+            ref.get('doi', ''),
+            ref.get('url', ''),
+            ref.get('author', ''),
+            ref.get('full_authors', ''),
+            ref.get('citations', '0'),
+            ref.get('submitted', '')
+        ]
+        for ref in record.get('references', [])
+    ]
+    if link_status is not None:
+        for row in rows:
+            row.append(link_status.get(row[2], ''))
+    return rows
+
+
+def build_statistics_rows(stats: Dict[str, Any]) -> List[List[Any]]:
+    """数据统计表的行（不含表头）"""
+    rows = [
+        ['总记录数', stats['total_records']],
+        ['已审核记录数', stats['reviewed_count']],
+        ['包含参考文献的记录数', stats['with_references']],
+        ['总参考文献数', stats['total_references']],
+        ['', ''],
+        ['热门材料 (前10)', '记录数'],
+    ]
+    
+    # 添加热门材料
+    for material, count in list(stats['top_materials'].items())[:10]:
+        rows.append([material, count])
+    
+    rows.extend([['', ''], ['热门反应物 (前10)', '记录数']])
+    
+    # 添加热门反应物
+    for reactant, count in list(stats['top_reactants'].items())[:10]:
+        rows.append([reactant, count])
+    
+    return rows
+
+
+class StatisticsAccumulator:
+    """逐条累计统计信息，流式导出和 generate_statistics 共用同一套统计规则"""
+    
+    def __init__(self):
+        self.stats = {
+            'total_records': 0,
+            'materials': {},
+            'reactants': {},
+            'contributors': {},
+            'reviewed_count': 0,
+            'with_references': 0,
+            'total_references': 0
+        }
+    
+    def add(self, record: Dict[str, Any]):
+        stats = self.stats
+        stats['total_records'] += 1
+        
+        material = record.get('material', '').strip()
+        if material:
+            stats['materials'][material] = stats['materials'].get(material, 0) + 1
+        
+        for reactant_key in ['reactant_a', 'reactant_b', 'reactant_c', 'reactant_d']:
+            reactant = record.get(reactant_key, '').strip()
+            if reactant:
+                stats['reactants'][reactant] = stats['reactants'].get(reactant, 0) + 1
+        
+        contributor = record.get('contributor', '').strip()
+        if contributor:
+            stats['contributors'][contributor] = stats['contributors'].get(contributor, 0) + 1
+        
+        if record.get('reviewed', False):
+            stats['reviewed_count'] += 1
+        
+        references = record.get('references', [])
+        if references:
+            stats['with_references'] += 1
+            stats['total_references'] += len(references)
+    
+    def result(self, **extra: Any) -> Dict[str, Any]:
+        """
+        统计结果
+        :param extra: 附加字段（如 timestamp），排在排序结果之前
+        """
+        stats = self.stats
+        stats.update(extra)
+        stats['top_materials'] = dict(sorted(stats['materials'].items(), key=lambda x: x[1], reverse=True)[:20])
+        stats['top_reactants'] = dict(sorted(stats['reactants'].items(), key=lambda x: x[1], reverse=True)[:20])
+        stats['top_contributors'] = dict(sorted(stats['contributors'].items(), key=lambda x: x[1], reverse=True)[:10])
+        return stats
+
+
+def generate_statistics(records: Iterable[Dict[str, Any]], **extra: Any) -> Dict[str, Any]:
+    """生成数据统计信息（材料、反应物、贡献者、审核状态和参考文献）"""
+    accumulator = StatisticsAccumulator()
+    for record in records:
+        accumulator.add(record)
+    return accumulator.result(**extra)
+
+
+class StreamingExcelWriter:
+    """
+    基于openpyxl只写工作表的流式Excel写入器
+    行直接写入临时文件，不在内存中构建工作簿；超过Excel行数上限时自动续写到新工作表
+    """
+    
+    def __init__(self, filename: str, sample_rows: int = 1000):
+        """
+        :param filename: 输出文件路径
+        :param sample_rows: 每个工作表先缓存的行数，用于计算列宽
+        """
+        self.filename = filename
+        self.sample_rows = sample_rows
+        self.workbook = Workbook(write_only=True)
+        self._sheets = {}
+    
+    def add_sheet(self, title: str, headers: List[str], max_width: int = None, widths: List[int] = None):
+        """
+        注册工作表，第一次写入时才创建
+        :param max_width: 根据前sample_rows行自动计算列宽时的上限
+        :param widths: 固定列宽，优先于自动计算
+        """
+        self._sheets[title] = {
+            'headers': headers,
+            'max_width': max_width,
+            'widths': widths,
+            'buffer': [],
+            'worksheet': None,
+            'part': 0,
+            'rows': 0
+        }
+    
+    def append(self, title: str, row: List[Any]):
+        """追加一行"""
+        sheet = self._sheets[title]
+        if sheet['worksheet'] is None and len(sheet['buffer']) < self.sample_rows:
+            sheet['buffer'].append(row)
+            return
+        self._flush(title)
+        self._write(sheet, title, row)
+    
+    def extend(self, title: str, rows: Iterable[List[Any]]):
+        for row in rows:
+            self.append(title, row)
+    
+    def _flush(self, title: str):
+        """根据缓存的样本行确定列宽，创建工作表并写出缓存"""
+        sheet = self._sheets[title]
+        if sheet['worksheet'] is not None:
+            return
+        # 先创建注册顺序在前的工作表，保持工作表顺序稳定
+        for other_title, other in self._sheets.items():
+            if other_title == title:
+                break
+            if other['worksheet'] is None and other['buffer']:
+                self._flush(other_title)
+        if sheet['widths'] is None and sheet['max_width']:
+            sample = pd.DataFrame(sheet['buffer'], columns=sheet['headers'])
+            sheet['widths'] = compute_column_widths(sample, sheet['max_width'])
+        self._new_part(sheet, title)
+        buffer, sheet['buffer'] = sheet['buffer'], []
+        for row in buffer:
+            self._write(sheet, title, row)
+    
+    def _new_part(self, sheet: Dict[str, Any], title: str):
+        sheet['part'] += 1
+        sheet_title = title if sheet['part'] == 1 else f"{title}_{sheet['part']}"
+        worksheet = self.workbook.create_sheet(sheet_title)
+        if sheet['widths']:
+            apply_column_widths(worksheet, sheet['widths'])
+        worksheet.append(sheet['headers'])
+        sheet['worksheet'] = worksheet
+        sheet['rows'] = 1
+    
+    def _write(self, sheet: Dict[str, Any], title: str, row: List[Any]):
+        if sheet['rows'] >= EXCEL_MAX_ROWS:
+            self._new_part(sheet, title)
+        sheet['worksheet'].append(row)
+        sheet['rows'] += 1
+    
+    def save(self):
+        # 没有数据行的工作表也写出表头，工作簿至少有一个工作表才能保存
+        for title in self._sheets:
+            self._flush(title)
+        self.workbook.save(self.filename)
+
+
+def write_records_streaming(records: Iterable[Dict[str, Any]], filename: str,
+                            include_statistics: bool = False, link_status: Dict[str, str] = None) -> int:
+    """
+    单次遍历记录，流式写出主数据表、参考文献详情表和（可选）数据统计表
+    :param link_status: DOI -> 链接状态，提供时参考文献详情表增加链接状态列
+    :return: 写入的记录数
+    """
+    writer = StreamingExcelWriter(filename)
+    writer.add_sheet('ALD工艺数据', MAIN_COLUMNS, max_width=50)
+    reference_columns = REFERENCE_COLUMNS + [LINK_STATUS_COLUMN] if link_status is not None else REFERENCE_COLUMNS
+    writer.add_sheet('参考文献详情', reference_columns, max_width=60)
+    accumulator = StatisticsAccumulator()
+    
+    count = 0
+    for record in records:
+        writer.append('ALD工艺数据', build_main_row(record))
+        writer.extend('参考文献详情', build_reference_rows(record, link_status))
+        if include_statistics:
+            accumulator.add(record)
+        count += 1
+    
+    if include_statistics:
+        writer.add_sheet('数据统计', ['统计项目', '数值'], widths=[30, 15])
+        writer.extend('数据统计', build_statistics_rows(accumulator.result()))
+    
+    writer.save()
+    return count
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件写入工具
+原子写入和"最新版本"文件的发布，读者不会看到写了一半的文件
+"""
+
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Iterator
+
+# Linux FICLONE ioctl，支持的文件系统（btrfs、xfs等）上可以零拷贝克隆文件
+_FICLONE = 0x40049409
+
+
+def _temp_path(path: str) -> str:
+    """与目标文件同目录的临时文件名，保留扩展名"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.tmp-{os.getpid()}{os.path.splitext(name)[1]}")
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """
+    产生一个临时路径供写入，成功后原子替换到目标路径
+    用法: with atomic_path('data/a.xlsx') as tmp: workbook.save(tmp)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = _temp_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w', encoding: str = 'utf-8'):
+    """以原子方式写入文本或二进制文件"""
+    with atomic_path(path) as tmp_path:
+        if 'b' in mode:
+            f = open(tmp_path, mode)
+        else:
+            f = open(tmp_path, mode, encoding=encoding)
+        with f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """尝试写时复制克隆，不支持时返回False"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+def publish_copy(src: str, dst: str) -> str:
+    """
+    将已写好的文件发布为另一个路径（如"最新版本"），不重新序列化
+    依次尝试硬链接、写时复制克隆、普通复制，最后原子替换目标文件
+    :return: 使用的方式 link / reflink / copy
+    """
+    with atomic_path(dst) as tmp_path:
+        try:
+            os.link(src, tmp_path)
+            return 'link'
+        except OSError:
+            pass
+        if _reflink(src, tmp_path):
+            return 'reflink'
+        shutil.copyfile(src, tmp_path)
+        return 'copy'
@@ -8,23 +8,45 @@
 import json
 import os
 import time
-from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 import logging
 from datetime import datetime
 
+from api_crawler import ALDDatabaseAPICrawler
+from browser_utils import (BLOCKED_URL_PATTERNS, DEFAULT_CHUNK_ROWS, DEFAULT_PROFILE_DIR, capture_json_response,
+                           create_chrome_driver, enable_performance_logging, fetch_table_compact,
+                           wait_for_table_ready)
+from file_utils import atomic_open, publish_copy
+from page_extract import compact_records, is_compact_payload, table_records
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class FinalResearchDatabaseCrawler:
-    def __init__(self, test_mode=False, max_records=None):
+    def __init__(self, test_mode=False, max_records=None, base_url=None, ready_timeout=30, capture_network=False,
+                 block_resources=True, user_data_dir=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        :param base_url: 页面地址，可以指向本地保存的页面副本
+        :param ready_timeout: 等待表格渲染完成（或捕获API响应）的最长秒数
+        :param capture_network: 从浏览器网络日志中取得页面请求的 api/processes.php 响应，
+                                交给 ALDDatabaseAPICrawler 处理，输出与API爬虫相同格式的数据
+        :param block_resources: 屏蔽图片、字体、样式表等与数据无关的资源
+        :param user_data_dir: 持久的Chrome用户数据目录，HTTP缓存在多次运行之间保留
+        :param chunk_rows: 提取表格时每次 execute_script 处理的行数
+        """
         self.test_mode = test_mode
         self.max_records = max_records if max_records else (10 if test_mode else None)
         self.driver = None
-        self.base_url = "https://www.atomiclimits.com/alddatabase/"
+        self.base_url = base_url or "https://www.atomiclimits.com/alddatabase/"
+        self.ready_timeout = ready_timeout
+        self.ready_info = {}
+        self.capture_network = capture_network
+        self.api_crawler = ALDDatabaseAPICrawler() if capture_network else None
+        self.block_resources = block_resources
+        self.user_data_dir = user_data_dir
+        self.chunk_rows = chunk_rows
+        self.startup_info = {}
         
         # 创建数据目录
         self.data_dir = "data"
@@ -49,9 +71,15 @@ class FinalResearchDatabaseCrawler:
             if not self.test_mode:
                 chrome_options.add_argument('--headless')
             
-            # 使用webdriver-manager自动管理驱动
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # 记录CDP Network事件，用于读取页面自身的API响应
+            if self.capture_network:
+                enable_performance_logging(chrome_options)
+            
+            # 驱动路径缓存（浏览器版本不变时不再调用webdriver-manager），可选屏蔽资源和持久用户数据目录
+            self.driver, self.startup_info = create_chrome_driver(
+                chrome_options,
+                block_patterns=BLOCKED_URL_PATTERNS if self.block_resources else None,
+                user_data_dir=self.user_data_dir)
             
             logger.info("Chrome驱动初始化成功")
             
@@ -63,10 +91,15 @@ class FinalResearchDatabaseCrawler:
         """访问目标网站"""
         try:
             logger.info(f"正在访问: {self.base_url}")
+            start = time.perf_counter()
             self.driver.get(self.base_url)
+            self.startup_info['page_load'] = time.perf_counter() - start
+            logger.info(f"页面加载: {self.startup_info['page_load']:.2f} 秒")
             
-            # 等待页面加载
-            time.sleep(8)
+            # 等待表格渲染完成（行数和DOM静止），而不是固定等待；
+            # 捕获网络响应时由 extract_from_network 等待API请求完成
+            if not self.capture_network:
+                self.ready_info = wait_for_table_ready(self.driver, timeout=self.ready_timeout)
             
             # 检查页面是否正确加载
             title = self.driver.title
@@ -81,73 +114,47 @@ class FinalResearchDatabaseCrawler:
             logger.error(f"访问网站失败: {e}")
             raise
     
+    def extract_from_network(self):
+        """从网络日志取得 api/processes.php 的响应JSON，由API爬虫的 process_data 处理"""
+        try:
+            logger.info("正在从浏览器网络日志捕获API响应...")
+            payload = capture_json_response(self.driver, timeout=self.ready_timeout)
+            if not payload.get('success', False):
+                raise Exception("API返回失败状态")
+            logger.info(f"获取到 {len(payload.get('processes', []))} 条工艺记录，"
+                        f"{len(payload.get('references', []))} 条参考文献")
+            return self.api_crawler.process_data(payload)
+        except Exception as e:
+            logger.error(f"捕获API响应失败: {e}")
+            self.save_debug_info()
+            raise
+    
+    def save_api_data(self, data):
+        """使用API爬虫的保存流程：JSON、Excel和统计文件与 api_crawler.py 的输出相同"""
+        api = self.api_crawler
+        api.save_data(data, test_mode=self.test_mode, max_records=self.max_records)
+        api.save_to_excel(data, test_mode=self.test_mode, max_records=self.max_records)
+        save_records = data[:self.max_records] if self.max_records else data
+        api.save_statistics(api.generate_statistics(save_records), test_mode=self.test_mode)
+    
     def extract_data(self):
         """提取数据"""
+        if self.capture_network:
+            return self.extract_from_network()
         try:
             logger.info("开始提取数据...")
             
-            # 数据提取脚本
-            extraction_script = """
-            return (() => {
-                const table = document.querySelector('.processList--table');
-                if (!table) {
-                    console.log('未找到表格');
-                    return [];
-                }
-                
-                const rows = Array.from(table.querySelectorAll('tr'));
-                const result = [];
-                
-                console.log('找到表格，行数:', rows.length);
-                
-                // 跳过标题行，从第二行开始
-                for (let i = 1; i < rows.length; i++) {
-                    const cells = Array.from(rows[i].querySelectorAll('td'));
-                    if (cells.length < 7) continue;
-                    
-                    // 跳过副标题行（如"Lithium"这样的元素名称行）
-                    const isSubtitle = rows[i].classList.contains('processList--subtitle');
-                    if (isSubtitle) {
-                        console.log('跳过副标题行:', cells[1] ? cells[1].textContent.trim() : '');
-                        continue;
-                    }
-                    
-                    const refCell = cells[6];
-                    const links = Array.from(refCell.querySelectorAll('a'));
-                    
-                    // 只处理有实际数据的行
-                    const material = cells[1].textContent.trim();
-                    const reactantA = cells[2].textContent.trim();
-                    
-                    if (material || reactantA) {
-                        const record = {
-                            material: material,
-                            reactantA: reactantA,
-                            reactantB: cells[3].textContent.trim(),
-                            reactantC: cells[4].textContent.trim(),
-                            furtherReactants: cells[5].textContent.trim(),
-                            references: links.map(link => ({
-                                name: link.textContent.trim(),
-                                url: link.href
-                            }))
-                        };
-                        result.push(record);
-                    }
-                }
-                
-                console.log('提取完成，总记录数:', result.length);
-                return result;
-            })();
-            """
-            
-            raw_data = self.driver.execute_script(extraction_script)
-            
-            if not raw_data:
+            # 按列返回字符串表下标，分块调用 execute_script；测试模式取够行数后不再请求后续分块
+            max_rows = self.max_records if self.test_mode else None
+            raw_data = fetch_table_compact(self.driver, chunk_rows=self.chunk_rows, max_rows=max_rows)
+            
+            rows = sum(len(chunk['refCounts']) for chunk in raw_data)
+            if not rows:
                 logger.warning("未提取到数据")
                 self.save_debug_info()
                 raise Exception("未能提取到数据")
             
-            logger.info(f"成功提取到 {len(raw_data)} 条原始数据")
+            logger.info(f"成功提取到 {rows} 条原始数据")
             
             # 处理数据
             processed_data = self.process_data(raw_data)
@@ -160,45 +167,17 @@ class FinalResearchDatabaseCrawler:
             raise
     
     def process_data(self, raw_data):
-        """处理和清理数据"""
-        processed_data = []
-        
-        for i, item in enumerate(raw_data):
-            # 创建数据记录
-            record = {}
-            
-            # Material字段
-            if item['material']:
-                record['Material'] = item['material']
-            
-            # Reactant A字段
-            if item['reactantA']:
-                record['Reactant A'] = item['reactantA']
-            
-            # Reactant B字段
-            if item['reactantB']:
-                record['Reactant B'] = item['reactantB']
-            
-            # Reactant C字段
-            if item['reactantC']:
-                record['Reactant C'] = item['reactantC']
-            
-            # Further reactants字段
-            if item['furtherReactants']:
-                record['Further reactants'] = item['furtherReactants']
-            
-            # References字段
-            if item['references'] and len(item['references']) > 0:
-                record['References'] = item['references']
-            
-            # 只添加有实际内容的记录
-            if len(record) > 0:
-                processed_data.append(record)
-                
-            # 测试模式：只保存前N条数据
-            if self.test_mode and self.max_records and len(processed_data) >= self.max_records:
-                logger.info(f"测试模式：已达到最大记录数 {self.max_records}")
-                break
+        """
+        处理和清理数据（与 page_extract.py 离线提取共用转换规则）
+        :param raw_data: fetch_table_compact 返回的紧凑分块，或提取脚本返回的行字典列表
+        """
+        max_records = self.max_records if self.test_mode else None
+        if is_compact_payload(raw_data):
+            processed_data = compact_records(raw_data, max_records)
+        else:
+            processed_data = table_records(raw_data, max_records)
+        if max_records and len(processed_data) >= max_records:
+            logger.info(f"测试模式：已达到最大记录数 {self.max_records}")
         
         logger.info(f"数据处理完成，有效记录 {len(processed_data)} 条")
         return processed_data
@@ -216,15 +195,13 @@ class FinalResearchDatabaseCrawler:
             filepath = os.path.join(self.data_dir, filename)
             
             # 保存主数据文件
-            with open(filepath, 'w', encoding='utf-8') as f:
+            with atomic_open(filepath) as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             
-            # 同时保存一个最新版本（不带时间戳）
+            # 同时发布一个最新版本（不带时间戳），复用同一份文件内容
             latest_filename = "test_data.json" if self.test_mode else "research_database.json"
             latest_filepath = os.path.join(self.data_dir, latest_filename)
-            
-            with open(latest_filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            publish_copy(filepath, latest_filepath)
             
             logger.info(f"数据已保存到: {filepath}")
             logger.info(f"最新数据: {latest_filepath}")
@@ -319,7 +296,9 @@ class FinalResearchDatabaseCrawler:
                 'timestamp': datetime.now().isoformat(),
                 'url': self.driver.current_url,
                 'title': self.driver.title,
-                'page_source_length': len(self.driver.page_source)
+                'page_source_length': len(self.driver.page_source),
+                'ready': self.ready_info,
+                'startup': self.startup_info
             }
             
             debug_filepath = os.path.join(self.debug_dir, f"debug_info_{timestamp}.json")
@@ -353,7 +332,10 @@ class FinalResearchDatabaseCrawler:
             data = self.extract_data()
             
             # 保存数据
-            self.save_data(data)
+            if self.capture_network:
+                self.save_api_data(data)
+            else:
+                self.save_data(data)
             
             logger.info("爬虫运行完成！")
             return True
@@ -374,6 +356,15 @@ def main():
     parser.add_argument('--test', action='store_true', help='测试模式，只保存前N条数据')
     parser.add_argument('--max-records', type=int, default=10, help='测试模式下的最大记录数')
     parser.add_argument('--full', action='store_true', help='完整模式，提取所有数据')
+    parser.add_argument('--url', help='页面地址（默认: 数据库网站；可以指向本地保存的页面副本）')
+    parser.add_argument('--ready-timeout', type=float, default=30, help='等待表格渲染完成的最长秒数（默认: 30）')
+    parser.add_argument('--capture-network', action='store_true',
+                        help='从浏览器网络日志读取页面请求的API响应，输出与 api_crawler.py 相同格式的数据')
+    parser.add_argument('--no-block', action='store_true', help='不屏蔽图片、字体、样式表等资源')
+    parser.add_argument('--user-data-dir', nargs='?', const=DEFAULT_PROFILE_DIR, metavar='DIR',
+                        help=f'使用持久的Chrome用户数据目录，保留HTTP缓存（默认: {DEFAULT_PROFILE_DIR}）')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'提取表格时每次脚本调用处理的行数（默认: {DEFAULT_CHUNK_ROWS}）')
     
     args = parser.parse_args()
     
@@ -386,7 +377,10 @@ def main():
         max_records = args.max_records
     
     # 创建并运行爬虫
-    crawler = FinalResearchDatabaseCrawler(test_mode=test_mode, max_records=max_records)
+    crawler = FinalResearchDatabaseCrawler(test_mode=test_mode, max_records=max_records, base_url=args.url,
+                                           ready_timeout=args.ready_timeout, capture_network=args.capture_network,
+                                           block_resources=not args.no_block, user_data_dir=args.user_data_dir,
+                                           chunk_rows=args.chunk_rows)
     success = crawler.run()
     
     if success:
@@ -8,31 +8,38 @@
 
 import json
 import os
-import time
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import logging
 
+from browser_utils import DEFAULT_CHUNK_ROWS, fetch_table_compact, resolve_driver_path, wait_for_table_ready
+from page_extract import compact_records
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class ImprovedResearchDatabaseCrawler:
-    def __init__(self, test_mode=False, max_records=10):
+    def __init__(self, test_mode=False, max_records=10, base_url=None, ready_timeout=30,
+                 chunk_rows=DEFAULT_CHUNK_ROWS):
         """
         初始化爬虫
         :param test_mode: 是否为测试模式，只保存前10条数据
         :param max_records: 测试模式下的最大记录数
+        :param base_url: 页面地址，可以指向本地保存的页面副本
+        :param ready_timeout: 等待表格渲染完成的最长秒数
+        :param chunk_rows: 提取表格时每次 execute_script 处理的行数
         """
         self.test_mode = test_mode
         self.max_records = max_records
-        self.base_url = "https://www.atomiclimits.com/alddatabase/"
+        self.base_url = base_url or "https://www.atomiclimits.com/alddatabase/"
+        self.ready_timeout = ready_timeout
+        self.chunk_rows = chunk_rows
+        self.ready_info = {}
         self.data_dir = "data"
         self.driver = None
         
@@ -51,8 +58,9 @@ class ImprovedResearchDatabaseCrawler:
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
         
         try:
-            # 使用webdriver-manager自动下载和管理Chrome驱动
-            service = Service(ChromeDriverManager().install())
+            # 使用webdriver-manager自动下载和管理Chrome驱动，解析结果按浏览器版本缓存
+            driver_path, _ = resolve_driver_path()
+            service = Service(driver_path)
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
             logger.info("Chrome驱动初始化成功")
         except Exception as e:
@@ -65,14 +73,9 @@ class ImprovedResearchDatabaseCrawler:
             logger.info(f"正在访问: {self.base_url}")
             self.driver.get(self.base_url)
             
-            # 等待页面基本加载完成
-            WebDriverWait(self.driver, 30).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            
-            # 等待React应用加载完成，寻找任何包含数据的元素
+            # 等待React应用渲染完成：表格行数和DOM都静止后即可提取，不再固定等待
             logger.info("等待React应用加载...")
-            time.sleep(10)  # 给React应用更多时间加载
+            self.ready_info = wait_for_table_ready(self.driver, timeout=self.ready_timeout)
             
             # 检查页面是否有实际内容
             body_text = self.driver.find_element(By.TAG_NAME, "body").text
@@ -108,71 +111,26 @@ class ImprovedResearchDatabaseCrawler:
             
             logger.info(f"页面信息: {page_info}")
             
-            # 使用正确的数据提取脚本
-            data_extraction_script = """
-            (() => {
-                const table = document.querySelector('.processList--table');
-                if (!table) return [];
-                
-                const rows = Array.from(table.querySelectorAll('tr'));
-                const result = [];
-                
-                // 跳过标题行，从第二行开始
-                for (let i = 1; i < rows.length; i++) {
-                    const cells = Array.from(rows[i].querySelectorAll('td'));
-                    if (cells.length < 7) continue;
-                    
-                    // 跳过副标题行（如"Lithium"这样的元素名称行）
-                    const isSubtitle = rows[i].classList.contains('processList--subtitle');
-                    if (isSubtitle) continue;
-                    
-                    const refCell = cells[6];
-                    const links = Array.from(refCell.querySelectorAll('a'));
-                    
-                    // 只处理有实际数据的行
-                    const material = cells[1].textContent.trim();
-                    const reactantA = cells[2].textContent.trim();
-                    
-                    if (material || reactantA) {
-                        result.push({
-                            material: material,
-                            reactantA: reactantA,
-                            reactantB: cells[3].textContent.trim(),
-                            reactantC: cells[4].textContent.trim(),
-                            furtherReactants: cells[5].textContent.trim(),
-                            references: links.map(link => ({
-                                name: link.textContent.trim(),
-                                url: link.href
-                            }))
-                        });
-                    }
-                }
-                return result;
-            })()
-            """
-            
+            # 紧凑提取：按列返回字符串表下标，分块调用 execute_script
             try:
                 logger.info("开始提取数据...")
-                raw_data = self.driver.execute_script(data_extraction_script)
+                max_rows = self.max_records if self.test_mode else None
+                raw_data = fetch_table_compact(self.driver, chunk_rows=self.chunk_rows, max_rows=max_rows)
                 
-                if not raw_data:
+                rows = sum(len(chunk['refCounts']) for chunk in raw_data)
+                if not rows:
                     logger.warning("未提取到数据")
                     self.save_debug_info()
                     raise Exception("未能提取到数据")
                 
-                logger.info(f"成功提取到 {len(raw_data)} 条数据")
+                logger.info(f"成功提取到 {rows} 条数据")
                 
             except Exception as e:
                 logger.error(f"数据提取失败: {str(e)}")
                 self.save_debug_info()
                 raise
                 
-            logger.info(f"原始数据提取完成，共 {len(raw_data)} 条记录")
-            
-            # 如果是调试信息（方法3），直接返回
-            if isinstance(raw_data, list) and len(raw_data) > 0 and 'tagName' in raw_data[0]:
-                logger.info("返回页面结构调试信息")
-                return raw_data
+            logger.info(f"原始数据提取完成，共 {rows} 条记录")
             
             return self.process_data(raw_data)
             
@@ -183,44 +141,15 @@ class ImprovedResearchDatabaseCrawler:
             raise
     
     def process_data(self, raw_data):
-        """处理和清理数据"""
+        """处理和清理数据：解码紧凑分块，只保留非空字段"""
         processed_data = []
         
-        for i, item in enumerate(raw_data):
+        for record in compact_records(raw_data):
             # 跳过标题行（Lithium）
-            if item['material'] == 'Lithium' and not item['reactantA']:
+            if record.get('Material') == 'Lithium' and 'Reactant A' not in record:
                 continue
-                
-            # 创建数据记录
-            record = {}
-            
-            # Material字段
-            if item['material']:
-                record['Material'] = item['material']
-            
-            # Reactant A字段
-            if item['reactantA']:
-                record['Reactant A'] = item['reactantA']
-            
-            # Reactant B字段（异常处理：如果没有就不记录）
-            if item['reactantB']:
-                record['Reactant B'] = item['reactantB']
-            
-            # Reactant C字段（异常处理：如果没有就不记录）
-            if item['reactantC']:
-                record['Reactant C'] = item['reactantC']
-            
-            # Further reactants字段
-            if item['furtherReactants']:
-                record['Further reactants'] = item['furtherReactants']
-            
-            # References字段（保存名称以及对应的链接地址）
-            if item['references'] and len(item['references']) > 0:
-                record['References'] = item['references']
             
-            # 只添加有实际内容的记录
-            if len(record) > 0:
-                processed_data.append(record)
+            processed_data.append(record)
                 
             # 测试模式：只保存前10条数据
             if self.test_mode and len(processed_data) >= self.max_records:
@@ -331,11 +260,16 @@ def main():
     parser = argparse.ArgumentParser(description='改进版科研数据库爬虫')
     parser.add_argument('--test', action='store_true', help='测试模式，只保存前10条数据')
     parser.add_argument('--max-records', type=int, default=10, help='测试模式下的最大记录数')
+    parser.add_argument('--url', help='页面地址（默认: 数据库网站；可以指向本地保存的页面副本）')
+    parser.add_argument('--ready-timeout', type=float, default=30, help='等待表格渲染完成的最长秒数（默认: 30）')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'提取表格时每次脚本调用处理的行数（默认: {DEFAULT_CHUNK_ROWS}）')
     
     args = parser.parse_args()
     
     # 创建并运行爬虫
-    crawler = ImprovedResearchDatabaseCrawler(test_mode=args.test, max_records=args.max_records)
+    crawler = ImprovedResearchDatabaseCrawler(test_mode=args.test, max_records=args.max_records, base_url=args.url,
+                                              ready_timeout=args.ready_timeout, chunk_rows=args.chunk_rows)
     crawler.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON流式解析工具
+按块读取JSON文本，逐条解码顶层数组中的元素，避免整体加载到内存
+"""
+
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Tuple, Union
+
+# 默认读取块大小
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _ChunkBuffer:
+    """按需从块迭代器中补充数据的文本缓冲区"""
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self) -> bool:
+        """读取下一块数据，没有更多数据时返回False"""
+        if self.exhausted:
+            return False
+        # 丢弃已解析的部分，保持缓冲区大小稳定
+        if self.pos:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            if chunk:
+                self.text += chunk
+                return True
+        self.text += self._decoder.decode(b'', final=True)
+        self.exhausted = True
+        return False
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符，数据结束时返回空字符串"""
+        while True:
+            text = self.text
+            pos = self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str):
+        """读取指定的结构字符"""
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"期望 '{char}'，实际为 '{found}'", self.text, self.pos)
+        self.pos += 1
+
+    def decode_value(self, decoder: json.JSONDecoder) -> Any:
+        """从当前位置解码一个完整的JSON值"""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # 值可能被截断在块边界上，补充数据后重试
+                if self.fill():
+                    continue
+                raise
+            # 数字等标量在缓冲区末尾时可能尚未读完
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_array(buffer: _ChunkBuffer, decoder: json.JSONDecoder) -> Iterator[Any]:
+    """逐个解码数组元素（调用前已消费 '['）"""
+    if buffer.peek() == ']':
+        buffer.pos += 1
+        return
+    while True:
+        yield buffer.decode_value(decoder)
+        char = buffer.peek()
+        buffer.pos += 1
+        if char == ']':
+            return
+        if char != ',':
+            raise json.JSONDecodeError(f"数组中出现意外字符 '{char}'", buffer.text, buffer.pos - 1)
+
+
+def iter_json_events(chunks: Iterable[Union[bytes, str]],
+                     stream_keys: Iterable[str] = ()) -> Iterator[Tuple[str, Any]]:
+    """
+    流式解析顶层JSON对象或数组
+    :param chunks: bytes或str块的迭代器（如 response.iter_content()）
+    :param stream_keys: 需要逐条展开的数组字段名，其余字段整体解码
+    :return: (字段名, 值) 事件；stream_keys中的数组逐条产生 (字段名, 元素)，
+             顶层为数组时字段名为空字符串
+    """
+    stream_keys = set(stream_keys)
+    decoder = json.JSONDecoder()
+    buffer = _ChunkBuffer(chunks)
+
+    first = buffer.peek()
+    if first == '[':
+        buffer.pos += 1
+        for item in _iter_array(buffer, decoder):
+            yield '', item
+        return
+
+    buffer.expect('{')
+    if buffer.peek() == '}':
+        return
+    while True:
+        key = buffer.decode_value(decoder)
+        buffer.expect(':')
+        if key in stream_keys and buffer.peek() == '[':
+            buffer.pos += 1
+            for item in _iter_array(buffer, decoder):
+                yield key, item
+        else:
+            yield key, buffer.decode_value(decoder)
+        char = buffer.peek()
+        buffer.pos += 1
+        if char == '}':
+            return
+        if char != ',':
+            raise json.JSONDecodeError(f"对象中出现意外字符 '{char}'", buffer.text, buffer.pos - 1)
+
+
+def iter_file_chunks(file_obj, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """按块读取二进制文件对象"""
+    while True:
+        chunk = file_obj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
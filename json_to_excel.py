@@ -6,11 +6,19 @@ JSON转Excel转换工具
 """
 
 import json
+import hashlib
 import pandas as pd
 import os
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Any
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Any, Optional
+
+from excel_export import autofit_columns, build_statistics_rows, generate_statistics, write_records_streaming
+from file_utils import atomic_open, atomic_path
+from record_flatten import build_excel_frames
+from snapshot_io import SNAPSHOT_FORMATS, is_snapshot_file, iter_records, load_records, snapshot_format, strip_snapshot_extension
 
 class JSONToExcelConverter:
     """JSON转Excel转换器"""
@@ -19,10 +27,13 @@ class JSONToExcelConverter:
         pass
     
     def load_json_data(self, json_file: str) -> List[Dict[str, Any]]:
-        """加载JSON数据"""
+        """加载JSON数据（支持 .json 以及 .jsonl / .jsonl.gz / .jsonl.xz 快照）"""
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if is_snapshot_file(json_file) and snapshot_format(json_file) != 'json':
+                data = load_records(json_file)
+            else:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
             
             print(f"成功加载JSON文件: {json_file}")
             print(f"记录数: {len(data)}")
@@ -38,19 +49,34 @@ class JSONToExcelConverter:
             print(f"错误: 加载文件失败 - {e}")
             return []
     
-    def convert_to_excel(self, data: List[Dict[str, Any]], output_file: str = None) -> str:
-        """转换数据为Excel格式"""
+    def iter_json_data(self, json_file: str) -> Iterator[Dict[str, Any]]:
+        """逐条读取快照中的记录，不把整个文件加载到内存"""
+        return iter_records(json_file)
+    
+    def convert_to_excel(self, data: Iterable[Dict[str, Any]], output_file: str = None, streaming: bool = False) -> str:
+        """
+        转换数据为Excel格式
+        :param data: 记录列表，流式模式下也可以是记录迭代器（如 iter_json_data 的返回值）
+        :param streaming: 使用openpyxl只写模式逐行写出，内存占用不随记录数增长
+        """
+        if not isinstance(data, list):
+            if isinstance(data, dict):
+                print("错误: 数据格式不正确")
+                return ""
+            # 迭代器：取出第一条记录做格式检查后再接回去
+            iterator = iter(data)
+            first_record = next(iterator, None)
+            data = chain([first_record], iterator) if first_record is not None else []
+            if not streaming:
+                data = list(data)
+        elif data:
+            first_record = data[0]
+        
         if not data:
             print("错误: 没有数据可转换")
             return ""
         
-        # 检查数据格式，跳过统计文件
-        if not isinstance(data, list) or not data:
-            print("错误: 数据格式不正确")
-            return ""
-        
         # 检查第一条记录是否包含工艺数据的关键字段
-        first_record = data[0]
         if not isinstance(first_record, dict) or 'material' not in first_record:
             print("警告: 这似乎不是工艺数据文件，跳过转换")
             return ""
@@ -63,126 +89,39 @@ class JSONToExcelConverter:
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
-        # 准备Excel数据
-        excel_data = []
-        for record in data:
-            # 基础信息
-            base_info = {
-                '工艺ID': record.get('process_id', ''),
-                '材料': record.get('material', ''),
-                '反应物A': record.get('reactant_a', ''),
-                '反应物B': record.get('reactant_b', ''),
-                '反应物C': record.get('reactant_c', ''),
-                '反应物D': record.get('reactant_d', ''),
-                '备注': record.get('note', ''),
-                '贡献者': record.get('contributor', ''),
-                '已审核': '是' if record.get('reviewed', False) else '否',
-                '参考文献数量': len(record.get('references', []))
-            }
-            
-            # 处理参考文献
-            references = record.get('references', [])
-            if references:
-                # 合并所有DOI和URL
-                dois = [ref.get('doi', '') for ref in references if ref.get('doi', '')]
-                urls = [ref.get('url', '') for ref in references if ref.get('url', '')]
-                authors = [ref.get('author', '') for ref in references if ref.get('author', '')]
-                
-                base_info['DOI列表'] = '; '.join(dois) if dois else ''
-                base_info['URL链接'] = '; '.join(urls) if urls else ''
-                base_info['作者列表'] = '; '.join(authors) if authors else ''
-                base_info['总引用数'] = sum(int(ref.get('citations', '0')) for ref in references if ref.get('citations', '0').isdigit())
-            else:
-                base_info['DOI列表'] = ''
-                base_info['URL链接'] = ''
-                base_info['作者列表'] = ''
-                base_info['总引用数'] = 0
-            
-            excel_data.append(base_info)
+        # 先写入临时文件再替换，中断时不会留下比JSON更新的残缺Excel
+        if streaming:
+            with atomic_path(output_file) as tmp_file:
+                count = write_records_streaming(data, tmp_file, include_statistics=True)
+            print(f"Excel文件已保存到: {output_file}")
+            print(f"转换记录数: {count}")
+            return output_file
         
-        # 创建DataFrame并保存到Excel
-        df = pd.DataFrame(excel_data)
+        # 一次展平生成主数据表和参考文献详情表
+        df, ref_df = build_excel_frames(data)
         
         # 使用ExcelWriter来设置格式
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        with atomic_path(output_file) as tmp_file, pd.ExcelWriter(tmp_file, engine='openpyxl') as writer:
             # 主数据表
             df.to_excel(writer, sheet_name='ALD工艺数据', index=False)
             
             # 获取工作表对象进行格式设置
             worksheet = writer.sheets['ALD工艺数据']
             
-            # 自动调整列宽
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)  # 最大宽度50
-                worksheet.column_dimensions[column_letter].width = adjusted_width
+            # 自动调整列宽（最大宽度50）
+            autofit_columns(worksheet, df, 50)
             
             # 如果有参考文献数据，创建详细的参考文献表
-            if any(record.get('references') for record in data):
-                ref_data = []
-                for record in data:
-                    process_id = record.get('process_id', '')
-                    material = record.get('material', '')
-                    for ref in record.get('references', []):
-                        ref_data.append({
-                            '工艺ID': process_id,
-                            '材料': material,
-                            'DOI': ref.get('doi', ''),
-                            'URL链接': ref.get('url', ''),
-                            '作者': ref.get('author', ''),
-                            '完整作者列表': ref.get('full_authors', ''),
-                            '引用数': ref.get('citations', '0'),
-                            '提交日期': ref.get('submitted', '')
-                        })
+            if not ref_df.empty:
+                ref_df.to_excel(writer, sheet_name='参考文献详情', index=False)
                 
-                if ref_data:
-                    ref_df = pd.DataFrame(ref_data)
-                    ref_df.to_excel(writer, sheet_name='参考文献详情', index=False)
-                    
-                    # 调整参考文献表格式
-                    ref_worksheet = writer.sheets['参考文献详情']
-                    for column in ref_worksheet.columns:
-                        max_length = 0
-                        column_letter = column[0].column_letter
-                        for cell in column:
-                            try:
-                                if len(str(cell.value)) > max_length:
-                                    max_length = len(str(cell.value))
-                            except:
-                                pass
-                        adjusted_width = min(max_length + 2, 60)  # 参考文献表最大宽度60
-                        ref_worksheet.column_dimensions[column_letter].width = adjusted_width
+                # 调整参考文献表格式
+                ref_worksheet = writer.sheets['参考文献详情']
+                autofit_columns(ref_worksheet, ref_df, 60)  # 参考文献表最大宽度60
             
             # 添加数据统计表
             stats_data = self.generate_statistics(data)
-            stats_rows = [
-                ['统计项目', '数值'],
-                ['总记录数', stats_data['total_records']],
-                ['已审核记录数', stats_data['reviewed_count']],
-                ['包含参考文献的记录数', stats_data['with_references']],
-                ['总参考文献数', stats_data['total_references']],
-                ['', ''],
-                ['热门材料 (前10)', '记录数'],
-            ]
-            
-            # 添加热门材料
-            for material, count in list(stats_data['top_materials'].items())[:10]:
-                stats_rows.append([material, count])
-            
-            stats_rows.extend([['', ''], ['热门反应物 (前10)', '记录数']])
-            
-            # 添加热门反应物
-            for reactant, count in list(stats_data['top_reactants'].items())[:10]:
-                stats_rows.append([reactant, count])
-            
-            stats_df = pd.DataFrame(stats_rows[1:], columns=stats_rows[0])
+            stats_df = pd.DataFrame(build_statistics_rows(stats_data), columns=['统计项目', '数值'])
             stats_df.to_excel(writer, sheet_name='数据统计', index=False)
             
             # 调整统计表格式
@@ -195,73 +134,139 @@ class JSONToExcelConverter:
         
         return output_file
     
-    def generate_statistics(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """生成数据统计信息"""
-        stats = {
-            'total_records': len(data),
-            'materials': {},
-            'reactants': {},
-            'contributors': {},
-            'reviewed_count': 0,
-            'with_references': 0,
-            'total_references': 0
-        }
+    def convert_to_columnar(self, data: List[Dict[str, Any]], output_base: str = None, fmt: str = 'parquet') -> List[str]:
+        """转换数据为Parquet/Feather列式格式（工艺表 + 参考文献表）"""
+        from columnar_export import export_columnar
         
-        for record in data:
-            # 材料统计
-            material = record.get('material', '').strip()
-            if material:
-                stats['materials'][material] = stats['materials'].get(material, 0) + 1
-            
-            # 反应物统计
-            for reactant_key in ['reactant_a', 'reactant_b', 'reactant_c', 'reactant_d']:
-                reactant = record.get(reactant_key, '').strip()
-                if reactant:
-                    stats['reactants'][reactant] = stats['reactants'].get(reactant, 0) + 1
-            
-            # 贡献者统计
-            contributor = record.get('contributor', '').strip()
-            if contributor:
-                stats['contributors'][contributor] = stats['contributors'].get(contributor, 0) + 1
-            
-            # 审核状态统计
-            if record.get('reviewed', False):
-                stats['reviewed_count'] += 1
-            
-            # 参考文献统计
-            references = record.get('references', [])
-            if references:
-                stats['with_references'] += 1
-                stats['total_references'] += len(references)
+        if not data or not isinstance(data, list) or not isinstance(data[0], dict) or 'material' not in data[0]:
+            print("警告: 这似乎不是工艺数据文件，跳过转换")
+            return []
         
-        # 排序统计结果
-        stats['top_materials'] = dict(sorted(stats['materials'].items(), key=lambda x: x[1], reverse=True)[:20])
-        stats['top_reactants'] = dict(sorted(stats['reactants'].items(), key=lambda x: x[1], reverse=True)[:20])
-        stats['top_contributors'] = dict(sorted(stats['contributors'].items(), key=lambda x: x[1], reverse=True)[:10])
+        if output_base is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            output_base = f'data/converted_data_{timestamp}'
         
-        return stats
+        paths = export_columnar(data, output_base, fmt)
+        for path in paths.values():
+            print(f"列式文件已保存到: {path}")
+        print(f"转换记录数: {len(data)}")
+        
+        return list(paths.values())
+    
+    def generate_statistics(self, data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """生成数据统计信息"""
+        return generate_statistics(data)
+    
+    @staticmethod
+    def is_process_file(json_file: str) -> bool:
+        """根据文件名和开头字节判断是否为工艺数据文件，无需加载整个文件"""
+        if 'statistics' in os.path.basename(json_file):
+            return False
+        if is_snapshot_file(json_file) and snapshot_format(json_file) != 'json':
+            # 按行格式只用于工艺记录快照
+            return True
+        with open(json_file, 'rb') as f:
+            head = f.read(64).lstrip(b'\xef\xbb\xbf \t\r\n')
+        # 工艺数据文件是记录数组，统计、变更日志等文件是对象
+        return head.startswith(b'[')
     
-    def batch_convert(self, input_dir: str = 'data', pattern: str = '*.json') -> List[str]:
-        """批量转换目录中的JSON文件"""
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """计算文件内容的SHA-256"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def batch_convert(self, input_dir: str = 'data', pattern: str = None, streaming: bool = False,
+                      workers: int = 1, force: bool = False) -> List[str]:
+        """
+        批量转换目录中的JSON文件
+        :param pattern: 文件名匹配模式，默认匹配所有快照格式（.json / .jsonl / .jsonl.gz / .jsonl.xz）
+        :param workers: 并行转换的进程数
+        :param force: 忽略已有的Excel文件和内容哈希，全部重新转换
+        """
         import glob
         
-        json_files = glob.glob(os.path.join(input_dir, pattern))
-        converted_files = []
+        patterns = [pattern] if pattern else [f'*{ext}' for ext in SNAPSHOT_FORMATS.values()]
+        json_files = [path for p in patterns for path in glob.glob(os.path.join(input_dir, p))]
+        hash_file = os.path.join(input_dir, '.batch_convert_hashes.json')
+        try:
+            with open(hash_file, 'r', encoding='utf-8') as f:
+                known_hashes = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            known_hashes = {}
         
         print(f"在目录 {input_dir} 中找到 {len(json_files)} 个JSON文件")
         
-        for json_file in json_files:
-            print(f"\n正在转换: {json_file}")
-            data = self.load_json_data(json_file)
+        # 筛选需要转换的文件；同名的不同格式快照（如 api_latest_data.json 和 api_latest_data.jsonl.gz）
+        # 输出到同一个Excel文件，只转换其中最新的一个，避免两个进程同时写同一个文件
+        outputs = {}
+        for json_file in sorted(json_files):
+            if not self.is_process_file(json_file):
+                print(f"跳过非工艺数据文件: {json_file}")
+                continue
             
-            if data:
-                # 生成对应的Excel文件名
-                base_name = os.path.splitext(os.path.basename(json_file))[0]
-                excel_file = os.path.join(input_dir, f"{base_name}.xlsx")
-                
-                result_file = self.convert_to_excel(data, excel_file)
-                if result_file:
-                    converted_files.append(result_file)
+            # 生成对应的Excel文件名
+            base_name = strip_snapshot_extension(os.path.basename(json_file))
+            excel_file = os.path.join(input_dir, f"{base_name}.xlsx")
+            previous = outputs.get(excel_file)
+            if previous and os.path.getmtime(previous) >= os.path.getmtime(json_file):
+                print(f"跳过（{previous} 更新，输出到同一个Excel文件）: {json_file}")
+                continue
+            if previous:
+                print(f"跳过（{json_file} 更新，输出到同一个Excel文件）: {previous}")
+            outputs[excel_file] = json_file
+        
+        tasks = []
+        for excel_file, json_file in outputs.items():
+            base_name = strip_snapshot_extension(os.path.basename(json_file))
+            if not force and os.path.exists(excel_file) and os.path.getmtime(excel_file) >= os.path.getmtime(json_file):
+                print(f"跳过（Excel文件已是最新）: {json_file}")
+                continue
+            
+            content_hash = self.file_hash(json_file)
+            if not force and os.path.exists(excel_file):
+                if known_hashes.get(base_name) == content_hash:
+                    print(f"跳过（内容未变化）: {json_file}")
+                    continue
+            tasks.append((json_file, excel_file, content_hash))
+        
+        # 单个文件转换失败不影响其它文件
+        results = {}
+        failed = []
+        if workers > 1 and len(tasks) > 1:
+            print(f"使用 {workers} 个进程并行转换 {len(tasks)} 个文件")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(_convert_file, json_file, excel_file, streaming): json_file
+                           for json_file, excel_file, _ in tasks}
+                for future in as_completed(futures):
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as e:
+                        failed.append(futures[future])
+                        print(f"转换失败: {futures[future]}: {e}")
+        else:
+            for json_file, excel_file, _ in tasks:
+                try:
+                    results[json_file] = _convert_file(json_file, excel_file, streaming)
+                except Exception as e:
+                    failed.append(json_file)
+                    print(f"转换失败: {json_file}: {e}")
+        
+        converted_files = []
+        for json_file, excel_file, content_hash in tasks:
+            result_file = results.get(json_file)
+            if result_file:
+                converted_files.append(result_file)
+                known_hashes[strip_snapshot_extension(os.path.basename(json_file))] = content_hash
+        if failed:
+            print(f"{len(failed)} 个文件转换失败: {', '.join(sorted(failed))}")
+        
+        if converted_files:
+            with atomic_open(hash_file) as f:
+                json.dump(known_hashes, f, ensure_ascii=False, indent=2)
         
         return converted_files
     
@@ -273,7 +278,8 @@ class JSONToExcelConverter:
             print(f"数据目录 {data_dir} 不存在")
             return []
         
-        json_files = glob.glob(os.path.join(data_dir, '*.json'))
+        json_files = [path for ext in SNAPSHOT_FORMATS.values()
+                      for path in glob.glob(os.path.join(data_dir, f'*{ext}'))]
         
         if not json_files:
             print(f"在 {data_dir} 目录中没有找到JSON文件")
@@ -287,6 +293,16 @@ class JSONToExcelConverter:
         
         return json_files
 
+def _convert_file(json_file: str, excel_file: str, streaming: bool = False) -> Optional[str]:
+    """转换单个文件（供批量转换的工作进程调用）"""
+    converter = JSONToExcelConverter()
+    print(f"\n正在转换: {json_file}")
+    # 流式模式逐条读取记录，内存占用不随文件大小增长
+    data = converter.iter_json_data(json_file) if streaming else converter.load_json_data(json_file)
+    if not data:
+        return None
+    return converter.convert_to_excel(data, excel_file, streaming=streaming) or None
+
 def main():
     parser = argparse.ArgumentParser(description='JSON转Excel转换工具')
     parser.add_argument('input_file', nargs='?', help='输入的JSON文件路径')
@@ -294,6 +310,11 @@ def main():
     parser.add_argument('-b', '--batch', action='store_true', help='批量转换data目录中的所有JSON文件')
     parser.add_argument('-l', '--list', action='store_true', help='列出可用的JSON文件')
     parser.add_argument('-d', '--dir', default='data', help='数据目录路径（默认: data）')
+    parser.add_argument('-f', '--format', choices=['excel', 'parquet', 'feather'], default='excel',
+                        help='输出格式（默认: excel；parquet/feather需要pyarrow）')
+    parser.add_argument('-s', '--streaming', action='store_true', help='使用只写模式流式导出Excel，适合超大数据集')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='批量转换时的并行进程数（默认: 1）')
+    parser.add_argument('--force', action='store_true', help='批量转换时忽略已有的Excel文件，全部重新转换')
     
     args = parser.parse_args()
     
@@ -307,7 +328,8 @@ def main():
     # 批量转换
     if args.batch:
         print("开始批量转换...")
-        converted_files = converter.batch_convert(args.dir)
+        converted_files = converter.batch_convert(args.dir, streaming=args.streaming,
+                                                  workers=args.workers, force=args.force)
         print(f"\n批量转换完成，共转换 {len(converted_files)} 个文件:")
         for file in converted_files:
             print(f"  - {file}")
@@ -324,10 +346,26 @@ def main():
         return
     
     print(f"开始转换文件: {args.input_file}")
-    data = converter.load_json_data(args.input_file)
+    if args.streaming and args.format == 'excel':
+        # 逐条读取记录直接写出，不把整个文件加载到内存
+        data = converter.iter_json_data(args.input_file)
+    else:
+        data = converter.load_json_data(args.input_file)
     
     if data:
-        output_file = converter.convert_to_excel(data, args.output)
+        if args.format != 'excel':
+            output_path = args.output or args.input_file
+            output_base = strip_snapshot_extension(output_path) if is_snapshot_file(output_path) else os.path.splitext(output_path)[0]
+            output_files = converter.convert_to_columnar(data, output_base, args.format)
+            if output_files:
+                print("\n转换成功！")
+                for file in output_files:
+                    print(f"输出文件: {file}")
+            else:
+                print("转换失败！")
+            return
+        
+        output_file = converter.convert_to_excel(data, args.output, streaming=args.streaming)
         if output_file:
             print(f"\n转换成功！")
             print(f"输出文件: {output_file}")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DOI链接检查
+process_data 为每条参考文献生成 https://doi.org/ 链接但不确认能否解析，
+SICI格式等带 <、>、; 的DOI经常得到失效链接。这里对不重复的DOI并发发送HEAD请求
+（共用一个保持连接的会话和连接池），结果按 (解析服务, DOI) 缓存在 data/.doi_link_cache.json，
+Excel参考文献详情表据此增加“链接状态”列
+
+解析服务默认为 https://doi.org/，测试时可以指向本地的替代服务：
+    python3 api_crawler.py --check-links --link-resolver http://127.0.0.1:8765/
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from doi_enrichment import DOIMetadataCache
+
+DOI_RESOLVER = 'https://doi.org/'
+STATUS_LABELS = {'ok': '有效', 'broken': '失效', 'invalid': 'DOI格式错误', 'error': '检查失败'}
+# 不支持HEAD的服务改用GET
+HEAD_UNSUPPORTED = {405, 501}
+
+
+class LinkCheckCache(DOIMetadataCache):
+    """按 (解析服务, DOI) 缓存的链接检查结果，只缓存确定的结果（有效、失效、格式错误）"""
+
+    def __init__(self, cache_file: str = 'data/.doi_link_cache.json', ttl_days: float = 7):
+        super().__init__(cache_file, ttl_days)
+
+
+def doi_link(doi: str, resolver: str = DOI_RESOLVER) -> str:
+    """DOI的解析链接，对 <、>、#、空格等URL中不合法的字符做百分号编码"""
+    return resolver + quote(doi.strip(), safe="/:;()[]'")
+
+
+def status_label(result: Optional[Dict[str, Any]]) -> str:
+    """Excel中显示的链接状态，如 “有效”、“失效 (404)”"""
+    if not result:
+        return ''
+    label = STATUS_LABELS.get(result.get('status'), result.get('status', ''))
+    return f"{label} ({result['code']})" if result.get('code') and result['status'] != 'ok' else label
+
+
+class LinkChecker:
+    """并发检查DOI链接"""
+
+    def __init__(self, resolver: str = DOI_RESOLVER, concurrency: int = 16, timeout: float = 10,
+                 retries: int = 1, cache: LinkCheckCache = None, headers: Dict[str, str] = None):
+        """
+        :param resolver: DOI解析服务地址，DOI直接拼接在后面
+        :param concurrency: 并发请求数，同时也是连接池大小
+        :param retries: 网络错误和5xx的重试次数
+        """
+        self.resolver = resolver
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.cache = cache if cache is not None else LinkCheckCache()
+        # 所有线程共用一个会话；连接池不小于并发数，连接才能被复用而不是反复新建
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(headers or {})
+        self.stats = {}
+
+    def check(self, doi: str) -> Dict[str, Any]:
+        """
+        检查单个DOI：2xx/3xx为有效，404/410为失效，其它状态和网络错误为检查失败
+        :return: {'status', 'code', 'location'}
+        """
+        if not doi.strip().startswith('10.') or '/' not in doi:
+            return {'status': 'invalid', 'code': None, 'location': ''}
+
+        url = doi_link(doi, self.resolver)
+        error = ''
+        for attempt in range(self.retries + 1):
+            try:
+                # 不跟随重定向：解析服务返回302即说明DOI已注册，不需要访问出版商网站
+                response = self.session.head(url, timeout=self.timeout, allow_redirects=False)
+                if response.status_code in HEAD_UNSUPPORTED:
+                    response = self.session.get(url, timeout=self.timeout, allow_redirects=False, stream=True)
+                    response.close()
+            except requests.exceptions.RequestException as e:
+                error = type(e).__name__
+            else:
+                code = response.status_code
+                if code < 400:
+                    return {'status': 'ok', 'code': code, 'location': response.headers.get('Location', '')}
+                if code in (404, 410):
+                    return {'status': 'broken', 'code': code, 'location': ''}
+                error = f'HTTP {code}'
+                if code < 500 and code != 429:
+                    break
+            if attempt < self.retries:
+                time.sleep(0.5 * (2 ** attempt))
+        return {'status': 'error', 'code': None, 'location': '', 'error': error}
+
+    def check_all(self, dois: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """检查一组DOI（去重，缓存命中的不发请求），返回 DOI -> 检查结果"""
+        unique = list(dict.fromkeys(doi for doi in dois if doi))
+        results = {}
+        pending = []
+        for doi in unique:
+            entry = self.cache.get(doi, self.resolver)
+            if entry is not None:
+                results[doi] = entry['metadata']
+            else:
+                pending.append(doi)
+        self.stats = {'dois': len(unique), 'cached': len(results), 'checked': len(pending), 'elapsed': 0.0}
+
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                futures = {executor.submit(self.check, doi): doi for doi in pending}
+                for future in as_completed(futures):
+                    doi = futures[future]
+                    result = results[doi] = future.result()
+                    if result['status'] != 'error':
+                        self.cache.put(doi, result, self.resolver)
+        finally:
+            self.cache.save()
+        self.stats['elapsed'] = time.perf_counter() - start
+        return results
+
+    def check_records(self, records: List[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        检查记录中所有参考文献的DOI链接并输出统计
+        :return: DOI -> 链接状态文本，用于Excel的“链接状态”列
+        """
+        results = self.check_all(ref.get('doi', '') for record in records
+                                 for ref in record.get('references') or [])
+        stats = self.stats
+        counts = {status: 0 for status in STATUS_LABELS}
+        for result in results.values():
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        rate = stats['checked'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        print(f"链接检查: {stats['dois']} 个DOI（缓存命中 {stats['cached']}，检查 {stats['checked']}），"
+              f"耗时 {stats['elapsed']:.1f} 秒，{rate:.1f} 次/秒")
+        print("  " + "，".join(f"{STATUS_LABELS[status]} {count}" for status, count in counts.items()))
+        return {doi: status_label(result) for doi, result in results.items()}
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据服务压测脚本
+使用多个保持连接的客户端线程循环请求一组查询，统计每秒请求数和延迟分位数
+
+用法:
+    python3 api_crawler.py serve --port 8000 &
+    python3 load_test.py --port 8000 --concurrency 8 --duration 10
+    python3 load_test.py --port 8000 --etag        # 带 If-None-Match，测试304路径
+"""
+
+import argparse
+import http.client
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+DEFAULT_PATHS = [
+    '/processes?material=ZrO2&reactant=H2O2',
+    '/processes?material=Al2O3&limit=20',
+    '/processes?reactant=AlMe3&reactant=TiCl4&limit=50',
+    '/processes?reactant_b=H2O&material=HfO2',
+    '/processes?contributor=Jan%20Buiter&limit=10&offset=100',
+    '/processes?doi=10.1149/1.1418379',
+    '/processes/414',
+    '/health',
+]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _worker(host: str, port: int, paths: List[str], deadline: float, use_etag: bool, offset: int,
+            latencies: List[float], statuses: Counter, lock: threading.Lock):
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    etags: Dict[str, str] = {}
+    local_latencies = []
+    local_statuses = Counter()
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        headers = {'If-None-Match': etags[path]} if use_etag and path in etags else {}
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            local_statuses['error'] += 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        local_latencies.append(time.perf_counter() - start)
+        local_statuses[response.status] += 1
+        etag = response.getheader('ETag')
+        if etag:
+            etags[path] = etag
+    connection.close()
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def run_load_test(host: str = '127.0.0.1', port: int = 8000, concurrency: int = 8, duration: float = 10.0,
+                  paths: List[str] = None, use_etag: bool = False) -> Dict[str, float]:
+    """压测并返回统计结果"""
+    paths = paths or DEFAULT_PATHS
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=_worker, args=(host, port, paths, deadline, use_etag, n,
+                                                      latencies, statuses, lock))
+               for n in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': statuses.get('error', 0),
+        'statuses': dict(statuses),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据服务压测')
+    parser.add_argument('--host', default='127.0.0.1', help='服务地址（默认: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8000, help='服务端口（默认: 8000）')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='并发连接数（默认: 8）')
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='压测时长（秒，默认: 10）')
+    parser.add_argument('--path', action='append', help='请求路径，可重复指定（默认使用内置的一组查询）')
+    parser.add_argument('--etag', action='store_true', help='重复请求时带 If-None-Match')
+
+    args = parser.parse_args()
+
+    print(f"压测 http://{args.host}:{args.port} ，并发 {args.concurrency}，时长 {args.duration} 秒")
+    result = run_load_test(args.host, args.port, args.concurrency, args.duration, args.path, args.etag)
+    print(f"请求数: {result['requests']}（错误 {result['errors']}）")
+    print(f"状态码: {result['statuses']}")
+    print(f"每秒请求数: {result['rps']:.0f}")
+    print(f"延迟 p50: {result['p50_ms']:.2f} ms  p90: {result['p90_ms']:.2f} ms  "
+          f"p99: {result['p99_ms']:.2f} ms  max: {result['max_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
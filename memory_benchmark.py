@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存基准脚本
+由 data/api_latest_data.json 还原出 processes.php 格式的响应，按倍数放大后在本地服务或进程内测量
+
+用法:
+    python3 memory_benchmark.py stream --scale 10      # 完整解析与流式解析的峰值RSS
+    python3 memory_benchmark.py footprint --scale 10   # 紧凑记录与普通字典占用的内存及处理、写入耗时
+"""
+
+import argparse
+import contextlib
+import functools
+import gc
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+from api_crawler import ALDDatabaseAPICrawler
+from record_types import plain_record
+from snapshot_io import write_snapshot
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.path.join(ROOT, 'data', 'api_latest_data.json')
+# 每放大一倍，process_id 增加的偏移量，保证各副本的ID不重复
+ID_OFFSET = 100000
+
+# 在子进程中运行，避免父进程生成的响应影响峰值RSS
+_FETCH_SCRIPT = r'''
+import contextlib, io, json, resource, sys
+sys.path.insert(0, sys.argv[1])
+from api_crawler import ALDDatabaseAPICrawler
+
+def rss_mb():
+    value = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return value / 2 ** 20 if sys.platform == 'darwin' else value / 1024
+
+crawler = ALDDatabaseAPICrawler()
+crawler.api_url = sys.argv[2]
+baseline = rss_mb()
+with contextlib.redirect_stdout(io.StringIO()):
+    records = crawler.process_data(crawler.fetch_data(stream=sys.argv[3] == 'stream'))
+print(json.dumps({'baseline_mb': baseline, 'peak_mb': rss_mb(), 'records': len(records)}))
+'''
+
+
+def synthetic_payload(scale: int = 1, source: str = DEFAULT_SOURCE) -> Dict[str, Any]:
+    """
+    把保存的合并记录还原为 processes.php 的响应格式，并复制 scale 份
+    :param scale: 放大倍数
+    :param source: api_crawler 保存的JSON快照
+    """
+    with open(source, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    processes = []
+    references = []
+    for k in range(scale):
+        for record in records:
+            process_id = str(int(record['process_id']) + k * ID_OFFSET)
+            processes.append({
+                'process_id': process_id,
+                'process_material': record['material'],
+                'process_reactantA': record['reactant_a'],
+                'process_reactantB': record['reactant_b'],
+                'process_reactantC': record['reactant_c'],
+                'process_reactantD': record['reactant_d'],
+                'process_note': record['note'],
+                'process_contributor': record['contributor'],
+                'process_reviewed': '1' if record['reviewed'] else '0'
+            })
+            for ref in record['references']:
+                references.append({
+                    'process_id': process_id,
+                    'reference_doi': ref['doi'],
+                    'reference_author': ref['author'],
+                    'reference_fullAuthorList': ref['full_authors'],
+                    'reference_citations': ref['citations'],
+                    'EntrySubmitted': ref['submitted']
+                })
+    return {'success': True, 'processes': processes, 'references': references}
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def measure_fetch_memory(scale: int = 10, source: str = DEFAULT_SOURCE) -> Dict[str, Dict[str, Any]]:
+    """
+    在本地服务上分别以完整解析和流式解析运行 fetch_data + process_data，返回各自高于导入基线的峰值RSS
+    每种模式在独立子进程中运行，工作目录为临时目录（原始响应存档写入其中的 data/raw）
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        payload_path = os.path.join(work_dir, 'processes.json')
+        with open(payload_path, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_payload(scale, source), f, ensure_ascii=False)
+        size_mb = os.path.getsize(payload_path) / 2 ** 20
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_QuietHandler, directory=work_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}/processes.json'
+        try:
+            for mode in ('full', 'stream'):
+                output = subprocess.run([sys.executable, '-c', _FETCH_SCRIPT, ROOT, url, mode], cwd=work_dir,
+                                        check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                result['above_baseline_mb'] = result['peak_mb'] - result['baseline_mb']
+                result['payload_mb'] = size_mb
+                results[mode] = result
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+def _held_mb(build) -> float:
+    """用 tracemalloc 统计 build() 返回的对象在其临时数据释放后仍占用的内存"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return held / 2 ** 20
+
+
+def measure_record_footprint(scale: int = 10, source: str = DEFAULT_SOURCE) -> Dict[str, Any]:
+    """
+    比较 process_data 生成的紧凑记录与等价普通字典（由JSON重新解析，字符串各自独立）占用的内存，
+    以及 process_data 和缩进JSON快照写入的耗时
+    """
+    crawler = ALDDatabaseAPICrawler()
+    body = json.dumps(synthetic_payload(scale, source), ensure_ascii=False)
+
+    def process():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return crawler.process_data(json.loads(body))
+
+    raw_data = json.loads(body)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = crawler.process_data(raw_data)
+    process_seconds = time.perf_counter() - start
+    del raw_data
+    plain_body = json.dumps([plain_record(record) for record in records], ensure_ascii=False)
+
+    result = {
+        'records': len(records),
+        'compact_mb': _held_mb(process),
+        'plain_mb': _held_mb(lambda: json.loads(plain_body)),
+        'process_seconds': process_seconds
+    }
+    plain_records = json.loads(plain_body)
+    with tempfile.TemporaryDirectory() as work_dir:
+        for key, items in (('compact_write_seconds', records), ('plain_write_seconds', plain_records)):
+            start = time.perf_counter()
+            write_snapshot(items, os.path.join(work_dir, 'snapshot.json'))
+            result[key] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='内存基准测试（合成数据，本地运行）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stream_parser = subparsers.add_parser('stream', help='完整解析与流式解析的峰值RSS')
+    stream_parser.add_argument('--scale', type=int, default=10, help='数据放大倍数（默认: 10）')
+    stream_parser.add_argument('--source', default=DEFAULT_SOURCE, help='用于生成响应的JSON快照')
+
+    footprint_parser = subparsers.add_parser('footprint', help='紧凑记录与普通字典占用的内存及处理、写入耗时')
+    footprint_parser.add_argument('--scale', type=int, default=10, help='数据放大倍数（默认: 10）')
+    footprint_parser.add_argument('--source', default=DEFAULT_SOURCE, help='用于生成响应的JSON快照')
+
+    args = parser.parse_args()
+
+    if args.command == 'stream':
+        print(f"生成 {args.scale} 倍数据并在本地服务上运行 fetch_data + process_data ...")
+        results = measure_fetch_memory(args.scale, args.source)
+        print(f"响应大小: {results['full']['payload_mb']:.1f} MB，记录数: {results['full']['records']}")
+        for mode, label in (('full', '完整解析'), ('stream', '流式解析')):
+            result = results[mode]
+            print(f"{label}: 峰值RSS {result['peak_mb']:.0f} MB，高于导入基线 {result['above_baseline_mb']:.0f} MB")
+    elif args.command == 'footprint':
+        print(f"生成 {args.scale} 倍数据并测量处理后记录占用的内存 ...")
+        result = measure_record_footprint(args.scale, args.source)
+        print(f"记录数: {result['records']}")
+        print(f"占用内存（原始响应释放后）: 紧凑记录 {result['compact_mb']:.1f} MB，"
+              f"普通字典 {result['plain_mb']:.1f} MB")
+        print(f"process_data 耗时: {result['process_seconds']:.2f} 秒")
+        print(f"缩进JSON快照写入: 紧凑记录 {result['compact_write_seconds']:.2f} 秒，"
+              f"普通字典 {result['plain_write_seconds']:.2f} 秒")
+
+
+if __name__ == '__main__':
+    main()
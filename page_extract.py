@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线页面提取
+用lxml解析网页爬虫保存的页面快照（data/resources/page_*.html、data/debug/page_source_*.html），
+不需要启动浏览器即可重新提取表格数据；提取规则与 browser_utils.py 中的JS脚本一致：
+跳过标题行、单元格少于7个的行和 processList--subtitle 副标题行，材料和反应物A都为空的行不输出
+
+compact_records 解码浏览器返回的紧凑分块（列式下标 + 字符串表），直接生成输出记录
+
+用法:
+    python3 page_extract.py data/resources data/debug
+    python3 page_extract.py data/resources/page_20250708_160756.html -o data/offline
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+from lxml import html as lxml_html
+
+from file_utils import atomic_open
+
+BASE_URL = 'https://www.atomiclimits.com/alddatabase/'
+TABLE_CLASS = 'processList--table'
+SUBTITLE_CLASS = 'processList--subtitle'
+# 表格第1～5列对应的原始字段，第6列为参考文献链接
+RAW_FIELDS = ['material', 'reactantA', 'reactantB', 'reactantC', 'furtherReactants']
+RECORD_FIELDS = {'material': 'Material', 'reactantA': 'Reactant A', 'reactantB': 'Reactant B',
+                 'reactantC': 'Reactant C', 'furtherReactants': 'Further reactants'}
+
+
+def _has_class(element, name: str) -> bool:
+    return name in (element.get('class') or '').split()
+
+
+def extract_table_rows(page: Union[str, bytes], base_url: str = BASE_URL) -> List[Dict[str, Any]]:
+    """
+    从页面HTML提取表格行，结果与浏览器中提取脚本的返回值相同
+    :param base_url: 解析相对链接的基准地址，页面有 <base href> 时以其为准
+    """
+    root = lxml_html.fromstring(page)
+    base = root.find('.//base[@href]')
+    if base is not None:
+        base_url = urljoin(base_url, base.get('href'))
+
+    # 与 document.querySelector 一致：文档顺序中第一个带该class的元素
+    tables = root.xpath(f'(//*[contains(concat(" ", normalize-space(@class), " "), " {TABLE_CLASS} ")])[1]')
+    if not tables:
+        return []
+    table = tables[0]
+
+    result = []
+    # 第一行是标题行
+    for row in list(table.iter('tr'))[1:]:
+        cells = list(row.iter('td'))
+        if len(cells) < 7:
+            continue
+        if _has_class(row, SUBTITLE_CLASS):
+            continue
+
+        material = cells[1].text_content().strip()
+        reactant_a = cells[2].text_content().strip()
+        if not (material or reactant_a):
+            continue
+        result.append({
+            'material': material,
+            'reactantA': reactant_a,
+            'reactantB': cells[3].text_content().strip(),
+            'reactantC': cells[4].text_content().strip(),
+            'furtherReactants': cells[5].text_content().strip(),
+            # 与 link.href 一致：没有href的链接为空串，相对链接解析为绝对地址
+            'references': [{'name': link.text_content().strip(),
+                            'url': urljoin(base_url, link.get('href').strip()) if link.get('href') is not None else ''}
+                           for link in cells[6].iter('a')]
+        })
+    return result
+
+
+def table_records(raw_data: Iterable[Dict[str, Any]], max_records: int = None) -> List[Dict[str, Any]]:
+    """把提取的表格行转换为网页爬虫的输出格式，只保留非空字段"""
+    records = []
+    for item in raw_data:
+        record = {RECORD_FIELDS[field]: item[field] for field in RAW_FIELDS if item[field]}
+        if item['references']:
+            record['References'] = item['references']
+        if record:
+            records.append(record)
+        if max_records and len(records) >= max_records:
+            break
+    return records
+
+
+def is_compact_payload(raw_data: Any) -> bool:
+    """是否为 browser_utils.fetch_table_compact 返回的紧凑分块列表"""
+    return isinstance(raw_data, list) and bool(raw_data) and 'strings' in raw_data[0]
+
+
+def compact_records(chunks: Iterable[Dict[str, Any]], max_records: int = None) -> List[Dict[str, Any]]:
+    """
+    解码紧凑分块，输出与 table_records(extract_table_rows(...)) 相同，不经过中间的行字典
+    :param chunks: 按顺序排列的分块，字符串表跨分块累积
+    """
+    strings = ['']
+    keys = [RECORD_FIELDS[field] for field in RAW_FIELDS]
+    records = []
+    for chunk in chunks:
+        if chunk['stringBase'] != len(strings):
+            raise ValueError(f"分块的字符串表不连续: 期望从 {len(strings)} 开始，实际为 {chunk['stringBase']}")
+        strings.extend(chunk['strings'])
+        columns = chunk['columns']
+        names = chunk['refNames']
+        urls = chunk['refUrls']
+        pos = 0
+        for row, count in zip(zip(*(columns[field] for field in RAW_FIELDS)), chunk['refCounts']):
+            # 下标0为空串，不输出
+            record = {key: strings[i] for key, i in zip(keys, row) if i}
+            if count:
+                record['References'] = [{'name': strings[n], 'url': strings[u]}
+                                        for n, u in zip(names[pos:pos + count], urls[pos:pos + count])]
+                pos += count
+            records.append(record)
+            if max_records and len(records) >= max_records:
+                return records
+    return records
+
+
+def extract_file(path: str, base_url: str = BASE_URL) -> Tuple[str, List[Dict[str, Any]], float]:
+    """解析一个页面快照，返回 (路径, 记录, 耗时秒数)"""
+    start = time.perf_counter()
+    # 网页爬虫以UTF-8保存页面源码，页面本身不一定带 charset 声明
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        records = table_records(extract_table_rows(f.read(), base_url))
+    return path, records, time.perf_counter() - start
+
+
+def find_snapshots(paths: Iterable[str]) -> List[str]:
+    """展开目录，返回其中的 .html 文件"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.html'))))
+        else:
+            files.append(path)
+    return files
+
+
+def extract_snapshots(paths: Iterable[str], workers: Optional[int] = None,
+                      base_url: str = BASE_URL) -> List[Tuple[str, List[Dict[str, Any]], float]]:
+    """
+    并行解析多个页面快照（多进程，lxml解析是CPU密集型）
+    :param workers: 进程数，默认为CPU核数；1 表示在当前进程中顺序解析
+    """
+    files = find_snapshots(paths)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(files) <= 1:
+        return [extract_file(path, base_url) for path in files]
+    with ProcessPoolExecutor(max_workers=min(workers, len(files))) as executor:
+        return list(executor.map(extract_file, files, [base_url] * len(files)))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='从保存的页面快照离线提取表格数据（不需要浏览器）')
+    parser.add_argument('paths', nargs='*', default=['data/resources', 'data/debug'],
+                        help='页面快照文件或目录（默认: data/resources data/debug）')
+    parser.add_argument('-o', '--output', metavar='DIR', help='把每个快照的记录保存为同名JSON文件')
+    parser.add_argument('-j', '--workers', type=int, help='并行进程数（默认: CPU核数）')
+    parser.add_argument('--base-url', default=BASE_URL, help=f'解析相对链接的基准地址（默认: {BASE_URL}）')
+
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = extract_snapshots(args.paths, args.workers, args.base_url)
+    elapsed = time.perf_counter() - start
+    if not results:
+        print("未找到页面快照", file=sys.stderr)
+        return 1
+
+    for path, records, seconds in results:
+        print(f"{path}: {len(records)} 条记录（{seconds * 1000:.0f} ms）")
+        if args.output:
+            filename = os.path.join(args.output, os.path.splitext(os.path.basename(path))[0] + '.json')
+            with atomic_open(filename) as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+    total = sum(len(records) for _, records, _ in results)
+    print(f"共 {len(results)} 个快照，{total} 条记录，耗时 {elapsed:.2f} 秒")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
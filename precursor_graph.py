@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+前驱体-材料二部图索引
+通过 process_id 连接前驱体（反应物）和材料，邻接关系以CSR紧凑数组保存：
+    offsets[i]:offsets[i+1] 是节点 i 的邻居在 targets 中的区间
+材料和前驱体组合相同的工艺归为同一个配方（recipe），合并多个快照时配方数基本不随工艺数增长
+支持邻居、共同前驱体、k跳和"现有前驱体能沉积哪些材料"查询；
+快照变化时只更新变化的工艺，多个快照可以合并到同一个图中
+
+用法:
+    python3 precursor_graph.py --stock AlMe3 --stock H2O --stock O3
+    python3 precursor_graph.py --neighbors AlMe3
+    python3 precursor_graph.py --shared Al2O3 HfO2
+    python3 precursor_graph.py --hops H2O -k 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from file_utils import atomic_open
+from snapshot_io import find_latest_snapshot, iter_records, snapshot_signature, strip_snapshot_extension
+
+GRAPH_VERSION = 1
+REACTANT_FIELDS = ['reactant_a', 'reactant_b', 'reactant_c', 'reactant_d']
+
+
+def graph_path(snapshot_path: str) -> str:
+    """快照对应的图索引文件，如 data/api_latest_data.json -> data/api_latest_data.graph.json"""
+    return strip_snapshot_extension(snapshot_path) + '.graph.json'
+
+
+def process_edges(record: Dict[str, Any]) -> Optional[Tuple[str, Tuple[str, ...]]]:
+    """工艺记录 -> (材料, 去重后的前驱体)，没有材料或前驱体时返回None"""
+    material = (record.get('material') or '').strip()
+    precursors = tuple(dict.fromkeys(value.strip() for value in (record.get(field) or '' for field in REACTANT_FIELDS)
+                                     if value.strip()))
+    if not material or not precursors:
+        return None
+    return material, precursors
+
+
+def _csr(rows: List[List[int]]) -> Tuple[array, array]:
+    """邻接列表 -> (offsets, targets)"""
+    offsets = array('i', [0])
+    targets = array('i')
+    for row in rows:
+        targets.extend(row)
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+class PrecursorGraph:
+    """前驱体-材料二部图"""
+
+    def __init__(self):
+        # 工艺表是增量更新的依据：process_id -> (材料, 前驱体)
+        self.processes: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        self.source: Dict[str, Any] = {}
+        self._pack()
+
+    def update(self, records: Iterable[Dict[str, Any]], replace: bool = True) -> Dict[str, int]:
+        """
+        用新的记录更新图，只处理新增、变化和删除的工艺
+        :param replace: True 表示 records 是完整快照，不在其中的工艺会被删除；
+                        False 用于合并多个快照，只新增或更新
+        :return: 新增 / 变化 / 删除的工艺数
+        """
+        seen = set()
+        added = changed = 0
+        for record in records:
+            process_id = record.get('process_id')
+            edges = process_edges(record)
+            if process_id is None or edges is None:
+                continue
+            seen.add(process_id)
+            previous = self.processes.get(process_id)
+            if previous == edges:
+                continue
+            if previous is None:
+                added += 1
+            else:
+                changed += 1
+            self.processes[process_id] = edges
+
+        removed = 0
+        if replace:
+            for process_id in [process_id for process_id in self.processes if process_id not in seen]:
+                del self.processes[process_id]
+                removed += 1
+
+        if added or changed or removed:
+            self._pack()
+        return {'added': added, 'changed': changed, 'removed': removed}
+
+    def _pack(self):
+        """由工艺表重新生成名称表、配方表和CSR邻接数组"""
+        recipes = {}
+        for pid, (material, precursors) in self.processes.items():
+            recipes.setdefault((material, tuple(sorted(precursors))), []).append(pid)
+        recipe_keys = sorted(recipes)
+
+        self.materials = sorted({material for material, _ in recipe_keys})
+        self.precursors = sorted({name for _, precursors in recipe_keys for name in precursors})
+        self.material_ids = {name: i for i, name in enumerate(self.materials)}
+        self.precursor_ids = {name: i for i, name in enumerate(self.precursors)}
+        self.recipe_processes = [sorted(recipes[key]) for key in recipe_keys]
+
+        recipe_material = array('i')
+        recipe_precursors = []
+        precursor_recipes = [[] for _ in self.precursors]
+        precursor_materials = [set() for _ in self.precursors]
+        material_precursors = [set() for _ in self.materials]
+        for index, (material, precursors) in enumerate(recipe_keys):
+            material_id = self.material_ids[material]
+            precursor_ids = [self.precursor_ids[name] for name in precursors]
+            recipe_material.append(material_id)
+            recipe_precursors.append(precursor_ids)
+            material_precursors[material_id].update(precursor_ids)
+            for precursor_id in precursor_ids:
+                precursor_recipes[precursor_id].append(index)
+                precursor_materials[precursor_id].add(material_id)
+
+        self.recipe_material = recipe_material
+        self.recipe_precursors = _csr(recipe_precursors)
+        self.precursor_recipes = _csr(precursor_recipes)
+        self.precursor_materials = _csr([sorted(ids) for ids in precursor_materials])
+        self.material_precursors = _csr([sorted(ids) for ids in material_precursors])
+        self._build_rows()
+
+    def _build_rows(self):
+        """k跳遍历用的逐行元组视图，整行合并时比切片数组快"""
+        self._precursor_material_rows = [tuple(self._row(self.precursor_materials, node))
+                                         for node in range(len(self.precursors))]
+        self._material_precursor_rows = [tuple(self._row(self.material_precursors, node))
+                                         for node in range(len(self.materials))]
+
+    @staticmethod
+    def _row(csr: Tuple[array, array], node: int) -> array:
+        offsets, targets = csr
+        return targets[offsets[node]:offsets[node + 1]]
+
+    def materials_for(self, precursor: str) -> List[str]:
+        """使用该前驱体沉积过的材料"""
+        node = self.precursor_ids.get(precursor)
+        if node is None:
+            return []
+        return [self.materials[i] for i in self._row(self.precursor_materials, node)]
+
+    def precursors_for(self, material: str) -> List[str]:
+        """沉积该材料用到过的前驱体"""
+        node = self.material_ids.get(material)
+        if node is None:
+            return []
+        return [self.precursors[i] for i in self._row(self.material_precursors, node)]
+
+    def shared_precursors(self, *materials: str) -> List[str]:
+        """几种材料共同使用过的前驱体"""
+        shared = None
+        for material in materials:
+            node = self.material_ids.get(material)
+            row = set(self._row(self.material_precursors, node)) if node is not None else set()
+            shared = row if shared is None else shared & row
+        return [self.precursors[i] for i in sorted(shared or ())]
+
+    def depositable(self, stock: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        只用现有前驱体就能完成的工艺，按材料分组
+        :return: 材料 -> process_id 列表
+        """
+        stock_ids = [self.precursor_ids[name] for name in set(stock) if name in self.precursor_ids]
+        # 统计每个配方有多少个前驱体在库存中，全部在库存中的配方即可完成
+        covered = Counter()
+        for precursor_id in stock_ids:
+            covered.update(self._row(self.precursor_recipes, precursor_id))
+        offsets = self.recipe_precursors[0]
+        result = {}
+        for recipe, count in covered.items():
+            if count == offsets[recipe + 1] - offsets[recipe]:
+                material = self.materials[self.recipe_material[recipe]]
+                result.setdefault(material, []).extend(self.recipe_processes[recipe])
+        return {material: sorted(pids) for material, pids in sorted(result.items())}
+
+    def k_hop(self, name: str, k: int = 2) -> Dict[str, int]:
+        """
+        从前驱体或材料出发，k跳内可达的节点及其距离
+        一跳为前驱体<->材料，两跳为共用材料的前驱体（或共用前驱体的材料）
+        """
+        if name in self.precursor_ids:
+            frontier, is_precursor = [self.precursor_ids[name]], True
+        elif name in self.material_ids:
+            frontier, is_precursor = [self.material_ids[name]], False
+        else:
+            return {}
+
+        # 两侧分别记录已访问的节点；每一跳整行合并邻接数组，避免逐条边的Python循环
+        visited = ({self.precursor_ids[name]}, set()) if is_precursor else (set(), {self.material_ids[name]})
+        distances = {}
+        for hop in range(1, k + 1):
+            rows = self._precursor_material_rows if is_precursor else self._material_precursor_rows
+            names = self.materials if is_precursor else self.precursors
+            seen = visited[1] if is_precursor else visited[0]
+            reached = set()
+            for node in frontier:
+                reached.update(rows[node])
+            reached -= seen
+            if not reached:
+                break
+            seen |= reached
+            distances.update((names[node], hop) for node in sorted(reached))
+            frontier, is_precursor = reached, not is_precursor
+        return distances
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': GRAPH_VERSION,
+            'source': self.source,
+            'processes': {pid: [material, list(precursors)] for pid, (material, precursors) in self.processes.items()},
+            'materials': self.materials,
+            'precursors': self.precursors,
+            'recipe_processes': self.recipe_processes,
+            'recipe_material': self.recipe_material.tolist(),
+            'csr': {name: [offsets.tolist(), targets.tolist()] for name, (offsets, targets) in self._csr_arrays().items()},
+        }
+
+    def _csr_arrays(self) -> Dict[str, Tuple[array, array]]:
+        return {
+            'recipe_precursors': self.recipe_precursors,
+            'precursor_recipes': self.precursor_recipes,
+            'precursor_materials': self.precursor_materials,
+            'material_precursors': self.material_precursors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PrecursorGraph':
+        """从保存的图索引恢复，直接使用预先计算的邻接数组"""
+        graph = cls.__new__(cls)
+        graph.source = data.get('source', {})
+        graph.processes = {pid: (material, tuple(precursors)) for pid, (material, precursors) in data['processes'].items()}
+        graph.materials = data['materials']
+        graph.precursors = data['precursors']
+        graph.material_ids = {name: i for i, name in enumerate(graph.materials)}
+        graph.precursor_ids = {name: i for i, name in enumerate(graph.precursors)}
+        graph.recipe_processes = data['recipe_processes']
+        graph.recipe_material = array('i', data['recipe_material'])
+        for name, (offsets, targets) in data['csr'].items():
+            setattr(graph, name, (array('i', offsets), array('i', targets)))
+        graph._build_rows()
+        return graph
+
+    def save(self, path: str):
+        with atomic_open(path) as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, snapshot_path: str = None, rebuild: bool = False) -> 'PrecursorGraph':
+        """
+        加载快照的图索引；快照变化时在原有图上增量更新后保存
+        :param snapshot_path: 默认使用 data/ 下的最新数据文件
+        """
+        snapshot_path = snapshot_path or find_latest_snapshot()
+        if not snapshot_path or not os.path.exists(snapshot_path):
+            raise FileNotFoundError("未找到最新数据文件，请先运行 api_crawler.py")
+
+        path = graph_path(snapshot_path)
+        graph = None
+        if not rebuild:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == GRAPH_VERSION:
+                    graph = cls.from_dict(data)
+            except (FileNotFoundError, json.JSONDecodeError, KeyError):
+                graph = None
+
+        if graph is not None:
+            signature = snapshot_signature(snapshot_path, with_hash=False)
+            if all(graph.source.get(key) == value for key, value in signature.items()):
+                return graph
+        else:
+            graph = cls()
+
+        signature = snapshot_signature(snapshot_path)
+        if graph.source.get('sha256') != signature['sha256']:
+            changes = graph.update(iter_records(snapshot_path))
+            print(f"图索引已更新: 新增 {changes['added']}，变化 {changes['changed']}，删除 {changes['removed']}",
+                  file=sys.stderr)
+        graph.source = signature
+        graph.save(path)
+        return graph
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='前驱体-材料图查询')
+    parser.add_argument('--stock', action='append', default=[], help='现有的前驱体，可重复指定；列出只用这些前驱体就能完成的工艺')
+    parser.add_argument('--neighbors', metavar='NAME', help='前驱体对应的材料，或材料对应的前驱体')
+    parser.add_argument('--shared', nargs='+', metavar='MATERIAL', help='几种材料共同使用的前驱体')
+    parser.add_argument('--hops', metavar='NAME', help='从前驱体或材料出发的k跳邻域')
+    parser.add_argument('-k', type=int, default=2, help='k跳查询的跳数（默认: 2）')
+    parser.add_argument('--merge', nargs='+', metavar='SNAPSHOT', help='将多个快照合并到同一个图中再查询')
+    parser.add_argument('--snapshot', help='快照文件（默认: data目录下的最新数据文件）')
+    parser.add_argument('--rebuild', action='store_true', help='强制重建图索引')
+
+    args = parser.parse_args(argv)
+
+    try:
+        graph = PrecursorGraph.load(args.snapshot, rebuild=args.rebuild)
+    except FileNotFoundError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    for path in args.merge or []:
+        graph.update(iter_records(path), replace=False)
+
+    start = time.perf_counter()
+    if args.stock:
+        result = graph.depositable(args.stock)
+    elif args.neighbors:
+        name = args.neighbors
+        result = graph.materials_for(name) if name in graph.precursor_ids else graph.precursors_for(name)
+    elif args.shared:
+        result = graph.shared_precursors(*args.shared)
+    elif args.hops:
+        result = graph.k_hop(args.hops, args.k)
+    else:
+        result = {'processes': len(graph.processes), 'materials': len(graph.materials),
+                  'precursors': len(graph.precursors)}
+    elapsed = (time.perf_counter() - start) * 1000
+
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+    print(f"查询耗时 {elapsed:.3f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
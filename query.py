@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ALD工艺查询工具
+在最新数据快照旁维护持久化的倒排索引（材料、四个反应物列、贡献者、DOI、审核状态），
+快照变化时才重建索引；同一字段的多个取值为OR，不同字段之间为AND（--any 时全部为OR）
+
+--text 使用 text_index.py 的trigram索引对备注、作者和DOI做子串或模糊查询，只在需要时加载
+
+用法:
+    python3 query.py --material ZrO2 --reactant H2O2
+    python3 query.py --reactant TMA --reactant TEA --format csv
+    python3 query.py --text puuronen --fuzzy
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from file_utils import atomic_open
+from snapshot_io import find_latest_snapshot, iter_records, snapshot_signature, strip_snapshot_extension
+
+INDEX_VERSION = 1
+
+REACTANT_FIELDS = ['reactant_a', 'reactant_b', 'reactant_c', 'reactant_d']
+INDEX_FIELDS = ['material'] + REACTANT_FIELDS + ['contributor', 'doi', 'reviewed']
+
+# 索引中保存的结果摘要列，表格和CSV输出不需要再读取快照
+SUMMARY_COLUMNS = ['process_id', 'material'] + REACTANT_FIELDS + ['contributor', 'reviewed', 'reference_count', 'dois']
+TABLE_COLUMNS = ['process_id', 'material'] + REACTANT_FIELDS + ['contributor', 'reviewed']
+
+
+def normalize(value: Any) -> str:
+    """索引键：去掉首尾空白，不区分大小写"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value).strip().casefold()
+
+
+def index_path(snapshot_path: str) -> str:
+    """快照对应的索引文件，如 data/api_latest_data.json -> data/api_latest_data.index.json"""
+    return strip_snapshot_extension(snapshot_path) + '.index.json'
+
+
+def build_index(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """从 process_data 格式的记录构建倒排索引：字段 -> 取值 -> 记录位置列表"""
+    postings = {field: {} for field in INDEX_FIELDS}
+    rows = []
+    for position, record in enumerate(records):
+        references = record.get('references') or []
+        dois = [ref.get('doi', '') for ref in references if ref.get('doi', '')]
+        rows.append([
+            record.get('process_id', ''),
+            record.get('material', ''),
+            *(record.get(field, '') for field in REACTANT_FIELDS),
+            record.get('contributor', ''),
+            bool(record.get('reviewed', False)),
+            len(references),
+            dois,
+        ])
+
+        for field in ['material'] + REACTANT_FIELDS + ['contributor']:
+            value = record.get(field, '')
+            if value:
+                postings[field].setdefault(normalize(value), []).append(position)
+        # 同一记录的重复DOI只索引一次
+        for doi in dict.fromkeys(normalize(doi) for doi in dois):
+            postings['doi'].setdefault(doi, []).append(position)
+        postings['reviewed'].setdefault(normalize(bool(record.get('reviewed', False))), []).append(position)
+
+    return {'version': INDEX_VERSION, 'columns': SUMMARY_COLUMNS, 'rows': rows, 'postings': postings}
+
+
+class QueryIndex:
+    """持久化的倒排索引"""
+
+    def __init__(self, data: Dict[str, Any], snapshot_path: str = None):
+        self.snapshot_path = snapshot_path
+        self.columns = data['columns']
+        self.rows = data['rows']
+        self.postings = data['postings']
+
+    @classmethod
+    def load(cls, snapshot_path: str = None, rebuild: bool = False) -> 'QueryIndex':
+        """
+        加载快照的索引，索引不存在或快照已变化时重建
+        :param snapshot_path: 默认使用 data/ 下的最新数据文件
+        """
+        snapshot_path = snapshot_path or find_latest_snapshot()
+        if not snapshot_path or not os.path.exists(snapshot_path):
+            raise FileNotFoundError("未找到最新数据文件，请先运行 api_crawler.py")
+
+        path = index_path(snapshot_path)
+        data = None
+        if not rebuild:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = None
+
+        if data is not None and data.get('version') == INDEX_VERSION:
+            source = data.get('source', {})
+            signature = snapshot_signature(snapshot_path, with_hash=False)
+            if all(source.get(key) == value for key, value in signature.items()):
+                return cls(data, snapshot_path)
+            # 修改时间变了但内容可能没变（例如重新发布了相同的文件），按内容哈希确认
+            signature = snapshot_signature(snapshot_path)
+            if source.get('sha256') == signature['sha256']:
+                data['source'] = signature
+                cls._save(path, data)
+                return cls(data, snapshot_path)
+
+        print(f"正在为 {snapshot_path} 构建索引...", file=sys.stderr)
+        signature = snapshot_signature(snapshot_path)
+        data = build_index(iter_records(snapshot_path))
+        data['source'] = signature
+        cls._save(path, data)
+        return cls(data, snapshot_path)
+
+    @staticmethod
+    def _save(path: str, data: Dict[str, Any]):
+        with atomic_open(path) as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+    def lookup(self, field: str, values: Iterable[str]) -> Set[int]:
+        """字段等于任一取值的记录位置；reactant 表示四个反应物列中任意一列"""
+        fields = REACTANT_FIELDS if field == 'reactant' else [field]
+        matches = set()
+        for name in fields:
+            postings = self.postings[name]
+            for value in values:
+                matches.update(postings.get(normalize(value), ()))
+        return matches
+
+    def search(self, filters: Dict[str, List[str]], match_any: bool = False) -> List[int]:
+        """
+        按过滤条件查询，返回按快照顺序排列的记录位置
+        :param filters: 字段 -> 取值列表，同一字段的取值之间为OR
+        :param match_any: 不同字段之间使用OR（默认AND）
+        """
+        result = None
+        # 先处理命中最少的字段，AND时尽早缩小候选集
+        for matches in sorted((self.lookup(field, values) for field, values in filters.items() if values), key=len):
+            if result is None:
+                result = matches
+            elif match_any:
+                result |= matches
+            else:
+                result &= matches
+        if result is None:
+            return list(range(len(self.rows)))
+        return sorted(result)
+
+    def summaries(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """记录位置对应的结果摘要"""
+        return [dict(zip(self.columns, self.rows[position])) for position in positions]
+
+    def records(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """从快照中读取完整记录，保持 positions 的顺序"""
+        positions = list(positions)
+        wanted = set(positions)
+        found = {position: record for position, record in enumerate(iter_records(self.snapshot_path))
+                 if position in wanted}
+        return [found[position] for position in positions if position in found]
+
+
+def write_results(results: List[Dict[str, Any]], fmt: str = 'table', out=None):
+    """按 json / table / csv 格式输出查询结果"""
+    out = out or sys.stdout
+    if fmt == 'json':
+        json.dump(results, out, ensure_ascii=False, indent=2)
+        out.write('\n')
+        return
+
+    if fmt == 'csv':
+        columns = list(results[0]) if results else SUMMARY_COLUMNS
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for result in results:
+            writer.writerow(['; '.join(value) if isinstance(value, list) else value
+                             for value in (result.get(column, '') for column in columns)])
+        return
+
+    columns = TABLE_COLUMNS + ['score'] if results and 'score' in results[0] else TABLE_COLUMNS
+    rows = [[str(result.get(column, '')) for column in columns] for result in results]
+    widths = [max([len(column)] + [len(row[i]) for row in rows]) for i, column in enumerate(columns)]
+    out.write('  '.join(column.ljust(width) for column, width in zip(columns, widths)).rstrip() + '\n')
+    out.write('  '.join('-' * width for width in widths) + '\n')
+    for row in rows:
+        out.write('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() + '\n')
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='ALD工艺查询工具（基于最新数据快照的倒排索引）')
+    parser.add_argument('--material', action='append', default=[], help='材料，可重复指定（OR）')
+    parser.add_argument('--reactant', action='append', default=[], help='任一反应物列等于该值，可重复指定（OR）')
+    for field in REACTANT_FIELDS:
+        parser.add_argument(f"--{field.replace('_', '-')}", dest=field, action='append', default=[],
+                            help=f'只匹配 {field} 列')
+    parser.add_argument('--contributor', action='append', default=[], help='贡献者')
+    parser.add_argument('--doi', action='append', default=[], help='参考文献DOI')
+    reviewed = parser.add_mutually_exclusive_group()
+    reviewed.add_argument('--reviewed', dest='reviewed', action='store_const', const=['true'], default=[],
+                          help='只返回已审核的记录')
+    reviewed.add_argument('--unreviewed', dest='reviewed', action='store_const', const=['false'],
+                          help='只返回未审核的记录')
+    parser.add_argument('--text', help='在备注、完整作者列表和DOI中查询子串，结果按相关度排序')
+    parser.add_argument('--text-field', action='append', choices=['note', 'full_authors', 'doi'],
+                        help='只在指定的文本字段中查询，可重复指定')
+    parser.add_argument('--fuzzy', action='store_true', help='按trigram相似度模糊匹配（容忍拼写错误）')
+    parser.add_argument('--min-score', type=float, default=0.5, help='模糊匹配的最低相似度（默认: 0.5）')
+    parser.add_argument('--any', action='store_true', help='不同条件之间使用OR（默认AND）')
+    parser.add_argument('-f', '--format', choices=['table', 'json', 'csv'], default='table', help='输出格式（默认: table）')
+    parser.add_argument('--full', action='store_true', help='JSON输出完整记录（从快照读取参考文献详情）')
+    parser.add_argument('--limit', type=int, help='最多输出的记录数')
+    parser.add_argument('--snapshot', help='快照文件（默认: data目录下的最新数据文件）')
+    parser.add_argument('--rebuild', action='store_true', help='强制重建索引')
+
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        index = QueryIndex.load(args.snapshot, rebuild=args.rebuild)
+    except FileNotFoundError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+
+    filters = {field: getattr(args, field) for field in ['material', 'reactant'] + INDEX_FIELDS[1:]}
+    positions = index.search(filters, match_any=args.any)
+    scores = {}
+    if args.text:
+        # 全文索引只在文本查询时加载；与其它条件之间为AND，按相关度排序
+        from text_index import TextIndex
+        text_index = TextIndex.load(index.snapshot_path, rebuild=args.rebuild)
+        allowed = set(positions)
+        ranked = text_index.search(args.text, args.text_field, fuzzy=args.fuzzy, min_score=args.min_score)
+        ranked = [item for item in ranked if item[0] in allowed]
+        positions = [position for position, _, _ in ranked]
+        scores = {position: (score, fields) for position, score, fields in ranked}
+    if args.limit is not None:
+        positions = positions[:args.limit]
+
+    if args.full and args.format == 'json':
+        results = index.records(positions)
+    else:
+        results = index.summaries(positions)
+    for position, result in zip(positions, results):
+        if position in scores:
+            result['score'], result['matched_fields'] = scores[position]
+    elapsed = (time.perf_counter() - start) * 1000
+
+    write_results(results, args.format)
+    print(f"共 {len(results)} 条记录（{elapsed:.1f} ms）", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可续传的原始响应下载
+响应体在解析之前先流式写入磁盘，下载完成后保存为压缩存档（data/raw/api_raw_YYYYMMDD_HHMMSS.json.gz），
+解析失败时可以直接从存档重试，不需要重新请求API
+
+- 网络错误、429 和 5xx 按带随机抖动的指数退避重试
+- 中断的下载保留在 data/raw/ 下的 .part 文件中，重试（包括下一次运行）时用
+  Range + If-Range 从断点继续；服务器不支持续传或内容已变化时从头下载
+- 请求时只接受 gzip 编码并保存未解码的字节，续传的偏移量与服务器的字节一致，
+  gzip 响应下载完成后直接就是存档；未压缩的响应在完成后压缩
+"""
+
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import random
+import re
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+import requests
+import urllib3
+
+from file_utils import atomic_open, atomic_path
+from json_stream import DEFAULT_CHUNK_SIZE
+
+# 读取响应体时连接中断等错误
+_STREAM_ERRORS = (requests.exceptions.RequestException, urllib3.exceptions.HTTPError,
+                  http.client.HTTPException, ConnectionError, TimeoutError)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class IncompleteDownload(Exception):
+    """响应体比 Content-Length 短"""
+
+
+def iter_raw_archive_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """按块读取存档中解压后的响应体"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def read_raw_archive(path: str) -> bytes:
+    """读取存档中解压后的完整响应体"""
+    return b''.join(iter_raw_archive_chunks(path))
+
+
+class RawArchiveDownloader:
+    """带重试和断点续传的下载器，响应体保存为压缩存档"""
+
+    def __init__(self, session: requests.Session, archive_dir: str = 'data/raw', retries: int = 5,
+                 backoff: float = 1.0, timeout: float = 30, keep: int = 5):
+        """
+        :param session: 发送请求的会话
+        :param retries: 最大重试次数
+        :param backoff: 第一次重试前的等待秒数，之后每次翻倍（加随机抖动）
+        :param keep: 保留的存档数，更早的存档被删除
+        """
+        self.session = session
+        self.archive_dir = archive_dir
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.keep = keep
+        self.etag = ''
+        self.last_modified = ''
+        self.stats = {}
+
+    def _part_paths(self, url: str):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+        part = os.path.join(self.archive_dir, f'.api_raw_{key}.part')
+        return part, part + '.json'
+
+    def _retry_delay(self, attempt: int) -> float:
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    @staticmethod
+    def _total_length(response: requests.Response) -> Optional[int]:
+        """完整响应体的字节数（未解码），未知时为None"""
+        match = re.match(r'bytes \d+-\d+/(\d+)', response.headers.get('Content-Range', ''))
+        if match:
+            return int(match.group(1))
+        length = response.headers.get('Content-Length', '')
+        return int(length) if response.status_code == 200 and length.isdigit() else None
+
+    def download(self, url: str, headers: Dict[str, str] = None) -> Optional[str]:
+        """
+        下载响应体并保存为存档
+        :param headers: 附加请求头（如条件请求头）
+        :return: 存档路径；服务器返回 304 时为 None
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        part, state_file = self._part_paths(url)
+        state = self._load_state(state_file, url)
+        offset = os.path.getsize(part) if state and os.path.exists(part) else 0
+        self.stats = {'attempts': 0, 'resumed_bytes': 0, 'bytes': 0, 'elapsed': 0.0}
+        start = time.perf_counter()
+
+        for attempt in range(self.retries + 1):
+            self.stats['attempts'] += 1
+            request_headers = dict(headers or {})
+            request_headers['Accept-Encoding'] = 'gzip'
+            if offset:
+                # 续传时不能带条件请求头，否则内容未变时会得到 304 而不是剩余部分
+                request_headers.pop('If-None-Match', None)
+                request_headers.pop('If-Modified-Since', None)
+                request_headers['Range'] = f'bytes={offset}-'
+                validator = state.get('etag') or state.get('last_modified')
+                if validator:
+                    request_headers['If-Range'] = validator
+            try:
+                response = self.session.get(url, headers=request_headers, stream=True, timeout=self.timeout)
+                try:
+                    if response.status_code == 304:
+                        self._discard(part, state_file)
+                        return None
+                    if response.status_code == 416:
+                        # 本地部分已经不对应服务器上的内容
+                        self._discard(part, state_file)
+                        offset, state = 0, {}
+                        raise IncompleteDownload("续传范围无效，将重新下载")
+                    if response.status_code in RETRY_STATUSES:
+                        raise requests.exceptions.HTTPError(f"HTTP {response.status_code}", response=response)
+                    response.raise_for_status()
+
+                    if response.status_code == 206 and offset:
+                        self.stats['resumed_bytes'] += offset
+                        mode = 'ab'
+                    else:
+                        # 服务器返回了完整内容（不支持续传或内容已变化），从头写入
+                        offset = 0
+                        mode = 'wb'
+                        state = {
+                            'url': url,
+                            'etag': response.headers.get('ETag', ''),
+                            'last_modified': response.headers.get('Last-Modified', ''),
+                            'encoding': response.headers.get('Content-Encoding', '').strip().lower(),
+                            'length': self._total_length(response),
+                        }
+                        if state['encoding'] not in ('', 'identity', 'gzip'):
+                            raise ValueError(f"不支持的响应编码: {state['encoding']}")
+                        with atomic_open(state_file) as f:
+                            json.dump(state, f)
+                    if state.get('length') is None:
+                        state['length'] = self._total_length(response)
+
+                    with open(part, mode) as f:
+                        # 保存未解码的字节，偏移量与服务器的 Range 一致
+                        for chunk in response.raw.stream(DEFAULT_CHUNK_SIZE, decode_content=False):
+                            f.write(chunk)
+                            offset += len(chunk)
+                            self.stats['bytes'] += len(chunk)
+                finally:
+                    response.close()
+
+                if state.get('length') is not None and offset < state['length']:
+                    raise IncompleteDownload(f"只收到 {offset}/{state['length']} 字节")
+                break
+            except IncompleteDownload as e:
+                error = e
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in RETRY_STATUSES:
+                    raise
+                error = e
+            except _STREAM_ERRORS as e:
+                error = e
+            if attempt == self.retries:
+                raise requests.exceptions.ConnectionError(f"重试 {self.retries} 次后仍失败: {error}")
+            delay = self._retry_delay(attempt)
+            print(f"下载中断（{error}），已接收 {offset} 字节，{delay:.1f} 秒后重试...")
+            time.sleep(delay)
+
+        self.etag = state.get('etag', '')
+        self.last_modified = state.get('last_modified', '')
+        archive = self._finalize(part, state_file, state)
+        self.stats['elapsed'] = time.perf_counter() - start
+        return archive
+
+    @staticmethod
+    def _load_state(state_file: str, url: str) -> Dict[str, str]:
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return state if state.get('url') == url else {}
+
+    @staticmethod
+    def _discard(part: str, state_file: str):
+        for path in (part, state_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _finalize(self, part: str, state_file: str, state: Dict[str, str]) -> str:
+        """把下载完成的部分文件转为带时间戳的压缩存档"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        archive = os.path.join(self.archive_dir, f'api_raw_{timestamp}.json.gz')
+        if state.get('encoding') == 'gzip':
+            os.replace(part, archive)
+        else:
+            with atomic_path(archive) as tmp_path:
+                with open(part, 'rb') as fsrc, gzip.GzipFile(tmp_path, 'wb', mtime=0) as fdst:
+                    shutil.copyfileobj(fsrc, fdst, DEFAULT_CHUNK_SIZE)
+            os.remove(part)
+        os.remove(state_file)
+        self._prune()
+        return archive
+
+    def _prune(self):
+        """只保留最新的 keep 个存档"""
+        archives = sorted(name for name in os.listdir(self.archive_dir)
+                          if name.startswith('api_raw_') and name.endswith('.json.gz'))
+        for name in archives[:-self.keep] if self.keep else []:
+            os.remove(os.path.join(self.archive_dir, name))
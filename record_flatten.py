@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+记录展平工具
+将 process_data 输出的嵌套记录一次性转换为列式DataFrame，
+主数据表和参考文献详情表都由同一个展开后的参考文献表派生
+"""
+
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from excel_export import LINK_STATUS_COLUMN, MAIN_COLUMNS, REFERENCE_COLUMNS
+
+PROCESS_FIELDS = ['process_id', 'material', 'reactant_a', 'reactant_b', 'reactant_c', 'reactant_d',
+                  'note', 'contributor', 'reviewed', 'references']
+REFERENCE_FIELDS = ['doi', 'url', 'author', 'full_authors', 'citations', 'submitted']
+REFERENCE_DEFAULTS = {'doi': '', 'url': '', 'author': '', 'full_authors': '', 'citations': '0', 'submitted': ''}
+
+
+def records_frame(data: List[Dict[str, Any]]) -> pd.DataFrame:
+    """工艺记录表，每条记录一行，references列保留原始列表"""
+    df = pd.DataFrame.from_records(data, columns=PROCESS_FIELDS)
+    text_fields = PROCESS_FIELDS[:-2]
+    df[text_fields] = df[text_fields].fillna('')
+    df['reviewed'] = df['reviewed'].fillna(False).astype(bool)
+    df['references'] = df['references'].map(lambda refs: refs if isinstance(refs, list) else [])
+    return df
+
+
+def explode_references(records: pd.DataFrame) -> pd.DataFrame:
+    """展开参考文献，每条参考文献一行，索引为所属记录在records中的行号"""
+    exploded = records['references'].explode().dropna()
+    refs = pd.DataFrame(exploded.tolist(), index=exploded.index, columns=REFERENCE_FIELDS)
+    return refs.fillna(REFERENCE_DEFAULTS)
+
+
+def flatten_records(data: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """返回 (工艺记录表, 展开的参考文献表)"""
+    records = records_frame(data)
+    return records, explode_references(records)
+
+
+def _join_non_empty(refs: pd.DataFrame, column: str, index: pd.Index) -> pd.Series:
+    """按记录合并非空值，以 '; ' 连接"""
+    values = refs[column]
+    values = values[values != '']
+    # 分组字符串求和比逐组调用 '; '.join 快一个数量级
+    joined = (values + '; ').groupby(level=0).sum().str[:-2]
+    return joined.reindex(index, fill_value='')
+
+
+def build_main_frame(records: pd.DataFrame, refs: pd.DataFrame) -> pd.DataFrame:
+    """主数据表（ALD工艺数据）"""
+    citations = refs['citations'].astype(str)
+    citations = citations[citations.str.isdigit()].astype(np.int64)
+    total_citations = citations.groupby(level=0).sum().reindex(records.index, fill_value=0)
+
+    return pd.DataFrame({
+        '工艺ID': records['process_id'],
+        '材料': records['material'],
+        '反应物A': records['reactant_a'],
+        '反应物B': records['reactant_b'],
+        '反应物C': records['reactant_c'],
+        '反应物D': records['reactant_d'],
+        '备注': records['note'],
+        '贡献者': records['contributor'],
+        '已审核': np.where(records['reviewed'], '是', '否'),
+        '参考文献数量': records['references'].str.len(),
+        'DOI列表': _join_non_empty(refs, 'doi', records.index),
+        'URL链接': _join_non_empty(refs, 'url', records.index),
+        '作者列表': _join_non_empty(refs, 'author', records.index),
+        '总引用数': total_citations,
+    }, columns=MAIN_COLUMNS)
+
+
+def build_reference_frame(records: pd.DataFrame, refs: pd.DataFrame,
+                          link_status: Dict[str, str] = None) -> pd.DataFrame:
+    """
+    参考文献详情表
+    :param link_status: DOI -> 链接状态，提供时增加链接状态列
+    """
+    # 参考文献表的索引就是所属记录的行号，按位置取值
+    owner_rows = refs.index.to_numpy()
+    owners = records[['process_id', 'material']].take(owner_rows).reset_index(drop=True)
+    details = refs.reset_index(drop=True)
+    frame = pd.DataFrame({
+        '工艺ID': owners['process_id'],
+        '材料': owners['material'],
+        'DOI': details['doi'],
+        'URL链接': details['url'],
+        '作者': details['author'],
+        '完整作者列表': details['full_authors'],
+        '引用数': details['citations'],
+        '提交日期': details['submitted'],
+    }, columns=REFERENCE_COLUMNS)
+    if link_status is not None:
+        frame[LINK_STATUS_COLUMN] = details['doi'].map(link_status).fillna('')
+    return frame
+
+
+def build_excel_frames(data: List[Dict[str, Any]],
+                       link_status: Dict[str, str] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """一次展平，返回 (主数据表, 参考文献详情表)"""
+    records, refs = flatten_records(data)
+    return build_main_frame(records, refs), build_reference_frame(records, refs, link_status)
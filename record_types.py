@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑的工艺记录类型
+process_data 产生的记录使用 __slots__ 存储，分类字段的字符串驻留（intern），
+引用数在读入时解析为整数，URL由DOI按需生成；
+记录实现只读的 Mapping 接口，record['material'] / record.get() 等用法与字典一致，
+序列化时通过 json_default 输出与原字典完全相同的JSON
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, List
+
+DOI_URL_PREFIX = 'https://doi.org/'
+
+
+_intern_str = sys.intern
+
+
+def _intern(value: Any) -> Any:
+    """驻留字符串，相同内容的字段共享同一个对象"""
+    return _intern_str(value) if type(value) is str else value
+
+
+def _parse_citations(value: Any) -> Any:
+    """规范的十进制数字串（无前导零）解析为整数，其它值（空串、None等）原样保留以便输出不变"""
+    if type(value) is str and value.isascii() and value.isdigit() and (value[0] != '0' or value == '0'):
+        return int(value)
+    return _intern(value)
+
+
+class _SlotMapping(Mapping):
+    """以 __slots__ 存储字段的只读映射，键顺序与原字典一致"""
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._fields
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self._fields}
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def __reduce__(self):
+        return _from_dict, (type(self), self.to_dict())
+
+
+class Reference(_SlotMapping):
+    """参考文献"""
+    __slots__ = ('doi', 'author', 'full_authors', '_citations', 'submitted')
+    _fields = ('doi', 'url', 'author', 'full_authors', 'citations', 'submitted')
+
+    def __init__(self, doi: str = '', author: str = '', full_authors: str = '', citations: Any = '0',
+                 submitted: str = ''):
+        self.doi = doi
+        self.author = _intern(author)
+        self.full_authors = _intern(full_authors)
+        self._citations = _parse_citations(citations)
+        self.submitted = _intern(submitted)
+
+    @property
+    def url(self) -> str:
+        """DOI对应的标准URL链接"""
+        return DOI_URL_PREFIX + self.doi if self.doi else ''
+
+    @property
+    def citations(self) -> Any:
+        """原始格式的引用数（字符串）"""
+        value = self._citations
+        return str(value) if type(value) is int else value
+
+    @citations.setter
+    def citations(self, value: Any):
+        self._citations = _parse_citations(value)
+
+    @property
+    def citation_count(self) -> int:
+        """整数引用数，无法解析时为0"""
+        value = self._citations
+        return value if type(value) is int else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        doi = self.doi
+        citations = self._citations
+        return {
+            'doi': doi,
+            'url': DOI_URL_PREFIX + doi if doi else '',
+            'author': self.author,
+            'full_authors': self.full_authors,
+            'citations': str(citations) if type(citations) is int else citations,
+            'submitted': self.submitted
+        }
+
+
+class ProcessRecord(_SlotMapping):
+    """ALD工艺记录"""
+    __slots__ = ('process_id', 'material', 'reactant_a', 'reactant_b', 'reactant_c', 'reactant_d',
+                 'note', 'contributor', 'reviewed', 'references')
+    _fields = __slots__
+
+    def __init__(self, process_id: str, material: str = '', reactant_a: str = '', reactant_b: str = '',
+                 reactant_c: str = '', reactant_d: str = '', note: str = '', contributor: str = '',
+                 reviewed: bool = False, references: List[Reference] = None):
+        self.process_id = process_id
+        self.material = _intern(material)
+        self.reactant_a = _intern(reactant_a)
+        self.reactant_b = _intern(reactant_b)
+        self.reactant_c = _intern(reactant_c)
+        self.reactant_d = _intern(reactant_d)
+        self.note = note
+        self.contributor = _intern(contributor)
+        self.reviewed = reviewed
+        self.references = references if references is not None else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'process_id': self.process_id,
+            'material': self.material,
+            'reactant_a': self.reactant_a,
+            'reactant_b': self.reactant_b,
+            'reactant_c': self.reactant_c,
+            'reactant_d': self.reactant_d,
+            'note': self.note,
+            'contributor': self.contributor,
+            'reviewed': self.reviewed,
+            'references': self.references
+        }
+
+
+def _from_dict(cls, data: Dict[str, Any]) -> _SlotMapping:
+    data = dict(data)
+    data.pop('url', None)
+    return cls(**data)
+
+
+def plain_record(record: Mapping) -> Dict[str, Any]:
+    """转换为普通字典（包括参考文献），普通字典原样返回；逐条序列化时比 default 钩子快"""
+    if not isinstance(record, ProcessRecord):
+        return record
+    plain = record.to_dict()
+    plain['references'] = [ref.to_dict() if isinstance(ref, Reference) else ref for ref in record.references]
+    return plain
+
+
+def json_default(obj: Any) -> Any:
+    """json.dump 的 default 钩子，把紧凑记录输出为普通字典"""
+    if isinstance(obj, _SlotMapping):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
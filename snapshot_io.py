@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快照读写工具
+支持原有的缩进JSON数组，以及紧凑的按行JSON（可选gzip/lzma压缩）格式，
+读取时逐条产生记录，不需要把整个列表加载到内存
+"""
+
+import gzip
+import hashlib
+import json
+import lzma
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from file_utils import atomic_open
+from json_stream import iter_file_chunks, iter_json_events
+from record_types import plain_record
+
+# 格式名 -> 文件扩展名
+SNAPSHOT_FORMATS = {
+    'json': '.json',
+    'jsonl': '.jsonl',
+    'jsonl.gz': '.jsonl.gz',
+    'jsonl.xz': '.jsonl.xz',
+}
+
+
+def snapshot_format(path: str) -> str:
+    """根据文件扩展名判断快照格式"""
+    for fmt in ('jsonl.gz', 'jsonl.xz', 'jsonl', 'json'):
+        if path.endswith(SNAPSHOT_FORMATS[fmt]):
+            return fmt
+    raise ValueError(f"无法识别的快照格式: {path}")
+
+
+def strip_snapshot_extension(path: str) -> str:
+    """去掉快照扩展名，如 data/a.jsonl.gz -> data/a"""
+    return path[:-len(SNAPSHOT_FORMATS[snapshot_format(path)])]
+
+
+def is_snapshot_file(path: str) -> bool:
+    try:
+        snapshot_format(path)
+        return True
+    except ValueError:
+        return False
+
+
+def find_latest_snapshot(data_dir: str = 'data', name: str = 'api_latest_data',
+                         preferred: str = 'json') -> Optional[str]:
+    """
+    查找最新数据文件；切换 --snapshot-format 后旧格式的文件仍然存在，
+    因此多种格式并存时取修改时间最新的，修改时间相同时优先使用 preferred 格式
+    """
+    candidates = []
+    for fmt, extension in SNAPSHOT_FORMATS.items():
+        path = os.path.join(data_dir, name + extension)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        candidates.append((mtime, fmt == preferred, path))
+    return max(candidates)[2] if candidates else None
+
+
+def snapshot_signature(snapshot_path: str, with_hash: bool = True) -> Dict[str, Any]:
+    """快照的大小、修改时间和内容哈希，用于判断索引是否过期"""
+    stat = os.stat(snapshot_path)
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(snapshot_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        signature['sha256'] = digest.hexdigest()
+    return signature
+
+
+def write_snapshot(records: Iterable[Dict[str, Any]], path: str) -> int:
+    """
+    按扩展名对应的格式原子写入快照
+    :return: 写入的记录数
+    """
+    fmt = snapshot_format(path)
+    count = 0
+    if fmt == 'json':
+        # 逐条写出，输出与 json.dump(records, indent=2) 逐字节一致
+        with atomic_open(path) as f:
+            f.write('[')
+            for record in records:
+                f.write(',\n  ' if count else '\n  ')
+                f.write(json.dumps(plain_record(record), ensure_ascii=False, indent=2).replace('\n', '\n  '))
+                count += 1
+            f.write('\n]' if count else ']')
+        return count
+
+    with atomic_open(path, 'wb') as raw:
+        if fmt == 'jsonl.gz':
+            # mtime=0 使相同内容的压缩结果逐字节一致
+            f = gzip.GzipFile(fileobj=raw, mode='wb', mtime=0)
+        elif fmt == 'jsonl.xz':
+            f = lzma.LZMAFile(raw, mode='wb', preset=6)
+        else:
+            f = raw
+        try:
+            for record in records:
+                f.write(json.dumps(plain_record(record), ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                f.write(b'\n')
+                count += 1
+        finally:
+            if f is not raw:
+                f.close()
+    return count
+
+
+def _open_binary(path: str):
+    fmt = snapshot_format(path)
+    if fmt == 'jsonl.gz':
+        return gzip.open(path, 'rb')
+    if fmt == 'jsonl.xz':
+        return lzma.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """逐条读取快照中的记录"""
+    fmt = snapshot_format(path)
+    with _open_binary(path) as f:
+        if fmt == 'json':
+            for _, record in iter_json_events(iter_file_chunks(f)):
+                yield record
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """读取快照中的全部记录"""
+    return list(iter_records(path))
+
+
+def read_head(path: str, size: int = 64) -> bytes:
+    """读取快照（解压后）开头的若干字节"""
+    with _open_binary(path) as f:
+        return f.read(size)
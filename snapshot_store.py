@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址的快照存储
+按规范化记录集合的哈希保存快照，内容相同的运行只在清单中记录时间；
+旧快照可以压缩为相对较新快照的差量链，磁盘占用只随数据的实际变化增长
+
+目录结构:
+    data/store/
+    ├── manifest.json                      # 运行记录、快照元数据、latest 指针
+    └── objects/ab/abcd....jsonl.gz        # 完整快照
+        objects/ab/abcd....delta.json.gz   # 差量快照
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from file_utils import atomic_open
+from record_types import json_default
+from snapshot_io import load_records, write_snapshot
+
+MANIFEST_VERSION = 1
+
+
+def canonical_record(record: Dict[str, Any]) -> str:
+    """记录的规范化序列化（键排序、紧凑格式）"""
+    return json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=json_default)
+
+
+def snapshot_hash(records: List[Dict[str, Any]]) -> str:
+    """
+    规范化记录集合的SHA-256
+    记录的规范化序列化排序后再计算，只有记录顺序不同的两次结果视为同一快照
+    """
+    digest = hashlib.sha256()
+    for line in sorted(canonical_record(record) for record in records):
+        digest.update(line.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class SnapshotStore:
+    """内容寻址的快照存储"""
+
+    def __init__(self, root: str = 'data/store'):
+        self.root = root
+        self.manifest_file = os.path.join(root, 'manifest.json')
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'version': MANIFEST_VERSION, 'latest': None, 'snapshots': {}, 'runs': []}
+
+    def _save_manifest(self):
+        with atomic_open(self.manifest_file) as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+
+    def _object_path(self, snapshot_id: str, suffix: str) -> str:
+        return os.path.join(self.root, 'objects', snapshot_id[:2], snapshot_id + suffix)
+
+    @property
+    def latest(self) -> Optional[str]:
+        """最新快照的ID"""
+        return self.manifest['latest']
+
+    @property
+    def snapshots(self) -> Dict[str, Dict[str, Any]]:
+        """快照ID -> 元数据，按首次出现的顺序排列"""
+        return self.manifest['snapshots']
+
+    @property
+    def runs(self) -> List[Dict[str, Any]]:
+        """每次运行的时间和对应的快照ID"""
+        return self.manifest['runs']
+
+    def add(self, records: List[Dict[str, Any]], timestamp: str = None) -> Tuple[str, bool]:
+        """
+        保存一次运行的记录并把 latest 指向它
+        :return: (快照ID, 是否新建了快照)，内容已存在时只追加运行记录
+        """
+        snapshot_id = snapshot_hash(records)
+        timestamp = timestamp or datetime.now().isoformat()
+        created = snapshot_id not in self.snapshots
+
+        if created:
+            path = self._object_path(snapshot_id, '.jsonl.gz')
+            write_snapshot(records, path)
+            self.snapshots[snapshot_id] = {
+                'created': timestamp,
+                'records': len(records),
+                'storage': 'full',
+                'base': None,
+                'file': os.path.relpath(path, self.root),
+            }
+
+        self.runs.append({'timestamp': timestamp, 'snapshot': snapshot_id})
+        self.manifest['latest'] = snapshot_id
+        self._save_manifest()
+        return snapshot_id, created
+
+    def get(self, snapshot_id: str = None) -> List[Dict[str, Any]]:
+        """读取快照记录（保持首次保存时的顺序），默认读取最新快照"""
+        snapshot_id = snapshot_id or self.latest
+        if snapshot_id not in self.snapshots:
+            raise KeyError(f"快照不存在: {snapshot_id}")
+
+        info = self.snapshots[snapshot_id]
+        path = os.path.join(self.root, info['file'])
+        if info['storage'] == 'full':
+            return load_records(path)
+
+        # 差量快照：在基准快照上替换变化的记录，再按保存的顺序排列
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            delta = json.load(f)
+        by_id = {record.get('process_id'): record for record in self.get(info['base'])}
+        by_id.update((record.get('process_id'), record) for record in delta['records'])
+        return [by_id[process_id] for process_id in delta['order']]
+
+    def chain_length(self, snapshot_id: str) -> int:
+        """读取快照需要应用的差量数"""
+        length = 0
+        while self.snapshots[snapshot_id]['storage'] == 'delta':
+            snapshot_id = self.snapshots[snapshot_id]['base']
+            length += 1
+        return length
+
+    def _write_delta(self, snapshot_id: str, base_id: str) -> str:
+        """把完整快照改写为相对 base_id 的差量"""
+        records = self.get(snapshot_id)
+        base = {record.get('process_id'): canonical_record(record) for record in self.get(base_id)}
+        delta = {
+            'base': base_id,
+            'order': [record.get('process_id') for record in records],
+            'records': [record for record in records
+                        if base.get(record.get('process_id')) != canonical_record(record)],
+        }
+
+        path = self._object_path(snapshot_id, '.delta.json.gz')
+        with atomic_open(path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                f.write(json.dumps(delta, ensure_ascii=False, separators=(',', ':'), default=json_default).encode('utf-8'))
+        return path
+
+    def compact(self, keep_full: int = 3, max_chain: int = 10) -> int:
+        """
+        保留策略：最新的 keep_full 个快照保持完整，更早的快照改写为相对下一个较新快照的差量
+        每条差量链最长 max_chain，超过时保留一个完整快照作为新的基准
+        :return: 改写为差量的快照数
+        """
+        order = list(self.snapshots)
+        converted = 0
+        depth = {}
+        for position in range(len(order) - 1, -1, -1):
+            snapshot_id = order[position]
+            info = self.snapshots[snapshot_id]
+            if info['storage'] == 'delta':
+                depth[snapshot_id] = depth[info['base']] + 1
+                continue
+
+            base_id = order[position + 1] if position + 1 < len(order) else None
+            if position >= len(order) - keep_full or base_id is None or depth[base_id] + 1 > max_chain:
+                depth[snapshot_id] = 0
+                continue
+
+            full_path = os.path.join(self.root, info['file'])
+            delta_path = self._write_delta(snapshot_id, base_id)
+            info.update({'storage': 'delta', 'base': base_id, 'file': os.path.relpath(delta_path, self.root)})
+            # 先写清单再删除完整快照，中断时不会丢失数据
+            self._save_manifest()
+            os.remove(full_path)
+            depth[snapshot_id] = depth[base_id] + 1
+            converted += 1
+
+        return converted
+
+    def disk_usage(self) -> int:
+        """存储目录占用的字节数"""
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        return total
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite存储后端
+将 process_data 输出的记录按快照写入规范化的 processes / process_references 表
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+REACTANT_KEYS = ['reactant_a', 'reactant_b', 'reactant_c', 'reactant_d']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created TEXT NOT NULL,
+    record_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS processes (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(snapshot_id),
+    process_id TEXT NOT NULL,
+    material TEXT,
+    reactant_a TEXT,
+    reactant_b TEXT,
+    reactant_c TEXT,
+    reactant_d TEXT,
+    note TEXT,
+    contributor TEXT,
+    reviewed INTEGER NOT NULL,
+    PRIMARY KEY (snapshot_id, process_id)
+);
+
+CREATE TABLE IF NOT EXISTS process_references (
+    snapshot_id INTEGER NOT NULL,
+    process_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    doi TEXT,
+    author TEXT,
+    full_authors TEXT,
+    citations INTEGER,
+    submitted TEXT,
+    PRIMARY KEY (snapshot_id, process_id, position),
+    FOREIGN KEY (snapshot_id, process_id) REFERENCES processes(snapshot_id, process_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_processes_material ON processes(material, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_processes_reactant_a ON processes(reactant_a, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_processes_reactant_b ON processes(reactant_b, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_processes_reactant_c ON processes(reactant_c, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_processes_reactant_d ON processes(reactant_d, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_processes_contributor ON processes(contributor, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_references_doi ON process_references(doi, snapshot_id);
+
+-- 最新快照视图，供看板直接查询
+CREATE VIEW IF NOT EXISTS latest_processes AS
+    SELECT * FROM processes WHERE snapshot_id = (SELECT MAX(snapshot_id) FROM snapshots);
+CREATE VIEW IF NOT EXISTS latest_references AS
+    SELECT * FROM process_references WHERE snapshot_id = (SELECT MAX(snapshot_id) FROM snapshots);
+"""
+
+
+class SQLiteStorage:
+    """ALD数据SQLite存储"""
+
+    def __init__(self, db_file: str = 'data/ald_database.sqlite'):
+        self.db_file = db_file
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_file)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def save_snapshot(self, data: List[Dict[str, Any]]) -> int:
+        """在一个事务内批量写入一次快照，返回快照ID"""
+        # process_id 重复时保留最后一条，与按 process_id 建立索引的其它模块一致，避免违反主键约束
+        records = list({record.get('process_id', ''): record for record in data}.values())
+        if len(records) < len(data):
+            print(f"警告: {len(data) - len(records)} 条记录的 process_id 重复，SQLite中只保留最后一条")
+        process_rows = (
+            (
+                record.get('process_id', ''),
+                record.get('material', ''),
+                record.get('reactant_a', ''),
+                record.get('reactant_b', ''),
+                record.get('reactant_c', ''),
+                record.get('reactant_d', ''),
+                record.get('note', ''),
+                record.get('contributor', ''),
+                1 if record.get('reviewed', False) else 0
+            )
+            for record in records
+        )
+        reference_rows = (
+            (
+                record.get('process_id', ''),
+                position,
+                ref.get('doi', ''),
+                ref.get('author', ''),
+                ref.get('full_authors', ''),
+                ref.get('citations', '0'),
+                ref.get('submitted', '')
+            )
+            for record in records
+            for position, ref in enumerate(record.get('references', []))
+        )
+
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO snapshots (created, record_count) VALUES (?, ?)",
+                (datetime.now().isoformat(), len(records))
+            )
+            snapshot_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO processes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((snapshot_id, *row) for row in process_rows)
+            )
+            self.conn.executemany(
+                "INSERT INTO process_references VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((snapshot_id, *row) for row in reference_rows)
+            )
+
+        print(f"SQLite快照已保存: {self.db_file} (快照ID {snapshot_id}，{len(records)} 条记录)")
+        return snapshot_id
+
+    def latest_snapshot_id(self) -> Optional[int]:
+        row = self.conn.execute("SELECT MAX(snapshot_id) FROM snapshots").fetchone()
+        return row[0]
+
+    def find_processes(self, material: str = None, reactant: str = None, contributor: str = None,
+                       doi: str = None, snapshot_id: int = None) -> List[Dict[str, Any]]:
+        """按条件查询工艺记录（默认最新快照），返回与 process_data 相同的结构"""
+        if snapshot_id is None:
+            snapshot_id = self.latest_snapshot_id()
+        if snapshot_id is None:
+            return []
+
+        conditions = ["p.snapshot_id = ?"]
+        params = [snapshot_id]
+        if material:
+            conditions.append("p.material = ?")
+            params.append(material)
+        if reactant:
+            # 每个反应物列各自走索引
+            conditions.append("(" + " OR ".join(f"p.{key} = ?" for key in REACTANT_KEYS) + ")")
+            params.extend([reactant] * len(REACTANT_KEYS))
+        if contributor:
+            conditions.append("p.contributor = ?")
+            params.append(contributor)
+        if doi:
+            conditions.append("p.process_id IN (SELECT process_id FROM process_references "
+                              "WHERE doi = ? AND snapshot_id = ?)")
+            params.extend([doi, snapshot_id])
+
+        rows = self.conn.execute(
+            f"SELECT * FROM processes p WHERE {' AND '.join(conditions)} ORDER BY p.rowid", params
+        ).fetchall()
+        return [self._load_record(row) for row in rows]
+
+    def _load_record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        references = self.conn.execute(
+            "SELECT * FROM process_references WHERE snapshot_id = ? AND process_id = ? ORDER BY position",
+            (row['snapshot_id'], row['process_id'])
+        ).fetchall()
+        return {
+            'process_id': row['process_id'],
+            'material': row['material'],
+            'reactant_a': row['reactant_a'],
+            'reactant_b': row['reactant_b'],
+            'reactant_c': row['reactant_c'],
+            'reactant_d': row['reactant_d'],
+            'note': row['note'],
+            'contributor': row['contributor'],
+            'reviewed': bool(row['reviewed']),
+            'references': [
+                {
+                    'doi': ref['doi'],
+                    'url': f"https://doi.org/{ref['doi']}" if ref['doi'] else '',
+                    'author': ref['author'],
+                    'full_authors': ref['full_authors'],
+                    'citations': str(ref['citations']),
+                    'submitted': ref['submitted']
+                }
+                for ref in references
+            ]
+        }
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+测试共用的本地替代服务
+模块都在仓库根目录，测试直接导入；需要HTTP服务的测试用 stub_server 启动本地服务，
+由测试提供的 respond(handler) 决定每个请求的响应
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """把请求记录到 server.requests，响应由 server.respond(handler) 返回 (状态码, 响应头, 响应体)"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        with self.server.lock:
+            self.server.requests.append({'method': self.command, 'path': self.path, 'headers': dict(self.headers)})
+        result = self.server.respond(self)
+        if result is None:
+            # respond 已自行写出响应（如中途断开连接）
+            return
+        status, headers, body = result
+        self.send_response(status)
+        headers = dict(headers or {})
+        headers.setdefault('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD' and body:
+            self.wfile.write(body)
+
+    do_GET = _handle
+    do_HEAD = _handle
+
+
+@pytest.fixture
+def stub_server():
+    """启动本地替代服务：stub_server(respond) 返回服务地址（不带末尾斜杠）"""
+    servers = []
+
+    def start(respond):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        server.daemon_threads = True
+        server.respond = respond
+        server.requests = []
+        server.lock = threading.Lock()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        start.server = server
+        return f'http://127.0.0.1:{server.server_address[1]}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+browser_utils 在本地静态页面上的就绪检测和紧凑提取
+需要本机安装Chrome/Chromium和对应的驱动，未安装时跳过
+"""
+
+import functools
+import shutil
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import FIXTURES
+
+webdriver = pytest.importorskip('selenium.webdriver')
+from selenium.common.exceptions import WebDriverException  # noqa: E402
+
+from browser_utils import fetch_table_compact, wait_for_table_ready  # noqa: E402
+from page_extract import compact_records, extract_table_rows, table_records  # noqa: E402
+
+CHROME_BINARIES = ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome']
+# rendered_table.html：标题行 + 5批，每批1个副标题行和20个数据行
+EXPECTED_ROWS = 1 + 5 * 21
+EXPECTED_RECORDS = 5 * 20
+
+pytestmark = pytest.mark.skipif(not any(shutil.which(name) for name in CHROME_BINARIES),
+                                reason='未安装Chrome/Chromium')
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def page_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=FIXTURES))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/rendered_table.html'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope='module')
+def driver():
+    options = webdriver.ChromeOptions()
+    for argument in ('--headless=new', '--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu'):
+        options.add_argument(argument)
+    try:
+        driver = webdriver.Chrome(options=options)
+    except WebDriverException as e:
+        pytest.skip(f'无法启动Chrome: {e.msg}')
+    yield driver
+    driver.quit()
+
+
+def test_waits_until_table_is_rendered(driver, page_url):
+    driver.get(page_url)
+    info = wait_for_table_ready(driver, timeout=10, quiet=0.3)
+
+    assert info['ready']
+    assert info['rows'] == EXPECTED_ROWS
+    assert info['mutations'] > 0
+    # 页面约0.8秒渲染完成，加上0.3秒静止期，远小于上限时间
+    assert info['waited'] < 5
+
+
+def test_reports_timeout(driver, page_url):
+    driver.get(page_url)
+    info = wait_for_table_ready(driver, timeout=1, quiet=0.3, min_rows=10000)
+
+    assert not info['ready']
+    assert info['waited'] >= 1
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 1000])
+def test_compact_extraction_matches_offline_parser(driver, page_url, chunk_rows):
+    driver.get(page_url)
+    assert wait_for_table_ready(driver, timeout=10, quiet=0.3)['ready']
+
+    chunks = fetch_table_compact(driver, chunk_rows=chunk_rows)
+    records = compact_records(chunks)
+
+    assert len(records) == EXPECTED_RECORDS
+    assert records == table_records(extract_table_rows(driver.page_source, driver.current_url))
+    assert records[0]['References'][1]['url'] == page_url.rsplit('/', 1)[0] + '/process/0'
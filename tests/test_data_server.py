@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""api_crawler.py serve 的启动错误处理"""
+
+import json
+import os
+import socket
+import sys
+
+import pytest
+
+import api_crawler
+from conftest import ROOT
+from snapshot_io import write_snapshot
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    with open(os.path.join(ROOT, 'data', 'api_latest_data.json'), 'r', encoding='utf-8') as f:
+        records = json.load(f)[:5]
+    path = str(tmp_path / 'api_latest_data.json')
+    write_snapshot(records, path)
+    return path
+
+
+def run_serve(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['api_crawler.py', 'serve', *argv])
+    with pytest.raises(SystemExit) as exc_info:
+        api_crawler.main()
+    return exc_info.value.code
+
+
+def test_port_in_use_is_reported(monkeypatch, capsys, snapshot):
+    with socket.socket() as occupied:
+        occupied.bind(('127.0.0.1', 0))
+        occupied.listen()
+        port = occupied.getsockname()[1]
+        code = run_serve(monkeypatch, '--port', str(port), '--snapshot', snapshot)
+
+    assert code == 1
+    assert f'错误: 无法在 127.0.0.1:{port} 启动服务' in capsys.readouterr().out
+
+
+def test_missing_snapshot_is_reported(monkeypatch, capsys, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    assert run_serve(monkeypatch, '--port', '0') == 1
+    assert '错误: 未找到最新数据文件' in capsys.readouterr().out
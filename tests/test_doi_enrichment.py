@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""doi_enrichment.DOIEnricher 对本地元数据替代服务的查询"""
+
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import unquote
+
+import pytest
+
+from doi_enrichment import DOIEnricher, DOIMetadataCache, cache_key
+
+
+def crossref_body(doi, citations=7):
+    return json.dumps({'status': 'ok', 'message': {
+        'DOI': doi,
+        'is-referenced-by-count': citations,
+        'author': [{'family': 'Puurunen'}, {'family': 'Leskelä'}],
+        'title': ['Surface chemistry of ALD'],
+        'container-title': ['J. Appl. Phys.'],
+        'issued': {'date-parts': [[2005, 6, 15]]},
+    }}).encode('utf-8')
+
+
+class MetadataService:
+    """按DOI预设的状态码序列依次响应，序列用完后返回200"""
+
+    def __init__(self, plan=None, retry_after=None):
+        self.plan = {doi: list(statuses) for doi, statuses in (plan or {}).items()}
+        self.retry_after = retry_after
+        self.hits = Counter()
+        self.times = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, handler):
+        doi = unquote(handler.path[len('/works/'):])
+        with self.lock:
+            self.hits[doi] += 1
+            self.times.setdefault(doi, []).append(time.monotonic())
+            statuses = self.plan.get(doi)
+            status = statuses.pop(0) if statuses else 200
+        if status == 200:
+            return 200, {'Content-Type': 'application/json'}, crossref_body(doi)
+        headers = {'Retry-After': self.retry_after} if self.retry_after is not None else {}
+        return status, headers, b'{}'
+
+
+def make_enricher(base_url, cache, **kwargs):
+    kwargs.setdefault('backoff', 0.05)
+    kwargs.setdefault('rate', 0)
+    return DOIEnricher(endpoint=base_url + '/works/{doi}', concurrency=4, timeout=5, cache=cache, **kwargs)
+
+
+def test_retries_429_and_503_with_backoff(stub_server, tmp_path):
+    service = MetadataService({'10.1000/busy': [429, 503]})
+    url = stub_server(service)
+    enricher = make_enricher(url, DOIMetadataCache(str(tmp_path / 'meta.json')))
+
+    results = enricher.resolve(['10.1000/busy', '10.1000/plain'])
+
+    assert results['10.1000/busy'] == {'citations': 7, 'authors': ['Puurunen', 'Leskelä'],
+                                       'title': 'Surface chemistry of ALD', 'journal': 'J. Appl. Phys.',
+                                       'year': 2005}
+    assert service.hits['10.1000/busy'] == 3
+    assert enricher.stats['retries'] == 2
+    assert enricher.stats['failed'] == 0
+    # 指数退避：第一次至少 backoff/2，第二次至少 backoff（随机抖动在 0.5～1 倍之间）
+    first, second, third = service.times['10.1000/busy']
+    assert second - first >= 0.05 * 0.5
+    assert third - second >= 0.1 * 0.5
+    assert service.hits['10.1000/plain'] == 1
+
+
+def test_retry_after_header_is_honoured(stub_server, tmp_path):
+    service = MetadataService({'10.1000/limited': [429]}, retry_after='1')
+    url = stub_server(service)
+    enricher = make_enricher(url, DOIMetadataCache(str(tmp_path / 'meta.json')), backoff=0.01)
+
+    start = time.monotonic()
+    enricher.resolve(['10.1000/limited'])
+    assert time.monotonic() - start >= 1.0
+    assert service.hits['10.1000/limited'] == 2
+
+
+def test_gives_up_after_retries(stub_server, tmp_path):
+    service = MetadataService({'10.1000/down': [503] * 10})
+    url = stub_server(service)
+    cache = DOIMetadataCache(str(tmp_path / 'meta.json'))
+    enricher = make_enricher(url, cache, retries=2, backoff=0.01)
+
+    results = enricher.resolve(['10.1000/down'])
+
+    assert '10.1000/down' not in results
+    assert service.hits['10.1000/down'] == 3
+    assert enricher.stats['failed'] == 1
+    assert cache.get('10.1000/down', enricher.endpoint) is None
+
+
+def test_404_is_cached(stub_server, tmp_path):
+    service = MetadataService({'10.1000/unknown': [404]})
+    url = stub_server(service)
+    cache_file = str(tmp_path / 'meta.json')
+    enricher = make_enricher(url, DOIMetadataCache(cache_file))
+
+    assert enricher.resolve(['10.1000/unknown']) == {'10.1000/unknown': None}
+
+    # 新的缓存对象从磁盘读取，不再请求
+    enricher = make_enricher(url, DOIMetadataCache(cache_file))
+    assert enricher.resolve(['10.1000/UNKNOWN']) == {'10.1000/UNKNOWN': None}
+    assert enricher.stats['cached'] == 1
+    assert service.hits['10.1000/unknown'] == 1
+
+
+def test_expired_entries_are_refetched(stub_server, tmp_path):
+    service = MetadataService()
+    url = stub_server(service)
+    cache_file = str(tmp_path / 'meta.json')
+    enricher = make_enricher(url, DOIMetadataCache(cache_file, ttl_days=1))
+    enricher.resolve(['10.1000/old'])
+
+    # 把缓存条目改为两天前取得
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    for entry in entries.values():
+        entry['fetched'] -= 2 * 86400
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+
+    cache = DOIMetadataCache(cache_file, ttl_days=1)
+    assert cache.get('10.1000/old', enricher.endpoint) is None
+    enricher = make_enricher(url, cache)
+    enricher.resolve(['10.1000/old'])
+    assert enricher.stats['cached'] == 0
+    assert service.hits['10.1000/old'] == 2
+
+    # 更长的有效期下同一条目仍然有效
+    assert DOIMetadataCache(cache_file, ttl_days=30).get('10.1000/old', enricher.endpoint) is not None
+
+
+def test_cache_keyed_by_endpoint(stub_server, tmp_path):
+    cache_file = str(tmp_path / 'meta.json')
+    first_service = MetadataService()
+    first = make_enricher(stub_server(first_service), DOIMetadataCache(cache_file))
+    first.resolve(['10.1000/shared'])
+
+    second_service = MetadataService()
+    second = make_enricher(stub_server(second_service), DOIMetadataCache(cache_file))
+    second.resolve(['10.1000/shared'])
+
+    assert second.stats['cached'] == 0
+    assert second_service.hits['10.1000/shared'] == 1
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        keys = set(json.load(f))
+    assert keys == {cache_key('10.1000/shared', first.endpoint), cache_key('10.1000/shared', second.endpoint)}
+
+
+def test_enrich_updates_records(stub_server, tmp_path, capsys):
+    url = stub_server(MetadataService())
+    enricher = make_enricher(url, DOIMetadataCache(str(tmp_path / 'meta.json')))
+    records = [{'references': [{'doi': '10.1000/a', 'citations': '0', 'full_authors': ''},
+                               {'doi': '', 'citations': '0', 'full_authors': ''}]}]
+
+    enricher.enrich(records)
+
+    assert records[0]['references'][0]['citations'] == '7'
+    assert records[0]['references'][0]['full_authors'] == 'Puurunen Leskelä'
+    assert records[0]['references'][1]['citations'] == '0'
+    assert 'DOI' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('doi', ['10.1000/ABC', ' 10.1000/abc '])
+def test_cache_key_normalizes_doi(doi):
+    assert cache_key(doi, 'http://x/{doi}') == 'http://x/{doi} 10.1000/abc'
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""json_to_excel 命令行的单文件转换"""
+
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import json_to_excel
+from conftest import ROOT
+from snapshot_io import write_snapshot
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    with open(os.path.join(ROOT, 'data', 'api_latest_data.json'), 'r', encoding='utf-8') as f:
+        records = json.load(f)[:50]
+    path = str(tmp_path / 'api_latest_data.jsonl.gz')
+    write_snapshot(records, path)
+    return path
+
+
+def run_main(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['json_to_excel.py', *argv])
+    json_to_excel.main()
+
+
+def test_streaming_single_file_does_not_load_whole_file(monkeypatch, snapshot, tmp_path):
+    plain_file = str(tmp_path / 'plain.xlsx')
+    run_main(monkeypatch, snapshot, '-o', plain_file)
+
+    def fail(self, json_file):
+        raise AssertionError('流式模式不应整体加载文件')
+
+    monkeypatch.setattr(json_to_excel.JSONToExcelConverter, 'load_json_data', fail)
+    streaming_file = str(tmp_path / 'streaming.xlsx')
+    run_main(monkeypatch, snapshot, '-o', streaming_file, '--streaming')
+
+    streamed = pd.read_excel(streaming_file, sheet_name=None)
+    plain = pd.read_excel(plain_file, sheet_name=None)
+    assert len(streamed['ALD工艺数据']) == 50
+    for sheet in ('ALD工艺数据', '参考文献详情'):
+        pd.testing.assert_frame_equal(streamed[sheet], plain[sheet])
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""link_check.LinkChecker 对本地替代解析服务的检查"""
+
+from urllib.parse import unquote
+
+from link_check import LinkCheckCache, LinkChecker, doi_link, status_label
+
+# 路径（不含解析服务前缀） -> HEAD 的状态码
+HEAD_STATUS = {
+    '10.1000/ok': 200,
+    '10.1000/moved': 302,
+    '10.1000/missing': 404,
+    '10.1000/nohead': 405,
+    '10.1000/a<b>c': 302,
+    '10.1000/down': 503,
+}
+
+
+def resolver(handler):
+    doi = unquote(handler.path[1:])
+    status = HEAD_STATUS.get(doi, 404)
+    if handler.command == 'GET' and status == 405:
+        return 200, {}, b'landing page'
+    headers = {'Location': f'https://publisher.example/{doi}'} if status == 302 else {}
+    return status, headers, b''
+
+
+def make_checker(base_url, cache_file, **kwargs):
+    kwargs.setdefault('retries', 0)
+    return LinkChecker(resolver=base_url + '/', concurrency=4, timeout=5,
+                       cache=LinkCheckCache(str(cache_file)), **kwargs)
+
+
+def test_check_all_statuses(stub_server, tmp_path):
+    url = stub_server(resolver)
+    checker = make_checker(url, tmp_path / 'links.json')
+    results = checker.check_all(list(HEAD_STATUS) + ['not-a-doi'])
+
+    assert results['10.1000/ok'] == {'status': 'ok', 'code': 200, 'location': ''}
+    assert results['10.1000/moved']['status'] == 'ok'
+    assert results['10.1000/moved']['code'] == 302
+    assert results['10.1000/moved']['location'] == 'https://publisher.example/10.1000/moved'
+    assert results['10.1000/missing'] == {'status': 'broken', 'code': 404, 'location': ''}
+    # 不支持HEAD时改用GET
+    assert results['10.1000/nohead'] == {'status': 'ok', 'code': 200, 'location': ''}
+    assert results['10.1000/a<b>c']['status'] == 'ok'
+    assert results['10.1000/down']['status'] == 'error'
+    assert results['not-a-doi']['status'] == 'invalid'
+
+    methods = [(request['method'], request['path']) for request in stub_server.server.requests]
+    assert ('GET', '/10.1000/nohead') in methods
+    # SICI格式DOI中的 <、> 被编码后请求
+    assert ('HEAD', '/10.1000/a%3Cb%3Ec') in methods
+    assert checker.stats == {'dois': 7, 'cached': 0, 'checked': 7, 'elapsed': checker.stats['elapsed']}
+
+
+def test_status_label():
+    assert status_label({'status': 'ok', 'code': 200, 'location': ''}) == '有效'
+    assert status_label({'status': 'ok', 'code': 302, 'location': 'x'}) == '有效'
+    assert status_label({'status': 'broken', 'code': 404, 'location': ''}) == '失效 (404)'
+    assert status_label({'status': 'invalid', 'code': None, 'location': ''}) == 'DOI格式错误'
+    assert status_label({'status': 'error', 'code': None, 'location': '', 'error': 'HTTP 503'}) == '检查失败'
+    assert status_label(None) == ''
+
+
+def test_check_records_labels(stub_server, tmp_path, capsys):
+    url = stub_server(resolver)
+    checker = make_checker(url, tmp_path / 'links.json')
+    records = [{'references': [{'doi': '10.1000/ok'}, {'doi': '10.1000/missing'}]},
+               {'references': [{'doi': '10.1000/ok'}, {'doi': ''}]}]
+    assert checker.check_records(records) == {'10.1000/ok': '有效', '10.1000/missing': '失效 (404)'}
+    assert '2 个DOI' in capsys.readouterr().out
+
+
+def test_cache_keyed_by_resolver(stub_server, tmp_path):
+    cache_file = tmp_path / 'links.json'
+    first = stub_server(resolver)
+    make_checker(first, cache_file).check_all(['10.1000/ok', '10.1000/missing', '10.1000/down'])
+    first_requests = len(stub_server.server.requests)
+
+    # 同一解析服务：确定的结果来自缓存，检查失败的结果不缓存
+    checker = make_checker(first, cache_file)
+    checker.check_all(['10.1000/ok', '10.1000/missing', '10.1000/down'])
+    assert checker.stats['cached'] == 2
+    assert len(stub_server.server.requests) == first_requests + 1
+
+    # 另一个解析服务不使用前者的缓存
+    second = stub_server(resolver)
+    checker = make_checker(second, cache_file)
+    checker.check_all(['10.1000/ok', '10.1000/missing'])
+    assert checker.stats['cached'] == 0
+    assert len(stub_server.server.requests) == 2
+
+    cache = LinkCheckCache(str(cache_file))
+    assert cache.get('10.1000/ok', first + '/') is not None
+    assert cache.get('10.1000/ok', second + '/') is not None
+    assert cache.get('10.1000/ok') is None
+
+
+def test_doi_link_encoding():
+    assert doi_link('10.1000/a<b>c', 'http://resolver/') == 'http://resolver/10.1000/a%3Cb%3Ec'
+    assert doi_link(' 10.1000/x(1)2;3 ') == 'https://doi.org/10.1000/x(1)2;3'
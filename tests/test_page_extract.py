@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""page_extract 对保存的页面快照的离线提取，以及紧凑分块的解码"""
+
+import os
+
+import pytest
+
+from conftest import FIXTURES
+from page_extract import (RAW_FIELDS, compact_records, extract_file, extract_snapshots, extract_table_rows,
+                          is_compact_payload, table_records)
+
+PAGE = os.path.join(FIXTURES, 'process_table.html')
+SICI_URL = 'https://doi.org/10.1002/(SICI)1099-0682(199901)1999:1<1::AID-EJIC1>3.0.CO;2-Q'
+
+EXPECTED_RECORDS = [
+    {'Material': 'Al2O3', 'Reactant A': 'AlMe3', 'Reactant B': 'H2O',
+     'References': [{'name': 'Puurunen 2005', 'url': 'https://doi.org/10.1021/cm0304546'},
+                    {'name': 'Details', 'url': 'https://www.atomiclimits.com/alddatabase/process/414'}]},
+    {'Material': 'AlN', 'Reactant A': 'AlCl3', 'Reactant B': 'NH3', 'Reactant C': 'H2',
+     'Further reactants': 'Ar plasma', 'References': [{'name': 'Dueñas', 'url': SICI_URL}]},
+    {'Reactant A': 'TMA', 'Reactant B': 'O2 plasma', 'References': [{'name': 'no link', 'url': ''}]},
+    {'Material': 'ZrO2', 'Reactant A': 'ZrI4', 'Reactant B': 'H2O2'},
+]
+
+
+def read_page():
+    with open(PAGE, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def encode_compact(rows, chunk_rows):
+    """按 browser_utils 中提取脚本的格式编码：列式下标，字符串表跨分块累积，下标0为空串"""
+    index = {'': 0}
+    chunks = []
+    for start in range(0, len(rows), chunk_rows):
+        chunk = {'stringBase': len(index), 'strings': [], 'columns': {field: [] for field in RAW_FIELDS},
+                 'refCounts': [], 'refNames': [], 'refUrls': []}
+
+        def intern(value):
+            if value not in index:
+                index[value] = len(index)
+                chunk['strings'].append(value)
+            return index[value]
+
+        for row in rows[start:start + chunk_rows]:
+            for field in RAW_FIELDS:
+                chunk['columns'][field].append(intern(row[field]))
+            chunk['refCounts'].append(len(row['references']))
+            for ref in row['references']:
+                chunk['refNames'].append(intern(ref['name']))
+                chunk['refUrls'].append(intern(ref['url']))
+        chunks.append(chunk)
+    return chunks
+
+
+def test_extract_table_rows_skips_non_data_rows():
+    rows = extract_table_rows(read_page())
+    # 跳过标题行、副标题行、单元格少于7个的行、材料和反应物A都为空的行，以及其它表格
+    assert [(row['material'], row['reactantA']) for row in rows] == [
+        ('Al2O3', 'AlMe3'), ('AlN', 'AlCl3'), ('', 'TMA'), ('ZrO2', 'ZrI4')]
+    assert 'Aluminum' not in [row['material'] for row in rows]
+    assert 'O3' not in [row['reactantB'] for row in rows]
+
+
+def test_table_records():
+    assert table_records(extract_table_rows(read_page())) == EXPECTED_RECORDS
+    assert table_records(extract_table_rows(read_page()), max_records=2) == EXPECTED_RECORDS[:2]
+
+
+def test_relative_links_use_base_url_argument_without_base_tag():
+    page = read_page().replace('<base href="https://www.atomiclimits.com/alddatabase/">', '')
+    rows = extract_table_rows(page, base_url='http://127.0.0.1:8765/copy/')
+    assert rows[0]['references'][1]['url'] == 'http://127.0.0.1:8765/copy/process/414'
+
+
+def test_page_without_table():
+    assert extract_table_rows('<html><body><p>You need to enable JavaScript</p></body></html>') == []
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 3, 1000])
+def test_compact_records_match_table_records(chunk_rows):
+    rows = extract_table_rows(read_page())
+    chunks = encode_compact(rows, chunk_rows)
+    assert is_compact_payload(chunks)
+    assert not is_compact_payload(rows)
+    assert compact_records(chunks) == table_records(rows)
+    assert compact_records(chunks, max_records=3) == table_records(rows, max_records=3)
+
+
+def test_compact_records_rejects_missing_chunk():
+    chunks = encode_compact(extract_table_rows(read_page()), 1)
+    with pytest.raises(ValueError):
+        compact_records(chunks[:1] + chunks[2:])
+
+
+def test_extract_file_and_snapshots(tmp_path):
+    path, records, seconds = extract_file(PAGE)
+    assert path == PAGE
+    assert records == EXPECTED_RECORDS
+    assert seconds >= 0
+
+    second = tmp_path / 'page_2.html'
+    second.write_text(read_page(), encoding='utf-8')
+    for workers in (1, 2):
+        results = extract_snapshots([PAGE, str(tmp_path)], workers=workers)
+        assert [result[0] for result in results] == [PAGE, str(second)]
+        assert all(result[1] == EXPECTED_RECORDS for result in results)
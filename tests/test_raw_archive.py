@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""raw_archive.RawArchiveDownloader 的重试和断点续传"""
+
+import gzip
+import os
+import re
+
+import pytest
+import requests
+
+from raw_archive import RawArchiveDownloader, read_raw_archive
+
+BODY = b'{"success":true,"processes":[' + b','.join(b'{"process_id":"%d"}' % i for i in range(5000)) + b']}'
+ETAG = '"v1"'
+
+
+class RangeServer:
+    """
+    按计划依次响应：
+    truncate - 200 完整响应头，只发送前 cut 字节后断开
+    serve    - 支持 Range + If-Range（ETag一致时返回206）
+    full     - 忽略 Range，返回200完整内容
+    416      - 返回 416
+    503      - 返回 503
+    """
+
+    def __init__(self, plan, body=BODY, cut=None, gzip_body=False):
+        self.plan = list(plan)
+        self.payload = gzip.compress(body, mtime=0) if gzip_body else body
+        self.encoding = {'Content-Encoding': 'gzip'} if gzip_body else {}
+        self.cut = cut if cut is not None else len(self.payload) // 3
+
+    def __call__(self, handler):
+        action = self.plan.pop(0) if self.plan else 'serve'
+        payload = self.payload
+        headers = dict(self.encoding, ETag=ETAG)
+        if action == 'truncate':
+            handler.send_response(200)
+            handler.send_header('Content-Length', str(len(payload)))
+            for name, value in headers.items():
+                handler.send_header(name, value)
+            handler.end_headers()
+            handler.wfile.write(payload[:self.cut])
+            handler.wfile.flush()
+            handler.close_connection = True
+            return None
+        if action == '416':
+            return 416, {'Content-Range': f'bytes */{len(payload)}'}, b''
+        if action == '503':
+            return 503, {}, b''
+        match = re.match(r'bytes=(\d+)-$', handler.headers.get('Range', ''))
+        if action == 'serve' and match and handler.headers.get('If-Range') == ETAG:
+            start = int(match.group(1))
+            headers['Content-Range'] = f'bytes {start}-{len(payload) - 1}/{len(payload)}'
+            return 206, headers, payload[start:]
+        return 200, headers, payload
+
+
+def make_downloader(tmp_path, retries=3):
+    return RawArchiveDownloader(requests.Session(), archive_dir=str(tmp_path / 'raw'), retries=retries,
+                                backoff=0.01, timeout=5)
+
+
+def part_files(tmp_path):
+    return sorted(name for name in os.listdir(tmp_path / 'raw') if name.startswith('.api_raw_'))
+
+
+@pytest.mark.parametrize('gzip_body', [False, True])
+def test_resumes_with_range_and_if_range(stub_server, tmp_path, gzip_body):
+    server = RangeServer(['truncate', 'serve'], gzip_body=gzip_body)
+    url = stub_server(server) + '/api/processes.php'
+    downloader = make_downloader(tmp_path)
+
+    archive = downloader.download(url)
+
+    assert read_raw_archive(archive) == BODY
+    assert archive.endswith('.json.gz')
+    requests_seen = stub_server.server.requests
+    assert 'Range' not in requests_seen[0]['headers']
+    assert requests_seen[1]['headers']['Range'] == f'bytes={server.cut}-'
+    assert requests_seen[1]['headers']['If-Range'] == ETAG
+    assert downloader.stats['attempts'] == 2
+    assert downloader.stats['resumed_bytes'] == server.cut
+    assert downloader.etag == ETAG
+    assert part_files(tmp_path) == []
+
+
+def test_resumes_partial_download_from_previous_run(stub_server, tmp_path):
+    server = RangeServer(['truncate', 'serve'])
+    url = stub_server(server) + '/api/processes.php'
+
+    # 不重试：第一次运行失败，部分文件和状态保留在磁盘上
+    with pytest.raises(requests.exceptions.ConnectionError):
+        make_downloader(tmp_path, retries=0).download(url)
+    assert len(part_files(tmp_path)) == 2
+
+    downloader = make_downloader(tmp_path, retries=0)
+    archive = downloader.download(url)
+    assert read_raw_archive(archive) == BODY
+    assert downloader.stats['resumed_bytes'] == server.cut
+    assert part_files(tmp_path) == []
+
+
+def test_restarts_when_range_answered_with_200(stub_server, tmp_path):
+    server = RangeServer(['truncate', 'full'])
+    url = stub_server(server) + '/api/processes.php'
+    downloader = make_downloader(tmp_path)
+
+    archive = downloader.download(url)
+
+    assert read_raw_archive(archive) == BODY
+    assert 'Range' in stub_server.server.requests[1]['headers']
+    assert downloader.stats['resumed_bytes'] == 0
+    assert downloader.stats['bytes'] == server.cut + len(BODY)
+
+
+def test_discards_partial_download_on_416(stub_server, tmp_path):
+    server = RangeServer(['truncate', '416', 'serve'])
+    url = stub_server(server) + '/api/processes.php'
+    downloader = make_downloader(tmp_path)
+
+    archive = downloader.download(url)
+
+    assert read_raw_archive(archive) == BODY
+    requests_seen = stub_server.server.requests
+    assert 'Range' in requests_seen[1]['headers']
+    # 416 之后部分文件被丢弃，从头下载
+    assert 'Range' not in requests_seen[2]['headers']
+    assert downloader.stats['attempts'] == 3
+    assert downloader.stats['resumed_bytes'] == 0
+
+
+def test_gives_up_after_retries(stub_server, tmp_path):
+    server = RangeServer(['503'] * 10)
+    url = stub_server(server) + '/api/processes.php'
+    downloader = make_downloader(tmp_path, retries=2)
+
+    with pytest.raises(requests.exceptions.ConnectionError, match='重试 2 次'):
+        downloader.download(url)
+    assert len(stub_server.server.requests) == 3
+    assert downloader.stats['attempts'] == 3
+
+
+def test_not_modified_returns_none(stub_server, tmp_path):
+    url = stub_server(lambda handler: (304, {'ETag': ETAG}, b'')) + '/api/processes.php'
+    assert make_downloader(tmp_path).download(url, {'If-None-Match': ETAG}) is None
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""sqlite_storage.SQLiteStorage 的快照写入和查询"""
+
+import copy
+import json
+import os
+
+import pytest
+
+from conftest import ROOT
+from sqlite_storage import SQLiteStorage
+
+
+@pytest.fixture
+def records():
+    with open(os.path.join(ROOT, 'data', 'api_latest_data.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)[:20]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / 'ald.sqlite'))
+    yield storage
+    storage.close()
+
+
+def test_round_trip(storage, records):
+    snapshot_id = storage.save_snapshot(records)
+    assert storage.latest_snapshot_id() == snapshot_id
+    assert storage.find_processes() == records
+
+
+def test_duplicate_process_id_keeps_last_record(storage, records, capsys):
+    duplicate = copy.deepcopy(records[0])
+    duplicate['material'] = 'Duplicate'
+    duplicate['references'] = duplicate['references'] * 2
+
+    storage.save_snapshot(records + [duplicate])
+
+    assert '1 条记录的 process_id 重复' in capsys.readouterr().out
+    assert storage.find_processes() == [duplicate] + records[1:]
+    count = storage.conn.execute("SELECT record_count FROM snapshots").fetchone()[0]
+    assert count == len(records)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+三元组（trigram）全文索引
+为 note、full_authors、doi 三个自由文本字段建立 trigram -> 记录位置 的倒排表，
+支持子串查询（如部分DOI）和模糊查询（如拼错的作者名），按相似度排序返回 process_id
+
+索引以紧凑的二进制文件保存在快照旁，如 data/api_latest_data.trigram.bin：
+    MAGIC | uint32 头部长度 | 头部JSON | 各字段的数据块
+每个字段包含四个数据块：
+    terms     以 \\0 分隔、排序后的trigram
+    offsets   uint32数组，第i个trigram的倒排表在postings中的区间
+    postings  差分后的varint编码记录位置
+    texts     zlib压缩的规范化文本，仅用于确认子串命中
+加载时只读取头部，查询某个字段时才解析该字段的数据块
+"""
+
+import json
+import os
+import struct
+import sys
+import unicodedata
+import zlib
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+from file_utils import atomic_open
+from snapshot_io import find_latest_snapshot, iter_records, snapshot_signature, strip_snapshot_extension
+
+MAGIC = b'ALDTRI01'
+TEXT_FIELDS = ['note', 'full_authors', 'doi']
+# 同一记录的多条参考文献之间的分隔符，规范化后不会出现在文本中
+VALUE_SEPARATOR = '\x1f'
+
+
+def text_index_path(snapshot_path: str) -> str:
+    """快照对应的索引文件，如 data/api_latest_data.json -> data/api_latest_data.trigram.bin"""
+    return strip_snapshot_extension(snapshot_path) + '.trigram.bin'
+
+
+def normalize_text(text: str) -> str:
+    """去掉重音符号、不区分大小写、合并空白"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+def trigrams(text: str, padded: bool = True) -> set:
+    """
+    文本的trigram集合
+    :param padded: 首尾补空格，使词首词尾也能形成trigram；子串查询不补
+    """
+    if padded:
+        text = f' {text} '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def field_texts(record: Dict[str, Any]) -> Dict[str, str]:
+    """记录中各文本字段的规范化文本，多条参考文献以分隔符连接"""
+    references = record.get('references') or []
+    return {
+        'note': normalize_text(record.get('note') or ''),
+        'full_authors': VALUE_SEPARATOR.join(normalize_text(ref.get('full_authors') or '') for ref in references),
+        'doi': VALUE_SEPARATOR.join(normalize_text(ref.get('doi') or '') for ref in references),
+    }
+
+
+def _encode_postings(positions: List[int], out: bytearray):
+    """差分 + varint 编码（位置已递增排序）"""
+    previous = 0
+    for position in positions:
+        delta = position - previous
+        previous = position
+        while delta >= 0x80:
+            out.append((delta & 0x7f) | 0x80)
+            delta >>= 7
+        out.append(delta)
+
+
+def _decode_postings(data: bytes) -> List[int]:
+    positions = []
+    value = shift = previous = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        positions.append(previous)
+        value = shift = 0
+    return positions
+
+
+def build_text_index(records: Iterable[Dict[str, Any]], path: str, source: Dict[str, Any] = None) -> int:
+    """
+    构建trigram索引并原子写入二进制文件
+    :param source: 快照签名，用于判断索引是否过期
+    :return: 索引的记录数
+    """
+    process_ids = []
+    texts = {field: [] for field in TEXT_FIELDS}
+    postings = {field: {} for field in TEXT_FIELDS}
+    for position, record in enumerate(records):
+        process_ids.append(record.get('process_id'))
+        for field, text in field_texts(record).items():
+            texts[field].append(text)
+            for value in text.split(VALUE_SEPARATOR) if text else ():
+                for gram in trigrams(value):
+                    rows = postings[field].setdefault(gram, [])
+                    if not rows or rows[-1] != position:
+                        rows.append(position)
+
+    blocks = []
+    fields = {}
+    offset = 0
+    for field in TEXT_FIELDS:
+        terms = sorted(postings[field])
+        encoded = bytearray()
+        offsets = array('I', [0])
+        for gram in terms:
+            _encode_postings(postings[field][gram], encoded)
+            offsets.append(len(encoded))
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        field_blocks = {
+            'terms': '\0'.join(terms).encode('utf-8'),
+            'offsets': offsets.tobytes(),
+            'postings': bytes(encoded),
+            'texts': zlib.compress('\0'.join(texts[field]).encode('utf-8'), 6),
+        }
+        fields[field] = {}
+        for name, block in field_blocks.items():
+            fields[field][name] = [offset, len(block)]
+            blocks.append(block)
+            offset += len(block)
+
+    header = json.dumps({'source': source or {}, 'process_ids': process_ids, 'fields': fields},
+                        ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    with atomic_open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+    return len(process_ids)
+
+
+class _FieldIndex:
+    """单个字段的trigram表，按需解析"""
+
+    def __init__(self, data: bytes, base: int, blocks: Dict[str, List[int]]):
+        def block(name: str) -> bytes:
+            start, length = blocks[name]
+            return data[base + start:base + start + length]
+
+        terms = block('terms').decode('utf-8')
+        self.terms = {gram: i for i, gram in enumerate(terms.split('\0'))} if terms else {}
+        self.offsets = array('I')
+        self.offsets.frombytes(block('offsets'))
+        if sys.byteorder != 'little':
+            self.offsets.byteswap()
+        self.postings = block('postings')
+        self._texts_block = block('texts')
+        self._texts = None
+
+    def lookup(self, gram: str) -> List[int]:
+        index = self.terms.get(gram)
+        if index is None:
+            return []
+        return _decode_postings(self.postings[self.offsets[index]:self.offsets[index + 1]])
+
+    def text(self, position: int) -> str:
+        if self._texts is None:
+            self._texts = zlib.decompress(self._texts_block).decode('utf-8').split('\0')
+        return self._texts[position]
+
+
+class TextIndex:
+    """trigram全文索引"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"不是trigram索引文件: {path}")
+        header_length = struct.unpack_from('<I', data, len(MAGIC))[0]
+        header_end = len(MAGIC) + 4 + header_length
+        header = json.loads(data[len(MAGIC) + 4:header_end].decode('utf-8'))
+        self.path = path
+        self.source = header['source']
+        self.process_ids = header['process_ids']
+        self._data = data
+        self._base = header_end
+        self._blocks = header['fields']
+        self._fields = {}
+
+    @classmethod
+    def load(cls, snapshot_path: str = None, rebuild: bool = False) -> 'TextIndex':
+        """
+        加载快照的trigram索引，索引不存在或快照内容已变化时重建
+        :param snapshot_path: 默认使用 data/ 下的最新数据文件
+        """
+        snapshot_path = snapshot_path or find_latest_snapshot()
+        if not snapshot_path or not os.path.exists(snapshot_path):
+            raise FileNotFoundError("未找到最新数据文件，请先运行 api_crawler.py")
+
+        path = text_index_path(snapshot_path)
+        if not rebuild and os.path.exists(path):
+            try:
+                index = cls(path)
+            except (ValueError, struct.error, json.JSONDecodeError):
+                index = None
+            if index is not None:
+                signature = snapshot_signature(snapshot_path, with_hash=False)
+                if all(index.source.get(key) == value for key, value in signature.items()):
+                    return index
+                if index.source.get('sha256') == snapshot_signature(snapshot_path)['sha256']:
+                    return index
+
+        print(f"正在为 {snapshot_path} 构建全文索引...", file=sys.stderr)
+        build_text_index(iter_records(snapshot_path), path, snapshot_signature(snapshot_path))
+        return cls(path)
+
+    def field(self, name: str) -> _FieldIndex:
+        if name not in self._fields:
+            self._fields[name] = _FieldIndex(self._data, self._base, self._blocks[name])
+        return self._fields[name]
+
+    def search(self, query: str, fields: List[str] = None, fuzzy: bool = False,
+               min_score: float = 0.5) -> List[Tuple[int, float, List[str]]]:
+        """
+        子串或模糊查询
+        :param fields: 查询的字段，默认全部
+        :param fuzzy: 按trigram相似度模糊匹配；否则要求包含完整子串
+        :param min_score: 模糊匹配的最低相似度（命中的trigram占查询trigram的比例）
+        :return: [(记录位置, 得分, 命中字段)]，按得分降序排列
+        """
+        query = normalize_text(query)
+        if not query:
+            return []
+        scores = {}
+        for name in fields or TEXT_FIELDS:
+            index = self.field(name)
+            grams = trigrams(query, padded=fuzzy)
+            if not grams:
+                # 少于3个字符无法使用trigram，只能逐条确认
+                candidates = {position: 0 for position in range(len(self.process_ids))}
+            else:
+                candidates = Counter()
+                for gram in grams:
+                    candidates.update(index.lookup(gram))
+
+            for position, hits in candidates.items():
+                # 子串查询要求包含全部trigram后再确认原文
+                if not fuzzy and hits < len(grams):
+                    continue
+                if query in index.text(position):
+                    score = 1.0
+                elif fuzzy and grams and hits / len(grams) >= min_score:
+                    score = hits / len(grams)
+                else:
+                    continue
+                best, matched = scores.get(position, (0.0, []))
+                matched.append(name)
+                scores[position] = (max(best, score), matched)
+
+        return sorted(((position, round(score, 3), matched) for position, (score, matched) in scores.items()),
+                      key=lambda item: (-item[1], item[0]))